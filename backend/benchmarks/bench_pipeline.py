@@ -0,0 +1,245 @@
+"""
+Benchmarks every stage of an analysis on a synthetic genome panel, for each
+k-mer engine and preprocessing mode, and writes the results as JSON.
+
+Stages: preprocess (FastaPreprocessor.process_file, preprocessed mode only),
+parse, index_build, scan and merge (find_unique_signature_table, split by the
+finder's instrumentation), serialize (the AnalysisResult JSON response, as
+the routes encode it from the signature table) and export_csv. Each stage
+reports its best wall time over the repeats, the process's peak RSS and how
+far the stage raised it, and its throughput. Scan and merge run in one call,
+so they report the peak of that call.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pipeline --target-mb 5 --engines packed,bloom --output bench.json
+    python -m benchmarks.bench_pipeline --target-mb 5 --engines packed --compare bench.json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic_genomes import add_panel_arguments, generate_panel, spec_from_arguments
+from src.core.instrumentation import Instrumentation
+from src.core.preprocessor import FastaPreprocessor
+from src.core.resource_usage import current_rss_bytes, peak_rss_bytes, reset_peak_rss
+from src.models.schemas import AnalysisResult
+from src.services.genome_loading import SIGNATURE_ENGINES, create_finder, load_background, load_target, sequence_output
+from src.services.result_export import export_signatures, iter_result_json
+
+# Bump when the layout of the JSON output changes.
+RESULTS_SCHEMA_VERSION = 1
+
+MODES = ("raw", "preprocessed")
+
+
+def measure(func: Callable, repeats: int) -> Tuple[object, Dict]:
+    """
+    Runs `func` `repeats` times and returns its last result with the best
+    wall time and the highest peak RSS of the runs.
+    """
+    seconds = float("inf")
+    peak = increase = 0
+    result = None
+    for _ in range(repeats):
+        result = None
+        gc.collect()
+        reset_peak_rss()
+        rss_before = current_rss_bytes() or 0
+        started = time.perf_counter()
+        result = func()
+        seconds = min(seconds, time.perf_counter() - started)
+        peak = max(peak, peak_rss_bytes())
+        increase = max(increase, peak_rss_bytes() - rss_before)
+    return result, {"seconds": seconds, "peak_rss_bytes": peak, "peak_rss_increase_bytes": max(increase, 0)}
+
+
+def _record(engine: str, mode: str, stage: str, stats: Dict, bases: int = 0, kmers: int = 0) -> Dict:
+    record = {"engine": engine, "mode": mode, "stage": stage, **stats, "bases": bases, "kmers": kmers}
+    seconds = max(stats["seconds"], 1e-9)
+    if bases:
+        record["bases_per_second"] = bases / seconds
+    if kmers:
+        record["kmers_per_second"] = kmers / seconds
+    return record
+
+
+def _preprocess_files(paths: List[str]) -> None:
+    """Runs FastaPreprocessor.process_file on each file and removes what it writes."""
+    preprocessor = FastaPreprocessor()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for path in paths:
+            processed = preprocessor.process_file(path)
+            if processed != path:
+                os.remove(processed)
+
+
+def bench_engine(panel, engine: str, mode: str, kmer_size: int, repeats: int) -> List[Dict]:
+    """Benchmarks every stage of one engine in one mode."""
+    finder = create_finder(kmer_size, engine)
+    output = sequence_output(finder)
+    run_preprocessor = mode == "preprocessed"
+    paths = [panel.target_path, *panel.background_paths]
+    records = []
+
+    if run_preprocessor:
+        _, stats = measure(lambda: _preprocess_files(paths), repeats)
+        records.append(_record(engine, mode, "preprocess", stats, bases=sum(os.path.getsize(path) for path in paths)))
+
+    def parse():
+        target, merged = load_target(panel.target_path, run_preprocessor, output)
+        return target, merged, load_background(panel.background_paths, run_preprocessor, output)
+
+    (target, merged, background_sequences), stats = measure(parse, repeats)
+    target_bases = sum(len(seq) for seq in target.values())
+    background_bases = sum(len(seq) for seq in background_sequences.values())
+    records.append(_record(engine, mode, "parse", stats, bases=target_bases + background_bases))
+
+    background, stats = measure(lambda: finder.build_background(background_sequences), repeats)
+    background_kmers = sum(max(len(seq) - kmer_size + 1, 0) for seq in background_sequences.values())
+    records.append(_record(engine, mode, "index_build", stats, bases=background_bases, kmers=background_kmers))
+
+    # The best time of each of the finder's stages over the repeats.
+    stage_seconds: Dict[str, float] = {}
+
+    def find():
+        finder.instrumentation = Instrumentation(track_memory=False)
+        table = finder.find_unique_signature_table(target, background)
+        if merged is not None:
+            with finder.instrumentation.stage("merge"):
+                table = merged.to_merged_table(table)
+        stage_records = {record.stage: record for record in finder.instrumentation.records()}
+        for stage, record in stage_records.items():
+            stage_seconds[stage] = min(stage_seconds.get(stage, float("inf")), record.seconds)
+        return table, stage_records
+
+    (table, stage_records), stats = measure(find, repeats)
+    for stage in ("scan", "merge"):
+        record = stage_records[stage]
+        stage_stats = {**stats, "seconds": stage_seconds[stage]}
+        records.append(_record(engine, mode, stage, stage_stats, bases=record.bases, kmers=record.kmers))
+
+    signature_bases = int(table.lengths.sum())
+    serialize = lambda: b"".join(iter_result_json(AnalysisResult(summary="", signatures=[]), table))
+    _, stats = measure(serialize, repeats)
+    records.append(_record(engine, mode, "serialize", stats, bases=signature_bases))
+
+    _, stats = measure(lambda: b"".join(export_signatures(table, "csv")), repeats)
+    records.append(_record(engine, mode, "export_csv", stats, bases=signature_bases))
+
+    for record in records:
+        record["signature_count"] = len(table)
+    return records
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(current: Dict, baseline: Dict) -> None:
+    """Prints each stage's time relative to a baseline run of the same engine and mode."""
+    baseline_seconds = {
+        (record["engine"], record["mode"], record["stage"]): record["seconds"] for record in baseline["results"]
+    }
+    print(f"\nCompared with {baseline.get('git_commit') or 'baseline'}:")
+    if (baseline.get("panel"), baseline.get("kmer_size")) != (current["panel"], current["kmer_size"]):
+        print("Note: the baseline used a different panel or k-mer size.")
+    print(f"{'engine':<12} {'mode':<13} {'stage':<12} {'baseline s':>11} {'current s':>10} {'ratio':>7}")
+    for record in current["results"]:
+        key = (record["engine"], record["mode"], record["stage"])
+        if key in baseline_seconds:
+            ratio = record["seconds"] / max(baseline_seconds[key], 1e-9)
+            print(f"{key[0]:<12} {key[1]:<13} {key[2]:<12} {baseline_seconds[key]:>11.3f} {record['seconds']:>10.3f} {ratio:>6.2f}x")
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_panel_arguments(arg_parser)
+    arg_parser.add_argument("--kmer-size", type=int, default=21, help="The k-mer size of the analysis.")
+    arg_parser.add_argument("--engines", default="packed", help=f"Comma-separated engines: {', '.join(SIGNATURE_ENGINES)}.")
+    arg_parser.add_argument("--modes", default="raw", help=f"Comma-separated modes: {', '.join(MODES)}.")
+    arg_parser.add_argument("--repeats", type=int, default=1, help="Runs per stage; the best time is reported.")
+    arg_parser.add_argument("--output", help="Write the results to this JSON file.")
+    arg_parser.add_argument("--compare", help="A JSON file from an earlier run to compare against.")
+    args = arg_parser.parse_args()
+
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    for engine in engines:
+        if engine not in SIGNATURE_ENGINES:
+            arg_parser.error(f"unknown engine '{engine}'")
+    for mode in modes:
+        if mode not in MODES:
+            arg_parser.error(f"unknown mode '{mode}'")
+
+    spec = spec_from_arguments(args)
+    directory = tempfile.mkdtemp(prefix="isignify_bench_")
+    try:
+        panel = generate_panel(directory, spec)
+        results = []
+        for engine in engines:
+            for mode in modes:
+                records = bench_engine(panel, engine, mode, args.kmer_size, args.repeats)
+                for record in records:
+                    rate = record.get("bases_per_second")
+                    print(
+                        f"{engine:<12} {mode:<13} {record['stage']:<12} {record['seconds']:8.3f} s "
+                        f"{record['peak_rss_increase_bytes'] / 1e6:9.1f} MB"
+                        + (f" {rate / 1e6:9.1f} Mb/s" if rate else ""),
+                        file=sys.stderr,
+                    )
+                results.extend(records)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "git_commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": _environment(),
+        "panel": asdict(spec),
+        "kmer_size": args.kmer_size,
+        "repeats": args.repeats,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
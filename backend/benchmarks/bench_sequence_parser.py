@@ -0,0 +1,82 @@
+"""
+Benchmarks the streaming SequenceParser against the original line-by-line
+parser on a synthetic multi-record FASTA file.
+
+Run from the backend directory:
+    python -m benchmarks.bench_sequence_parser --size-mb 10
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Dict
+
+from src.core.sequence_parser import SequenceParser
+
+
+def legacy_parse(file_path: str) -> Dict[str, str]:
+    """The original SequenceParser.parse, which grows each sequence with +=."""
+    sequences: Dict[str, str] = {}
+    current_sequence_header = ""
+    with open(file_path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('>'):
+                current_sequence_header = line
+                sequences[current_sequence_header] = ""
+            elif current_sequence_header:
+                sequences[current_sequence_header] += line
+    return sequences
+
+
+def write_synthetic_fasta(path: str, size_mb: float, records: int, line_width: int = 80, seed: int = 0) -> None:
+    """Writes a random FASTA file of roughly `size_mb` megabases."""
+    rng = random.Random(seed)
+    bases_per_record = int(size_mb * 1_000_000) // records
+    with open(path, "w") as f:
+        for i in range(records):
+            f.write(f">record_{i} synthetic\n")
+            sequence = "".join(rng.choices("ACGT", k=bases_per_record))
+            for start in range(0, len(sequence), line_width):
+                f.write(sequence[start:start + line_width] + "\n")
+
+
+def _time(label: str, func, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {best:8.3f} s")
+    return best
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--size-mb", type=float, default=10.0, help="Total sequence size in megabases.")
+    arg_parser.add_argument("--records", type=int, default=1, help="Number of FASTA records.")
+    arg_parser.add_argument("--repeats", type=int, default=3, help="Runs per parser; the best time is reported.")
+    args = arg_parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".fna")
+    os.close(fd)
+    try:
+        write_synthetic_fasta(path, args.size_mb, args.records)
+        print(f"{args.size_mb} Mb in {args.records} record(s), {os.path.getsize(path) / 1e6:.1f} MB on disk")
+
+        parser = SequenceParser()
+        assert legacy_parse(path) == parser.parse(path)
+
+        legacy = _time("legacy parse (str +=)", lambda: legacy_parse(path), args.repeats)
+        for output in ("str", "bytes", "array"):
+            seconds = _time(f"streaming parse ({output})", lambda: parser.parse(path, output=output), args.repeats)
+            print(f"{'':<28} {legacy / seconds:8.1f}x faster")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
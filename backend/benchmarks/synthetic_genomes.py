@@ -0,0 +1,132 @@
+"""
+Generates reproducible synthetic genome panels for benchmarks.
+
+A panel is one target genome and several background genomes. Each
+background copies a chosen fraction of the target, in blocks with a few
+point mutations, and fills the rest with random bases, so the amount of
+shared content (and therefore the number of signatures) is controlled.
+
+Run from the backend directory to write a panel to a directory:
+    python -m benchmarks.synthetic_genomes out/ --target-mb 5 --backgrounds 3
+"""
+import argparse
+import os
+from dataclasses import dataclass, field
+from typing import List
+
+import numpy as np
+
+_BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+FASTA_LINE_WIDTH = 80
+
+
+@dataclass
+class PanelSpec:
+    """The settings of a synthetic panel. The same spec always gives the same files."""
+    target_mb: float = 1.0
+    background_mb: float = 1.0
+    background_count: int = 2
+    contigs: int = 1
+    # Fraction of each background copied from the target.
+    shared_fraction: float = 0.5
+    # Length of the copied and random blocks.
+    block_size: int = 10_000
+    # Per-base substitution rate inside copied blocks.
+    mutation_rate: float = 0.001
+    seed: int = 0
+
+
+@dataclass
+class SyntheticPanel:
+    """The FASTA files of a generated panel."""
+    spec: PanelSpec
+    target_path: str
+    background_paths: List[str] = field(default_factory=list)
+
+
+def random_bases(rng: np.random.Generator, length: int) -> np.ndarray:
+    return _BASES[rng.integers(0, 4, length)]
+
+
+def derive_genome(rng: np.random.Generator, source: np.ndarray, length: int, spec: PanelSpec) -> np.ndarray:
+    """
+    A genome of `length` bases made of blocks that are either copied from
+    `source` (with probability `shared_fraction`, plus point mutations) or random.
+    """
+    genome = np.empty(length, dtype=np.uint8)
+    for start in range(0, length, spec.block_size):
+        size = min(spec.block_size, length - start)
+        if len(source) >= size and rng.random() < spec.shared_fraction:
+            offset = int(rng.integers(0, len(source) - size + 1))
+            block = source[offset:offset + size].copy()
+            mutated = np.flatnonzero(rng.random(size) < spec.mutation_rate)
+            block[mutated] = random_bases(rng, len(mutated))
+        else:
+            block = random_bases(rng, size)
+        genome[start:start + size] = block
+    return genome
+
+
+def write_fasta(path: str, genome: np.ndarray, contigs: int, name: str) -> None:
+    """Writes a genome split into `contigs` records of nearly equal length."""
+    bounds = np.linspace(0, len(genome), contigs + 1).astype(np.int64)
+    with open(path, "wb") as f:
+        for i in range(contigs):
+            f.write(f">{name}_contig_{i + 1} synthetic\n".encode("ascii"))
+            record = genome[bounds[i]:bounds[i + 1]].tobytes()
+            for start in range(0, len(record), FASTA_LINE_WIDTH):
+                f.write(record[start:start + FASTA_LINE_WIDTH] + b"\n")
+
+
+def generate_panel(directory: str, spec: PanelSpec) -> SyntheticPanel:
+    """Writes the target and background FASTA files of a panel to a directory."""
+    rng = np.random.default_rng(spec.seed)
+    os.makedirs(directory, exist_ok=True)
+
+    target = random_bases(rng, int(spec.target_mb * 1_000_000))
+    panel = SyntheticPanel(spec, os.path.join(directory, "target.fna"))
+    write_fasta(panel.target_path, target, spec.contigs, "target")
+
+    for i in range(spec.background_count):
+        background = derive_genome(rng, target, int(spec.background_mb * 1_000_000), spec)
+        path = os.path.join(directory, f"background_{i + 1}.fna")
+        write_fasta(path, background, spec.contigs, f"background_{i + 1}")
+        panel.background_paths.append(path)
+    return panel
+
+
+def add_panel_arguments(arg_parser: argparse.ArgumentParser) -> None:
+    """Adds the PanelSpec options to a command-line parser."""
+    defaults = PanelSpec()
+    arg_parser.add_argument("--target-mb", type=float, default=defaults.target_mb, help="Target genome size in megabases.")
+    arg_parser.add_argument("--background-mb", type=float, default=defaults.background_mb, help="Size of each background genome in megabases.")
+    arg_parser.add_argument("--backgrounds", type=int, default=defaults.background_count, help="Number of background genomes.")
+    arg_parser.add_argument("--contigs", type=int, default=defaults.contigs, help="FASTA records per genome.")
+    arg_parser.add_argument("--shared", type=float, default=defaults.shared_fraction, help="Fraction of each background copied from the target.")
+    arg_parser.add_argument("--seed", type=int, default=defaults.seed, help="Random seed.")
+
+
+def spec_from_arguments(args: argparse.Namespace) -> PanelSpec:
+    return PanelSpec(
+        target_mb=args.target_mb,
+        background_mb=args.background_mb,
+        background_count=args.backgrounds,
+        contigs=args.contigs,
+        shared_fraction=args.shared,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("directory", help="Where to write the FASTA files.")
+    add_panel_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    panel = generate_panel(args.directory, spec_from_arguments(args))
+    for path in [panel.target_path, *panel.background_paths]:
+        print(f"{path}  {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
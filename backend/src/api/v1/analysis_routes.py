@@ -1,30 +1,197 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from functools import partial
+from typing import List, Optional
+import json
 
+from src.core.regions import RegionFilter
 from src.services.analysis_service import AnalysisService
+from src.services.genome_loading import ENGINE_FORM_DESCRIPTION
+from src.services.result_export import EXPORT_FORMATS, export_signatures, iter_result_json
+from src.services.uploads import remove_uploads
 from src.models.schemas import AnalysisResult
 
 # Create a new router for our analysis endpoints
 router = APIRouter()
 
+
+def _parse_kmer_sizes(kmer_sizes: str) -> List[int]:
+    """Parses k-mer sizes such as "15,18,21" or "15-31" (every size in the range)."""
+    sizes = []
+    try:
+        for part in kmer_sizes.split(","):
+            if "-" in part:
+                low, high = (int(value) for value in part.split("-", 1))
+                sizes.extend(range(low, high + 1))
+            elif part.strip():
+                sizes.append(int(part))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid k-mer sizes '{kmer_sizes}'. Use e.g. '15,18,21' or '15-31'.")
+    return sizes
+
+
+def region_filter_form(
+    min_length: Optional[int] = Form(None, description="Drop signatures shorter than this many bases."),
+    max_length: Optional[int] = Form(None, description="Drop signatures longer than this many bases."),
+    min_gc: Optional[float] = Form(None, description="Drop signatures whose GC fraction (0 to 1) is below this."),
+    max_gc: Optional[float] = Form(None, description="Drop signatures whose GC fraction (0 to 1) is above this."),
+    max_ambiguous_fraction: Optional[float] = Form(None, description="Drop signatures with a larger fraction (0 to 1) of bases other than A, C, G and T."),
+    top_n: Optional[int] = Form(None, description="Keep only this many of the longest signatures, still in target order."),
+) -> RegionFilter:
+    """The signature filter form fields shared by the analysis endpoints."""
+    try:
+        return RegionFilter(min_length, max_length, min_gc, max_gc, max_ambiguous_fraction, top_n)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/analyze/", response_model=AnalysisResult, tags=["Analysis"])
 async def run_analysis_endpoint(
     kmer_size: int = Form(..., description="The k-mer size for the analysis."),
     run_preprocessor: bool = Form(..., description="Whether to run the multi-contig preprocessor."), # <-- NEW
     target_genome: UploadFile = File(..., description="The target genome file in FASTA format."),
-    background_genomes: List[UploadFile] = File(..., description="One or more background genome files.")
+    background_genomes: List[UploadFile] = File(None, description="One or more background genome files. Not needed when a background index is given."),
+    engine: str = Form("set", description=ENGINE_FORM_DESCRIPTION),
+    background_index_id: Optional[str] = Form(None, description="The ID of a prebuilt background index to use instead of uploaded background genomes."),
+    use_llm: bool = Form(True, description="Whether to summarize the result with the Gemma model. If false, a fast template summary is used."),
+    include_sequence: bool = Form(True, description="Whether to return each signature's bases. If false, only coordinates are returned."),
+    store_result: bool = Form(False, description="Whether to keep the result on the server so its signatures can be paged through with /results/."),
+    include_timings: bool = Form(False, description="Whether to return the time, peak memory and throughput of each analysis stage."),
+    region_filter: RegionFilter = Depends(region_filter_form)
 ):
     """
     Receives genome files and analysis parameters, then returns unique DNA signatures.
+
+    The signatures are encoded straight from the service's columnar result
+    instead of being validated as one model each.
     """
     service = AnalysisService()
     try:
-        result = service.run_analysis(
+        # The analysis is CPU-bound; run it off the event loop so other
+        # clients are not blocked. Use /jobs/ for analyses that take minutes.
+        result = await run_in_threadpool(
+            service.run_analysis,
             target_file=target_genome.file,
-            background_files=[bg_file.file for bg_file in background_genomes],
+            background_files=[bg_file.file for bg_file in background_genomes or []],
             kmer_size=kmer_size,
-            run_preprocessor=run_preprocessor # <-- NEW
+            run_preprocessor=run_preprocessor, # <-- NEW
+            engine=engine,
+            background_index_id=background_index_id,
+            use_llm=use_llm,
+            include_sequence=include_sequence,
+            store_result=store_result,
+            include_timings=include_timings,
+            region_filter=region_filter,
+            columnar=True,
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred during analysis: {str(e)}")
+    return StreamingResponse(iter_result_json(result.result, result.table), media_type="application/json")
+
+
+@router.post("/analyze/stream", tags=["Analysis"])
+async def stream_analysis_endpoint(
+    kmer_size: int = Form(..., description="The k-mer size for the analysis."),
+    run_preprocessor: bool = Form(..., description="Whether to run the multi-contig preprocessor."),
+    target_genome: UploadFile = File(..., description="The target genome file in FASTA format."),
+    background_genomes: List[UploadFile] = File(None, description="One or more background genome files. Not needed when a background index is given."),
+    engine: str = Form("set", description=ENGINE_FORM_DESCRIPTION),
+    background_index_id: Optional[str] = Form(None, description="The ID of a prebuilt background index to use instead of uploaded background genomes."),
+    format: str = Form("ndjson", description="The output format: 'ndjson' (one JSON object per line), 'csv' or 'tsv'."),
+    include_sequence: bool = Form(True, description="Whether to include each signature's bases. If false, only coordinates are written."),
+    region_filter: RegionFilter = Depends(region_filter_form)
+):
+    """
+    Runs an analysis and streams its signatures as they are found, without
+    a summary. The server never holds the full signature list in memory.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Choose one of: {', '.join(EXPORT_FORMATS)}.")
+
+    service = AnalysisService()
+    # The uploads are closed when this request handler returns, so copy them first.
+    try:
+        target_path, background_paths = await run_in_threadpool(
+            service.stage_uploads, target_genome.file, [bg_file.file for bg_file in background_genomes or []]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cleanup = partial(remove_uploads, [target_path, *background_paths])
+
+    try:
+        # Loading and index building happen here, so input errors still get a proper status code.
+        signatures = await run_in_threadpool(
+            service.iter_signatures_on_paths,
+            target_path, background_paths, kmer_size, run_preprocessor,
+            engine=engine, background_index_id=background_index_id, include_sequence=include_sequence,
+            region_filter=region_filter,
         )
-        return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An error occurred during analysis: {str(e)}")
\ No newline at end of file
+        cleanup()
+        if isinstance(e, FileNotFoundError):
+            raise HTTPException(status_code=404, detail=str(e))
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"An error occurred during analysis: {str(e)}")
+
+    def body():
+        try:
+            yield from export_signatures(signatures, format, include_sequence)
+        finally:
+            cleanup()
+
+    headers = {"Content-Disposition": f"attachment; filename=isignify_results.{format}"} if format in ("csv", "tsv") else None
+    # StreamingResponse iterates a sync generator in a worker thread, so the scan does not block the event loop.
+    return StreamingResponse(body(), media_type=EXPORT_FORMATS[format], headers=headers)
+
+
+@router.post("/analyze/sweep", tags=["Analysis"])
+async def sweep_analysis_endpoint(
+    kmer_sizes: str = Form(..., description="The k-mer sizes to report, e.g. '15,18,21,25,31' or '15-31'. Not limited to 32."),
+    run_preprocessor: bool = Form(..., description="Whether to run the multi-contig preprocessor."),
+    target_genome: UploadFile = File(..., description="The target genome file in FASTA format."),
+    background_genomes: List[UploadFile] = File(..., description="One or more background genome files."),
+    include_sequence: bool = Form(True, description="Whether to include each signature's bases. If false, only coordinates are written.")
+):
+    """
+    Finds unique signatures for several k-mer sizes at once from a single
+    suffix array over the target and backgrounds.
+
+    Results are streamed as newline-delimited JSON, one object per k-mer
+    size: {"kmer_size", "signatures"}.
+    """
+    sizes = _parse_kmer_sizes(kmer_sizes)
+    service = AnalysisService()
+    # The uploads are closed when this request handler returns, so copy them first.
+    try:
+        target_path, background_paths = await run_in_threadpool(
+            service.stage_uploads, target_genome.file, [bg_file.file for bg_file in background_genomes]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cleanup = partial(remove_uploads, [target_path, *background_paths])
+
+    try:
+        results = await run_in_threadpool(
+            service.iter_sweep_on_paths, target_path, background_paths, sizes, run_preprocessor,
+            include_sequence=include_sequence,
+        )
+    except Exception as e:
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"An error occurred during analysis: {str(e)}")
+    finally:
+        # The suffix array has been built, so the files are no longer needed.
+        cleanup()
+
+    def body():
+        for result in results:
+            yield (json.dumps(result) + "\n").encode("utf-8")
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
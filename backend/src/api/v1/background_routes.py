@@ -0,0 +1,79 @@
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from typing import Callable, List
+
+from src.services.analysis_service import AnalysisService
+from src.models.schemas import UpdatableBackgroundInfo
+
+# Create a new router for the updatable background (admin) endpoints
+router = APIRouter()
+
+
+async def _call(action: Callable, *args):
+    """Runs a service call off the event loop, mapping its errors to HTTP responses."""
+    try:
+        return await run_in_threadpool(action, *args)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred while updating the background: {str(e)}")
+
+
+@router.post("/admin/backgrounds/", response_model=UpdatableBackgroundInfo, status_code=201, tags=["Admin"])
+async def create_background_endpoint(
+    name: str = Form(..., description="A name for the background, e.g. 'enterobacteriaceae'."),
+    kmer_size: int = Form(..., description="The k-mer size of the background (1 to 32)."),
+    run_preprocessor: bool = Form(False, description="Whether genomes added later are merged by the multi-contig preprocessor."),
+):
+    """
+    Creates an empty updatable background panel. Add genomes one at a time,
+    then pass its name as the background_index_id of an analysis.
+    """
+    return await _call(AnalysisService().create_updatable_background, name, kmer_size, run_preprocessor)
+
+
+@router.get("/admin/backgrounds/", response_model=List[UpdatableBackgroundInfo], tags=["Admin"])
+async def list_backgrounds_endpoint():
+    """
+    Lists every updatable background panel.
+    """
+    return await _call(AnalysisService().list_updatable_backgrounds)
+
+
+@router.get("/admin/backgrounds/{name}", response_model=UpdatableBackgroundInfo, tags=["Admin"])
+async def get_background_endpoint(name: str):
+    """
+    Describes an updatable background panel and its genomes.
+    """
+    return await _call(AnalysisService().get_updatable_background, name)
+
+
+@router.delete("/admin/backgrounds/{name}", status_code=204, tags=["Admin"])
+async def delete_background_endpoint(name: str):
+    """
+    Deletes an updatable background panel.
+    """
+    await _call(AnalysisService().delete_updatable_background, name)
+
+
+@router.post("/admin/backgrounds/{name}/genomes", response_model=UpdatableBackgroundInfo, tags=["Admin"])
+async def add_genome_endpoint(
+    name: str,
+    genome: UploadFile = File(..., description="The genome file to add, in FASTA format."),
+):
+    """
+    Adds a genome to an updatable background. Only the new genome is indexed,
+    and analyses use it as soon as this request returns.
+    """
+    return await _call(AnalysisService().add_background_genome, name, genome.file, genome.filename or "genome")
+
+
+@router.delete("/admin/backgrounds/{name}/genomes/{genome_id}", response_model=UpdatableBackgroundInfo, tags=["Admin"])
+async def remove_genome_endpoint(name: str, genome_id: str):
+    """
+    Removes a genome, by the genome_id returned when it was added, from an
+    updatable background.
+    """
+    return await _call(AnalysisService().remove_background_genome, name, genome_id)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+
+from src.services.result_cache import result_cache
+from src.models.schemas import CacheStats
+
+# Create a new router for the result cache endpoints
+router = APIRouter()
+
+
+@router.get("/cache/stats", response_model=CacheStats, tags=["Cache"])
+async def cache_stats_endpoint():
+    """
+    Returns the result cache's hit and miss counters and the size of each tier.
+    """
+    return result_cache.stats()
+
+
+@router.delete("/cache/", response_model=CacheStats, tags=["Cache"])
+async def clear_cache_endpoint():
+    """
+    Empties the result cache, in memory and on disk, and returns its stats.
+    """
+    result_cache.clear()
+    return result_cache.stats()
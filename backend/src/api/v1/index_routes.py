@@ -0,0 +1,49 @@
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
+
+from src.services.analysis_service import AnalysisService
+from src.models.schemas import BackgroundIndexInfo
+
+# Create a new router for the background index endpoints
+router = APIRouter()
+
+@router.post("/indexes/", response_model=BackgroundIndexInfo, tags=["Background Indexes"])
+async def build_index_endpoint(
+    kmer_size: int = Form(..., description="The k-mer size the index is built for."),
+    run_preprocessor: bool = Form(..., description="Whether to run the multi-contig preprocessor."),
+    background_genomes: List[UploadFile] = File(..., description="One or more background genome files."),
+    index_type: str = Form("exact", description="'exact', or 'bloom' for an approximate Bloom filter with bounded memory."),
+    false_positive_rate: Optional[float] = Form(None, description="Bloom filter only: the target false-positive rate."),
+    max_memory_mb: Optional[float] = Form(None, description="Bloom filter only: the most memory the filter may use, in MB.")
+):
+    """
+    Builds a persistent background k-mer index that later analyses can reference
+    by ID instead of re-uploading the background genomes.
+
+    Analyses against a Bloom filter index can also upload the background
+    genomes to have candidate regions re-checked exactly.
+    """
+    service = AnalysisService()
+    try:
+        # Parsing the genomes and building the index would block the event loop.
+        return await run_in_threadpool(
+            service.build_background_index,
+            background_files=[bg_file.file for bg_file in background_genomes],
+            kmer_size=kmer_size,
+            run_preprocessor=run_preprocessor,
+            index_type=index_type,
+            false_positive_rate=false_positive_rate,
+            max_bytes=int(max_memory_mb * 1_000_000) if max_memory_mb else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred while building the index: {str(e)}")
+
+@router.get("/indexes/", response_model=List[BackgroundIndexInfo], tags=["Background Indexes"])
+async def list_indexes_endpoint():
+    """
+    Lists every prebuilt background index.
+    """
+    return AnalysisService().list_background_indexes()
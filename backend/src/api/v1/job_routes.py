@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from functools import partial
+from typing import List, Optional
+
+from src.api.v1.analysis_routes import region_filter_form
+from src.core.regions import RegionFilter
+from src.services.analysis_service import ANALYSIS_STAGES, AnalysisService
+from src.services.genome_loading import ENGINE_FORM_DESCRIPTION
+from src.services.job_manager import Job, QueueFullError, job_manager
+from src.services.result_export import iter_result_json
+from src.services.uploads import remove_uploads
+from src.models.schemas import AnalysisResult, JobStatus
+
+# Create a new router for the background job endpoints
+router = APIRouter()
+
+
+def _get_job(job_id: str) -> Job:
+    try:
+        return job_manager.get(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' was not found.")
+
+
+@router.post("/jobs/", response_model=JobStatus, status_code=202, tags=["Jobs"])
+async def submit_job_endpoint(
+    kmer_size: int = Form(..., description="The k-mer size for the analysis."),
+    run_preprocessor: bool = Form(..., description="Whether to run the multi-contig preprocessor."),
+    target_genome: UploadFile = File(..., description="The target genome file in FASTA format."),
+    background_genomes: List[UploadFile] = File(None, description="One or more background genome files. Not needed when a background index is given."),
+    engine: str = Form("set", description=ENGINE_FORM_DESCRIPTION),
+    background_index_id: Optional[str] = Form(None, description="The ID of a prebuilt background index to use instead of uploaded background genomes."),
+    use_llm: bool = Form(True, description="Whether to summarize the result with the Gemma model."),
+    include_sequence: bool = Form(True, description="Whether to return each signature's bases. If false, only coordinates are returned."),
+    include_timings: bool = Form(False, description="Whether to return the time, peak memory and throughput of each analysis stage."),
+    region_filter: RegionFilter = Depends(region_filter_form)
+):
+    """
+    Queues an analysis and returns its job ID immediately. Poll the job's
+    status and fetch the result once it has succeeded. The result is also
+    stored for paging; see its result_id.
+    """
+    service = AnalysisService()
+    # The uploads are closed when this request ends, so copy them first.
+    try:
+        target_path, background_paths = await run_in_threadpool(
+            service.stage_uploads, target_genome.file, [bg_file.file for bg_file in background_genomes or []]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cleanup = partial(remove_uploads, [target_path, *background_paths])
+
+    def run(progress):
+        progress("upload", 1.0)
+        return service.run_analysis_on_paths(
+            target_path, background_paths, kmer_size, run_preprocessor,
+            engine=engine, background_index_id=background_index_id, use_llm=use_llm, progress=progress,
+            include_sequence=include_sequence, store_result=True, include_timings=include_timings,
+            region_filter=region_filter, columnar=True,
+        )
+
+    try:
+        job = job_manager.submit(run, stages=ANALYSIS_STAGES, on_finish=cleanup)
+    except QueueFullError as e:
+        cleanup()
+        raise HTTPException(status_code=503, detail=str(e))
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus, tags=["Jobs"])
+async def job_status_endpoint(job_id: str):
+    """
+    Returns a job's status, current stage and overall progress (0 to 1).
+    """
+    return _get_job(job_id).to_dict()
+
+
+@router.get("/jobs/{job_id}/result", response_model=AnalysisResult, tags=["Jobs"])
+async def job_result_endpoint(job_id: str):
+    """
+    Returns the result of a job that has succeeded.
+    """
+    job = _get_job(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"An error occurred during analysis: {job.error}")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is {job.status}; no result is available.")
+    return StreamingResponse(iter_result_json(job.result.result, job.result.table), media_type="application/json")
+
+
+@router.delete("/jobs/{job_id}", response_model=JobStatus, tags=["Jobs"])
+async def cancel_job_endpoint(job_id: str):
+    """
+    Cancels a queued or running job.
+    """
+    _get_job(job_id)
+    return job_manager.cancel(job_id).to_dict()
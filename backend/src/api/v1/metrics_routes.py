@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.services.metrics import metrics
+from src.services.result_cache import result_cache
+
+# Create a new router for the Prometheus metrics endpoint
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, tags=["Metrics"])
+async def metrics_endpoint():
+    """
+    Returns the per-stage timing, throughput and memory metrics of finished
+    analyses, and the result cache counters, in the Prometheus text format.
+    """
+    body = metrics.render({
+        "isignify_result_cache_hits_total": ("Analyses answered from the result cache.", result_cache.hits),
+        "isignify_result_cache_misses_total": ("Analyses not found in the result cache.", result_cache.misses),
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,93 @@
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from functools import partial
+from typing import List, Optional
+import json
+import os
+
+from src.services.analysis_service import AnalysisService
+from src.services.uploads import remove_uploads
+
+# Create a new router for the panel (all-vs-all) endpoints
+router = APIRouter()
+
+# File extensions stripped from upload names to get genome names.
+_FASTA_EXTENSIONS = (".gz", ".fasta", ".fna", ".fa", ".ffn", ".txt")
+
+
+def _genome_names(filenames: List[Optional[str]]) -> List[str]:
+    """Names each genome after its file, adding a suffix to repeated names."""
+    names = []
+    for i, filename in enumerate(filenames):
+        name = os.path.basename(filename or "") or f"genome_{i + 1}"
+        while name.lower().endswith(_FASTA_EXTENSIONS) and "." in name[1:]:
+            name = name.rsplit(".", 1)[0]
+        unique_name, suffix = name, 2
+        while unique_name in names:
+            unique_name = f"{name}_{suffix}"
+            suffix += 1
+        names.append(unique_name)
+    return names
+
+
+def _parse_groups(groups: Optional[str]) -> List[List[str]]:
+    if not groups:
+        return []
+    try:
+        parsed = json.loads(groups)
+    except json.JSONDecodeError:
+        parsed = None
+    if not isinstance(parsed, list) or not all(
+        isinstance(group, list) and group and all(isinstance(name, str) for name in group) for group in parsed
+    ):
+        raise HTTPException(status_code=400, detail='groups must be a JSON list of lists of genome names, e.g. [["bsub", "bamy"]].')
+    return parsed
+
+
+@router.post("/panel/", tags=["Panel"])
+async def panel_analysis_endpoint(
+    kmer_size: int = Form(..., description="The k-mer size for the analysis (at most 32)."),
+    run_preprocessor: bool = Form(..., description="Whether to run the multi-contig preprocessor."),
+    genomes: List[UploadFile] = File(..., description="Every genome of the panel, in FASTA format. Each is named after its file."),
+    groups: Optional[str] = Form(None, description='Optional subgroups as a JSON list of lists of genome names, e.g. [["bsub", "bamy"]]. For each, the regions shared by the whole group and absent from the rest are also returned.'),
+    include_sequence: bool = Form(True, description="Whether to include each signature's bases. If false, only coordinates are written.")
+):
+    """
+    Finds the unique signatures of every genome in a panel in one analysis,
+    from a single k-mer occurrence table built over the whole panel.
+
+    Results are streamed as newline-delimited JSON, one object per genome
+    (and per group member): {"genome", "group", "signatures"}.
+    """
+    group_list = _parse_groups(groups)
+    names = _genome_names([genome.filename for genome in genomes])
+
+    service = AnalysisService()
+    # The uploads are closed when this request handler returns, so copy them first.
+    try:
+        paths = await run_in_threadpool(service.stage_panel_uploads, [genome.file for genome in genomes])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cleanup = partial(remove_uploads, paths)
+
+    try:
+        results = await run_in_threadpool(
+            service.iter_panel_results, paths, names, kmer_size, run_preprocessor,
+            groups=group_list, include_sequence=include_sequence,
+        )
+    except Exception as e:
+        cleanup()
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"An error occurred during analysis: {str(e)}")
+
+    def body():
+        try:
+            for result in results:
+                yield (json.dumps(result) + "\n").encode("utf-8")
+        finally:
+            cleanup()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from typing import Optional
+
+from src import config
+from src.core.signature_table import SignatureTable
+from src.services.result_export import EXPORT_FORMATS, export_signatures, iter_result_json
+from src.services.result_store import StoredResult, result_store
+from src.models.schemas import Signature, SignaturePage
+
+# Create a new router for the stored result endpoints
+router = APIRouter()
+
+
+def _get_result(result_id: str) -> StoredResult:
+    try:
+        return result_store.get(result_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Result '{result_id}' was not found or has expired.")
+
+
+@router.get("/results/{result_id}/signatures", response_model=SignaturePage, tags=["Results"])
+async def result_page_endpoint(
+    result_id: str,
+    cursor: Optional[str] = Query(None, description="The next_cursor of the previous page. Omit for the first page."),
+    limit: int = Query(1000, ge=1, description="The maximum number of signatures on the page."),
+    include_sequence: bool = Query(True, description="Whether to return each signature's bases."),
+):
+    """
+    Returns one page of the signatures of a stored analysis result.
+    """
+    try:
+        result, signatures, next_cursor = result_store.page(result_id, cursor, min(limit, config.RESULT_PAGE_MAX_SIZE))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Result '{result_id}' was not found or has expired.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if isinstance(signatures, SignatureTable):
+        page = SignaturePage(result_id=result_id, total=len(result.signatures), signatures=[], next_cursor=next_cursor)
+        return Response(b"".join(iter_result_json(page, signatures, include_sequence)), media_type="application/json")
+    return SignaturePage(
+        result_id=result_id,
+        total=len(result.signatures),
+        signatures=[Signature(**sig) if include_sequence else Signature(**{**sig, 'sequence': None}) for sig in signatures],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/results/{result_id}/export", tags=["Results"])
+async def result_export_endpoint(
+    result_id: str,
+    format: str = Query("csv", description="The output format: 'csv', 'tsv' or 'ndjson'."),
+    include_sequence: bool = Query(True, description="Whether to include each signature's bases."),
+):
+    """
+    Streams every signature of a stored result as CSV, TSV or NDJSON.
+    """
+    result = _get_result(result_id)
+    try:
+        body = export_signatures(result.signatures, format, include_sequence)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"Content-Disposition": f"attachment; filename=isignify_results.{format}"} if format in ("csv", "tsv") else None
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[format], headers=headers)
@@ -0,0 +1,88 @@
+"""
+Finds signatures for a batch of local target genomes, without the API.
+
+Every FASTA file of --targets (or every line of --manifest) is analysed
+against the --background genomes, and one output file per target is
+written to --output-dir. Running the same command again after an
+interruption skips the targets that already have an up-to-date output.
+
+Run from the backend directory:
+    python -m src.cli --targets genomes/ --background bg1.fna.gz bg2.fna.gz --output-dir out/ --kmer-size 21
+    python -m src.cli --manifest targets.tsv --background-dir backgrounds/ --output-dir out/ --format npz
+
+Manifest lines are tab-separated: target path, then optionally a name and
+comma-separated background paths for that target.
+"""
+import argparse
+import os
+import sys
+
+from src.core.regions import RegionFilter
+from src.services.analysis_service import SIGNATURE_ENGINES
+from src.services.batch_runner import OUTPUT_FORMATS, BatchRunner, discover_targets, is_fasta_path, read_manifest
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = arg_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--targets", help="A directory whose FASTA files (optionally gzipped) are the targets.")
+    source.add_argument("--manifest", help="A file listing the targets, one per line.")
+    arg_parser.add_argument("--background", nargs="+", default=[], help="Background genome files.")
+    arg_parser.add_argument("--background-dir", help="A directory whose FASTA files are all background genomes.")
+    arg_parser.add_argument("--output-dir", required=True, help="Where to write one output file per target.")
+    arg_parser.add_argument("--kmer-size", type=int, default=21, help="The k-mer size of the analysis.")
+    arg_parser.add_argument("--engine", default="packed", choices=list(SIGNATURE_ENGINES), help="The k-mer engine.")
+    arg_parser.add_argument("--preprocess", action="store_true", help="Merge multi-contig genomes first.")
+    arg_parser.add_argument("--format", default="tsv", choices=OUTPUT_FORMATS, help="The output format.")
+    arg_parser.add_argument("--include-sequence", action="store_true", help="Write each signature's bases.")
+    arg_parser.add_argument("--workers", type=int, help="Worker processes of the packed engines.")
+    arg_parser.add_argument("--prefetch", type=int, default=2, help="Targets parsed ahead of the one being scanned.")
+    arg_parser.add_argument("--min-length", type=int, help="Drop signatures shorter than this.")
+    arg_parser.add_argument("--max-length", type=int, help="Drop signatures longer than this.")
+    arg_parser.add_argument("--min-gc", type=float, help="Drop signatures whose GC fraction is below this.")
+    arg_parser.add_argument("--max-gc", type=float, help="Drop signatures whose GC fraction is above this.")
+    arg_parser.add_argument("--max-ambiguous-fraction", type=float, help="Drop signatures with more non-ACGT bases than this fraction.")
+    arg_parser.add_argument("--top-n", type=int, help="Keep only this many of the longest signatures per target.")
+    args = arg_parser.parse_args(argv)
+
+    background = list(args.background)
+    if args.background_dir:
+        background.extend(sorted(
+            os.path.join(args.background_dir, name) for name in os.listdir(args.background_dir) if is_fasta_path(name)
+        ))
+
+    def log(message: str) -> None:
+        print(message, file=sys.stderr)
+
+    try:
+        region_filter = RegionFilter(
+            args.min_length, args.max_length, args.min_gc, args.max_gc, args.max_ambiguous_fraction, args.top_n
+        )
+        targets = read_manifest(args.manifest, background) if args.manifest else discover_targets(args.targets, background)
+        runner = BatchRunner(
+            args.output_dir,
+            args.kmer_size,
+            engine=args.engine,
+            run_preprocessor=args.preprocess,
+            output_format=args.format,
+            include_sequence=args.include_sequence,
+            region_filter=region_filter,
+            workers=args.workers,
+            prefetch=args.prefetch,
+            log=log,
+        )
+        report = runner.run(targets)
+    except (ValueError, OSError) as e:
+        arg_parser.error(str(e))
+
+    log(f"{len(report.completed)} completed, {len(report.skipped)} already done, {len(report.failed)} failed.")
+    for record in runner.instrumentation.records():
+        rate = f", {record.bases_per_second / 1e6:.1f} Mb/s" if record.bases_per_second else ""
+        log(f"  {record.stage:<12} {record.seconds:8.2f} s{rate}")
+    for name, error in report.failed.items():
+        log(f"  failed: {name}: {error}")
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Runtime settings for the iSignify backend.
+
+Every setting can be overridden with an environment variable of the same
+name prefixed with ISIGNIFY_ (e.g. ISIGNIFY_INDEX_DIR).
+"""
+import os
+import tempfile
+
+
+def _env(name: str, default: str) -> str:
+    return os.environ.get(f"ISIGNIFY_{name}", default)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return _env(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Directory where prebuilt background k-mer indexes are stored.
+INDEX_DIR = _env("INDEX_DIR", os.path.join(tempfile.gettempdir(), "isignify", "indexes"))
+
+# Directory where updatable background panels, which genomes can be added
+# to and removed from one at a time, are stored.
+UPDATABLE_BACKGROUND_DIR = _env(
+    "UPDATABLE_BACKGROUND_DIR", os.path.join(tempfile.gettempdir(), "isignify", "backgrounds")
+)
+
+# Number of worker processes the packed k-mer engine uses to build
+# backgrounds and scan targets. 1 keeps all work in the request process.
+# The API starts one pool of this many processes, shared by every request.
+WORKERS = int(_env("WORKERS", "1"))
+
+# Summary language model. With LLM_ENABLED off, every analysis uses the
+# template summary and torch/transformers are never imported.
+LLM_ENABLED = _env_bool("LLM_ENABLED", True)
+LLM_MODEL = _env("LLM_MODEL", "google/gemma-2b")
+# "none", "8bit" or "4bit" (bitsandbytes quantization).
+LLM_QUANTIZATION = _env("LLM_QUANTIZATION", "none")
+# Load the model when the server starts instead of on the first request.
+LLM_WARMUP = _env_bool("LLM_WARMUP", False)
+# Release the model after this many idle seconds. 0 keeps it loaded.
+LLM_IDLE_UNLOAD_SECONDS = float(_env("LLM_IDLE_UNLOAD_SECONDS", "0"))
+
+# The approximate "bloom" engine: the filter's target false-positive rate,
+# its memory cap in bytes (0 for no cap), and whether candidate regions are
+# re-checked exactly against the background genomes.
+BLOOM_FALSE_POSITIVE_RATE = float(_env("BLOOM_FALSE_POSITIVE_RATE", "0.001"))
+BLOOM_MAX_BYTES = int(_env("BLOOM_MAX_BYTES", "0"))
+BLOOM_EXACT_RECHECK = _env_bool("BLOOM_EXACT_RECHECK", True)
+
+# The exact prefilter: backgrounds built by the set and packed engines, and
+# exact background indexes, get a minimizer sketch with this window (in
+# k-mers), and the target stretches it proves shared skip the k-mer lookup.
+# Results are unchanged. An index keeps the sketch it was built with; turning
+# the prefilter off stops stored sketches from being used.
+PREFILTER_ENABLED = _env_bool("PREFILTER_ENABLED", False)
+PREFILTER_WINDOW = int(_env("PREFILTER_WINDOW", "16"))
+
+# The largest k-mer size the suffix array engine and k-mer sweeps accept.
+SUFFIX_MAX_KMER_SIZE = int(_env("SUFFIX_MAX_KMER_SIZE", "4096"))
+
+# The out-of-core "partitioned" engine: the working memory it sizes its
+# buckets and chunks for, and where the bucket files are written (empty for
+# the system temporary directory).
+PARTITION_MEMORY_LIMIT_MB = int(_env("PARTITION_MEMORY_LIMIT_MB", "1024"))
+PARTITION_DIR = _env("PARTITION_DIR", "")
+
+# Background analysis jobs: how many run at once, how many more may wait
+# in the queue, and how long finished jobs are kept for their results.
+JOB_WORKERS = int(_env("JOB_WORKERS", "2"))
+JOB_QUEUE_DEPTH = int(_env("JOB_QUEUE_DEPTH", "16"))
+JOB_RETENTION_SECONDS = float(_env("JOB_RETENTION_SECONDS", "3600"))
+
+# Uploads are copied to disk in chunks of this many bytes.
+UPLOAD_CHUNK_SIZE = int(_env("UPLOAD_CHUNK_SIZE", str(1 << 20)))
+# Parse uploaded genomes straight from the request stream instead of
+# copying them to temporary files first.
+STREAM_UPLOADS = _env_bool("STREAM_UPLOADS", False)
+
+# Stored analysis results, paged through with GET /results/{id}/signatures:
+# how many are kept at once and for how long.
+RESULT_STORE_MAX_RESULTS = int(_env("RESULT_STORE_MAX_RESULTS", "32"))
+RESULT_STORE_TTL_SECONDS = float(_env("RESULT_STORE_TTL_SECONDS", "3600"))
+# The largest page of signatures a client may request at once.
+RESULT_PAGE_MAX_SIZE = int(_env("RESULT_PAGE_MAX_SIZE", "10000"))
+
+# Results cached by the content of their inputs, so a resubmitted analysis
+# is answered without running it again: whether caching is on, the memory
+# the cached results may use, and an optional directory (empty for none)
+# with its own size cap for a second, on-disk tier.
+RESULT_CACHE_ENABLED = _env_bool("RESULT_CACHE_ENABLED", True)
+RESULT_CACHE_MAX_BYTES = int(_env("RESULT_CACHE_MAX_BYTES", str(256 << 20)))
+RESULT_CACHE_DIR = _env("RESULT_CACHE_DIR", "")
+RESULT_CACHE_DISK_MAX_BYTES = int(_env("RESULT_CACHE_DISK_MAX_BYTES", str(2 << 30)))
+
+# Per-stage timing, memory and throughput of analyses, exported at /metrics.
+# With METRICS_ENABLED off, stages are only measured for analyses that ask
+# for a timing breakdown. METRICS_TRACK_MEMORY also records each stage's
+# peak RSS; it is off by default, as every stage then resets and reads the
+# process's memory counters.
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+METRICS_TRACK_MEMORY = _env_bool("METRICS_TRACK_MEMORY", False)
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Callable, Dict, Iterable, List, Optional, Union
+import numpy as np
+
+from src.core.bloom_filter import BloomBackground
+from src.core.minimizer_sketch import MinimizerSketch
+from src.core.packed_signature_finder import PackedKmerSet
+
+_INDEX_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+_CODES_FILE = "codes.npy"
+_AMBIGUOUS_FILE = "ambiguous.txt"
+_METADATA_FILE = "metadata.json"
+_BLOOM_FILE = "bloom.npz"
+
+
+class BackgroundIndex(PackedKmerSet):
+    """
+    A background k-mer set persisted on disk.
+
+    The sorted k-mer codes are stored as a .npy file and opened with mmap, so
+    an index can be queried without loading it into Python objects. Each
+    index lives in its own directory named after a content hash of its inputs.
+
+    An index directory can instead hold an approximate BloomBackground
+    (metadata "index_type": "bloom"); `open` returns whichever kind is stored.
+
+    An exact index saved with a MinimizerSketch keeps it next to the codes,
+    memory-mapped the same way, so every query of the index reuses it.
+    """
+
+    def __init__(self, index_id: str, kmer_size: int, codes: np.ndarray, ambiguous_kmers, metadata: Dict):
+        super().__init__(kmer_size, codes, ambiguous_kmers)
+        self.index_id = index_id
+        self.metadata = metadata
+
+    @staticmethod
+    def compute_id(content_hashes: Iterable[str], kmer_size: int, run_preprocessor: bool, options: Optional[Dict] = None) -> str:
+        """
+        Computes the index ID for a set of background genomes.
+
+        Args:
+            content_hashes: The SHA-256 hex digest of each background file.
+                            Their order does not matter.
+            kmer_size: The k-mer size the index is built for.
+            run_preprocessor: Whether the genomes were merged by the preprocessor.
+            options: Settings of non-exact indexes, e.g. a Bloom filter's
+                     false-positive rate. Exact indexes pass None.
+
+        Returns:
+            A SHA-256 hex digest identifying the index.
+        """
+        key = {
+            "kmer_size": kmer_size,
+            "run_preprocessor": run_preprocessor,
+            "inputs": sorted(content_hashes),
+        }
+        if options:
+            key["options"] = options
+        key = json.dumps(key, sort_keys=True)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _index_path(index_dir: str, index_id: str) -> str:
+        if not _INDEX_ID_PATTERN.match(index_id):
+            raise ValueError(f"Invalid background index ID '{index_id}'.")
+        return os.path.join(index_dir, index_id)
+
+    @classmethod
+    def exists(cls, index_dir: str, index_id: str) -> bool:
+        """Returns True if a complete index with this ID is on disk."""
+        return os.path.exists(os.path.join(cls._index_path(index_dir, index_id), _METADATA_FILE))
+
+    @classmethod
+    def save(cls, kmer_set: PackedKmerSet, index_dir: str, index_id: str, metadata: Optional[Dict] = None) -> "BackgroundIndex":
+        """
+        Writes a PackedKmerSet, and its sketch if it has one, to disk and
+        returns it reopened as a BackgroundIndex.
+
+        The index is written to a temporary directory first and then renamed,
+        so readers never see a partially written index.
+        """
+        def write_files(staging_path: str) -> None:
+            np.save(os.path.join(staging_path, _CODES_FILE), np.ascontiguousarray(kmer_set.codes, dtype=np.uint64))
+            with open(os.path.join(staging_path, _AMBIGUOUS_FILE), "w") as f:
+                for kmer in sorted(kmer_set.ambiguous_kmers):
+                    f.write(kmer + "\n")
+            if kmer_set.sketch is not None:
+                kmer_set.sketch.save(staging_path)
+
+        metadata = dict(metadata or {})
+        metadata.update({"kmer_size": kmer_set.kmer_size, "kmer_count": len(kmer_set)})
+        if kmer_set.sketch is not None:
+            metadata["sketch_window"] = kmer_set.sketch.window
+        cls._write(index_dir, index_id, metadata, write_files)
+        return cls.open(index_dir, index_id)
+
+    def add_sketch(self, sketch: MinimizerSketch) -> None:
+        """
+        Stores a sketch with an index that was built without one. Readers see
+        the sketch once all of its files are in place.
+        """
+        path = os.path.dirname(self.codes_path)
+        sketch.save(path)
+        self.metadata = {**self.metadata, "sketch_window": sketch.window}
+        fd, partial_path = tempfile.mkstemp(prefix=f".{_METADATA_FILE}.", dir=path)
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.metadata, f)
+        os.replace(partial_path, os.path.join(path, _METADATA_FILE))
+        self.sketch = MinimizerSketch.load(path)
+
+    @classmethod
+    def save_bloom(cls, background: BloomBackground, index_dir: str, index_id: str, metadata: Optional[Dict] = None) -> BloomBackground:
+        """
+        Writes a BloomBackground to disk, in the same layout and just as
+        atomically as `save`, and returns it reopened.
+        """
+        metadata = dict(metadata or {})
+        metadata.update({
+            "index_type": "bloom",
+            "kmer_size": background.kmer_size,
+            "kmer_count": len(background),
+            "false_positive_rate": background.bloom.false_positive_rate(),
+            "size_bytes": background.bloom.size_bytes,
+        })
+        cls._write(index_dir, index_id, metadata, lambda staging_path: background.save(os.path.join(staging_path, _BLOOM_FILE)))
+        return cls.open(index_dir, index_id)
+
+    @classmethod
+    def _write(cls, index_dir: str, index_id: str, metadata: Dict, write_files: Callable[[str], None]) -> None:
+        """Writes an index directory through a staging directory that is renamed into place."""
+        final_path = cls._index_path(index_dir, index_id)
+        os.makedirs(index_dir, exist_ok=True)
+        metadata = {**metadata, "index_id": index_id}
+
+        staging_path = tempfile.mkdtemp(prefix=f".{index_id}.", dir=index_dir)
+        try:
+            write_files(staging_path)
+            with open(os.path.join(staging_path, _METADATA_FILE), "w") as f:
+                json.dump(metadata, f)
+            try:
+                os.rename(staging_path, final_path)
+            except OSError:
+                # Another request finished building the same index first.
+                shutil.rmtree(staging_path, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging_path, ignore_errors=True)
+            raise
+
+    @classmethod
+    def open(cls, index_dir: str, index_id: str) -> Union["BackgroundIndex", BloomBackground]:
+        """
+        Opens an index from disk. The k-mer codes are memory-mapped, not read.
+        Bloom filter indexes are loaded into memory and returned as a BloomBackground.
+
+        Raises:
+            FileNotFoundError: If no index with this ID exists.
+        """
+        path = cls._index_path(index_dir, index_id)
+        if not cls.exists(index_dir, index_id):
+            raise FileNotFoundError(f"Background index '{index_id}' was not found.")
+
+        with open(os.path.join(path, _METADATA_FILE)) as f:
+            metadata = json.load(f)
+        if metadata.get("index_type") == "bloom":
+            background = BloomBackground.load(os.path.join(path, _BLOOM_FILE))
+            background.metadata = metadata
+            return background
+
+        codes_path = os.path.join(path, _CODES_FILE)
+        codes = np.load(codes_path, mmap_mode="r")
+        with open(os.path.join(path, _AMBIGUOUS_FILE)) as f:
+            ambiguous_kmers = {line.rstrip("\n") for line in f if line.strip()}
+        index = cls(index_id, metadata["kmer_size"], codes, ambiguous_kmers, metadata)
+        index.codes_path = codes_path
+        if MinimizerSketch.exists(path):
+            index.sketch = MinimizerSketch.load(path)
+        return index
+
+    @classmethod
+    def list_metadata(cls, index_dir: str) -> List[Dict]:
+        """Returns the metadata of every index stored in a directory."""
+        if not os.path.isdir(index_dir):
+            return []
+        indexes = []
+        for name in sorted(os.listdir(index_dir)):
+            metadata_path = os.path.join(index_dir, name, _METADATA_FILE)
+            if _INDEX_ID_PATTERN.match(name) and os.path.exists(metadata_path):
+                with open(metadata_path) as f:
+                    indexes.append(json.load(f))
+        return indexes
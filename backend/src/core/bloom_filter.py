@@ -0,0 +1,134 @@
+import math
+from typing import Callable, Dict, Iterable, Optional, Set
+import numpy as np
+
+from src.core.kmer_codec import SequenceLike, hash_codes
+
+# Number of codes hashed at once, bounding the temporary arrays to a few MB.
+_HASH_BATCH = 1 << 20
+
+# Seed for the second hash of a code.
+_SECOND_SEED = np.uint64(0x9E3779B97F4A7C15)
+
+# The most hash functions a filter will use, whatever its size.
+MAX_HASH_COUNT = 16
+
+
+class BloomFilter:
+    """
+    A Bloom filter over uint64 k-mer codes, stored as a NumPy bit array.
+
+    Lookups never give false negatives; a code that was not added is
+    reported present with probability about `false_positive_rate()`. The
+    `hash_count` bit positions of a code are derived from two 64-bit hashes
+    (h1 + i * h2), so adding or querying a batch of codes is a handful of
+    vectorized passes.
+    """
+
+    def __init__(self, bit_count: int, hash_count: int, bits: Optional[np.ndarray] = None, item_count: int = 0):
+        if bit_count < 8 or hash_count < 1:
+            raise ValueError("A Bloom filter needs at least 8 bits and 1 hash function.")
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.bits = np.zeros((bit_count + 7) // 8, dtype=np.uint8) if bits is None else bits
+        # Number of codes added, counting repeats. Used to estimate the false-positive rate.
+        self.item_count = item_count
+
+    @classmethod
+    def for_capacity(cls, expected_items: int, false_positive_rate: float, max_bytes: Optional[int] = None) -> "BloomFilter":
+        """
+        Creates an empty filter sized for `expected_items` codes at the given
+        false-positive rate.
+
+        If that would take more than `max_bytes`, the filter is capped at
+        `max_bytes` and its false-positive rate will be higher than requested.
+        """
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1.")
+        expected_items = max(expected_items, 1)
+        bit_count = math.ceil(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2)
+        if max_bytes:
+            bit_count = min(bit_count, max_bytes * 8)
+        bit_count = max(64, bit_count - bit_count % 8)
+        hash_count = round(bit_count / expected_items * math.log(2))
+        return cls(bit_count, min(max(hash_count, 1), MAX_HASH_COUNT))
+
+    @property
+    def size_bytes(self) -> int:
+        return self.bits.nbytes
+
+    def false_positive_rate(self) -> float:
+        """The expected false-positive rate for the codes added so far."""
+        return (1 - math.exp(-self.hash_count * self.item_count / self.bit_count)) ** self.hash_count
+
+    def _positions(self, codes: np.ndarray) -> Iterable[np.ndarray]:
+        """Yields the bit positions of the codes for each hash function in turn."""
+        h1 = hash_codes(codes)
+        h2 = hash_codes(codes ^ _SECOND_SEED) | np.uint64(1)
+        bit_count = np.uint64(self.bit_count)
+        for i in range(self.hash_count):
+            yield (h1 + np.uint64(i) * h2) % bit_count
+
+    def add_codes(self, codes: np.ndarray) -> None:
+        codes = np.asarray(codes, dtype=np.uint64)
+        for start in range(0, len(codes), _HASH_BATCH):
+            for positions in self._positions(codes[start:start + _HASH_BATCH]):
+                masks = np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8))
+                np.bitwise_or.at(self.bits, positions >> np.uint64(3), masks)
+        self.item_count += len(codes)
+
+    def contains_codes(self, codes: np.ndarray) -> np.ndarray:
+        """Returns a boolean mask of which codes may have been added."""
+        codes = np.asarray(codes, dtype=np.uint64)
+        found = np.ones(len(codes), dtype=bool)
+        for start in range(0, len(codes), _HASH_BATCH):
+            batch_found = found[start:start + _HASH_BATCH]
+            for positions in self._positions(codes[start:start + _HASH_BATCH]):
+                shifts = (positions & np.uint64(7)).astype(np.uint8)
+                batch_found &= ((self.bits[positions >> np.uint64(3)] >> shifts) & 1).astype(bool)
+        return found
+
+
+class BloomBackground:
+    """
+    Approximate background k-mer membership for very large reference panels.
+
+    Packed k-mers are kept in a BloomFilter whose size does not depend on
+    the number of genomes. K-mers that cannot be packed (N, IUPAC codes,
+    lower-case bases) are kept exactly as strings, as in PackedKmerSet.
+
+    `recheck_source`, if set, returns the background sequences again so
+    that candidate regions can be verified exactly in a second pass.
+    """
+
+    def __init__(self, kmer_size: int, bloom: BloomFilter, ambiguous_kmers: Set[str]):
+        self.kmer_size = kmer_size
+        self.bloom = bloom
+        self.ambiguous_kmers = ambiguous_kmers
+        self.recheck_source: Optional[Callable[[], Iterable[SequenceLike]]] = None
+        # Set when the filter is stored as a background index.
+        self.metadata: Dict = {}
+
+    def __len__(self) -> int:
+        return self.bloom.item_count + len(self.ambiguous_kmers)
+
+    def contains_codes(self, codes: np.ndarray) -> np.ndarray:
+        return self.bloom.contains_codes(codes)
+
+    def save(self, path: str) -> None:
+        """Writes the filter and the ambiguous k-mers to one .npz file."""
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                bits=self.bloom.bits,
+                params=np.array([self.kmer_size, self.bloom.bit_count, self.bloom.hash_count, self.bloom.item_count], dtype=np.int64),
+                ambiguous=np.array(sorted(self.ambiguous_kmers), dtype=str),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BloomBackground":
+        with np.load(path) as data:
+            kmer_size, bit_count, hash_count, item_count = (int(value) for value in data["params"])
+            bloom = BloomFilter(bit_count, hash_count, bits=data["bits"], item_count=item_count)
+            ambiguous_kmers = set(data["ambiguous"].tolist())
+        return cls(kmer_size, bloom, ambiguous_kmers)
@@ -0,0 +1,199 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import numpy as np
+
+from src.core.bloom_filter import BloomBackground, BloomFilter
+from src.core.kmer_codec import SequenceLike, kmer_codes
+from src.core.packed_signature_finder import (
+    PackedSignatureFinder, _ambiguous_kmers, _unique_window_indices, sorted_unique,
+)
+
+# Default target false-positive rate of a background filter.
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+
+
+class BloomSignatureFinder(PackedSignatureFinder):
+    """
+    A SignatureFinder that checks target k-mers against a Bloom filter of the
+    background instead of an exact k-mer set, so the background's memory use
+    is fixed by `max_bytes` rather than by the number of genomes.
+
+    A Bloom filter has no false negatives, so every reported signature is
+    truly unique. A false positive can only hide a unique k-mer, which
+    shortens or splits a region. With `exact_recheck`, the k-mers the filter
+    reported as present within `recheck_distance` windows of a candidate
+    region are checked exactly in a second pass that streams the background
+    sequences again, restoring those regions exactly. A unique k-mer farther
+    than that from every candidate region is still missed with probability
+    at most the filter's false-positive rate.
+    """
+
+    def __init__(
+        self,
+        kmer_size: int,
+        false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+        max_bytes: Optional[int] = None,
+        exact_recheck: bool = False,
+        recheck_distance: Optional[int] = None,
+    ):
+        """
+        Initializes the BloomSignatureFinder.
+
+        Args:
+            kmer_size: The length of the k-mer to use, between 1 and 32.
+            false_positive_rate: The filter's target false-positive rate.
+            max_bytes: The most memory the filter may use. None sizes it for
+                       `false_positive_rate` alone.
+            exact_recheck: Whether to verify candidate regions exactly against
+                           the background's `recheck_source`.
+            recheck_distance: How many windows around each candidate region
+                              are re-checked. Defaults to `kmer_size`.
+        """
+        super().__init__(kmer_size)
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1.")
+        self.false_positive_rate = false_positive_rate
+        self.max_bytes = max_bytes
+        self.exact_recheck = exact_recheck
+        self.recheck_distance = kmer_size if recheck_distance is None else recheck_distance
+
+    def build_background(self, background_sequences: Dict[str, str]) -> BloomBackground:
+        """
+        Builds a Bloom filter of every background k-mer. The in-memory
+        sequences are also used for the exact re-check.
+        """
+        expected_kmers = sum(max(len(seq) - self.kmer_size + 1, 0) for seq in background_sequences.values())
+        background = self.build_filter(background_sequences.values(), expected_kmers)
+        background.recheck_source = background_sequences.values
+        return background
+
+    def build_filter(self, sequences: Iterable[SequenceLike], expected_kmers: int) -> BloomBackground:
+        """
+        Builds a Bloom filter from background sequences that are read one at
+        a time, so no more than one genome needs to be in memory at once.
+
+        Args:
+            sequences: The background sequences, e.g. a generator over files.
+            expected_kmers: An upper bound on the number of background k-mers,
+                            used to size the filter.
+        """
+        bloom = BloomFilter.for_capacity(expected_kmers, self.false_positive_rate, self.max_bytes)
+        ambiguous_kmers: Set[str] = set()
+        for sequence in sequences:
+            codes, valid = kmer_codes(sequence, self.kmer_size)
+            # Deduplicating first keeps item_count, and so the rate estimate, honest.
+            bloom.add_codes(sorted_unique(codes[valid]))
+            ambiguous_kmers.update(_ambiguous_kmers(sequence, valid, self.kmer_size))
+        return BloomBackground(self.kmer_size, bloom, ambiguous_kmers)
+
+    def _find_unique_kmer_indices(self, target_seq: str, background: BloomBackground) -> np.ndarray:
+        """Checks every target window against the filter in one vectorized pass."""
+        return _unique_window_indices(target_seq, background)
+
+    def iter_unique_signatures_in_background(
+        self,
+        target_sequences: Dict[str, str],
+        background: BloomBackground,
+        progress: Optional[Callable[[float], None]] = None,
+        include_sequence: bool = True,
+    ) -> Iterator[Dict]:
+        """
+        Yields unique signature regions. Without the exact re-check they are
+        streamed per target sequence; with it, every target sequence is
+        scanned first so the background is streamed only once.
+        """
+        if not (self.exact_recheck and background.recheck_source is not None):
+            yield from super().iter_unique_signatures_in_background(
+                target_sequences, background, progress, include_sequence
+            )
+            return
+
+        indices = self._timed_unique_kmer_indices(target_sequences, background, progress)
+        with self.instrumentation.stage_total("merge") as merge:
+            for seq_id, target_seq in target_sequences.items():
+                yield from self._signatures_from_indices(
+                    seq_id, self._prepare_sequence(target_seq), indices[seq_id], include_sequence, merge=merge
+                )
+
+    def unique_kmer_indices(
+        self,
+        target_sequences: Dict[str, str],
+        background: BloomBackground,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> Dict:
+        """
+        With the exact re-check, scans every target sequence first and then
+        streams the background once to re-check the candidates.
+        """
+        if not (self.exact_recheck and background.recheck_source is not None):
+            return super().unique_kmer_indices(target_sequences, background, progress)
+
+        total_length = sum(len(seq) for seq in target_sequences.values()) or 1
+        scanned_length = 0
+
+        # Pass 1: candidate regions from the filter, and the windows around them to re-check.
+        scans: List[Tuple[str, np.ndarray, np.ndarray, np.ndarray]] = []
+        for seq_id, target_seq in target_sequences.items():
+            if progress is not None:
+                progress(scanned_length / total_length)
+            scanned_length += len(target_seq)
+            target_seq = self._prepare_sequence(target_seq)
+            unique_indices = self._find_unique_kmer_indices(target_seq, background)
+            recheck_indices, recheck_codes = self._recheck_windows(target_seq, unique_indices)
+            scans.append((seq_id, unique_indices, recheck_indices, recheck_codes))
+
+        # Pass 2: stream the background once, looking up only the re-checked codes.
+        candidates = sorted_unique(np.concatenate([scan[3] for scan in scans])) if scans else np.empty(0, dtype=np.uint64)
+        present = self._exact_presence(candidates, background.recheck_source())
+
+        indices = {}
+        for seq_id, unique_indices, recheck_indices, recheck_codes in scans:
+            if len(recheck_codes):
+                absent = ~present[np.searchsorted(candidates, recheck_codes)]
+                unique_indices = np.union1d(unique_indices, recheck_indices[absent])
+            indices[seq_id] = unique_indices
+
+        if progress is not None:
+            progress(1.0)
+        return indices
+
+    def _recheck_windows(self, target_seq: SequenceLike, unique_indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the start indices and codes of the packed windows the filter
+        reported as present that lie within `recheck_distance` windows of a
+        candidate unique window.
+        """
+        codes, valid = kmer_codes(target_seq, self.kmer_size)
+        window_count = len(codes)
+        if window_count == 0 or len(unique_indices) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64)
+
+        unique = np.zeros(window_count, dtype=bool)
+        unique[unique_indices] = True
+        # near[i] is True when a unique window lies in [i - d, i + d].
+        counts = np.concatenate(([0], np.cumsum(unique)))
+        positions = np.arange(window_count)
+        upper = np.minimum(positions + self.recheck_distance + 1, window_count)
+        lower = np.maximum(positions - self.recheck_distance, 0)
+        near = counts[upper] - counts[lower] > 0
+
+        recheck_indices = np.flatnonzero(near & ~unique & valid)
+        return recheck_indices, codes[recheck_indices]
+
+    def _exact_presence(self, candidates: np.ndarray, background_sequences: Iterable[SequenceLike]) -> np.ndarray:
+        """
+        Returns a mask of which sorted candidate codes occur in any of the
+        background sequences. Memory use depends only on the candidates and
+        the sequence being read.
+        """
+        present = np.zeros(len(candidates), dtype=bool)
+        if len(candidates) == 0:
+            return present
+        for sequence in background_sequences:
+            codes, valid = kmer_codes(sequence, self.kmer_size)
+            codes = codes[valid]
+            positions = np.searchsorted(candidates, codes)
+            np.minimum(positions, len(candidates) - 1, out=positions)
+            present[positions[candidates[positions] == codes]] = True
+            if present.all():
+                break
+        return present
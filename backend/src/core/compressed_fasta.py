@@ -0,0 +1,293 @@
+"""
+Reads gzip- and BGZF-compressed FASTA as a stream.
+
+Compression is detected from the first bytes, so callers pass any file or
+stream and get plain FASTA bytes back. Data is inflated a chunk at a time and
+never written anywhere. BGZF (the blocked gzip written by bgzip) splits a
+file into independent blocks of at most 64 KiB, so the complete blocks of
+each chunk are inflated in parallel on a thread pool; zlib releases the GIL
+while it works. Plain gzip, including concatenated members, is inflated
+serially.
+"""
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+GZIP_MAGIC = b"\x1f\x8b"
+# Compressed bytes read from the underlying stream at a time.
+DEFAULT_CHUNK_SIZE = 1 << 20
+# Threads that inflate BGZF blocks.
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# A BGZF block header: a gzip member with the FEXTRA flag whose extra
+# field holds a 'BC' subfield with the total block size.
+_BGZF_HEADER_SIZE = 18
+_FEXTRA = 0x04
+
+
+def is_gzip(header: bytes) -> bool:
+    return header[:2] == GZIP_MAGIC
+
+
+def is_bgzf(header: bytes) -> bool:
+    """Whether the first bytes of a file are a BGZF block header."""
+    if len(header) < _BGZF_HEADER_SIZE or header[:3] != b"\x1f\x8b\x08" or not header[3] & _FEXTRA:
+        return False
+    try:
+        return _bgzf_block_size(header, 0) is not None
+    except ValueError:
+        # A gzip extra field without a block size: plain gzip.
+        return False
+
+
+def _bgzf_block_size(buffer, offset: int) -> Optional[int]:
+    """
+    The total size of the BGZF block starting at `offset`, or None when the
+    buffer does not yet hold its whole header.
+
+    Raises:
+        ValueError: If the data at `offset` is not a BGZF block.
+    """
+    if len(buffer) - offset < 12:
+        return None
+    if buffer[offset:offset + 2] != GZIP_MAGIC or not buffer[offset + 3] & _FEXTRA:
+        raise ValueError("Invalid BGZF data: expected a gzip block with an extra field.")
+    (extra_length,) = struct.unpack_from("<H", buffer, offset + 10)
+    if len(buffer) - offset < 12 + extra_length:
+        return None
+    position = offset + 12
+    while position + 4 <= offset + 12 + extra_length:
+        subfield, length = buffer[position:position + 2], struct.unpack_from("<H", buffer, position + 2)[0]
+        if subfield == b"BC" and length == 2:
+            return struct.unpack_from("<H", buffer, position + 4)[0] + 1
+        position += 4 + length
+    raise ValueError("Invalid BGZF data: a block has no size field.")
+
+
+def _inflate_bgzf_block(block: memoryview) -> bytes:
+    """Inflates one whole BGZF block and checks its CRC and length."""
+    (extra_length,) = struct.unpack_from("<H", block, 10)
+    data = zlib.decompress(block[12 + extra_length:-8], -15)
+    crc, size = struct.unpack_from("<II", block, len(block) - 8)
+    if len(data) != size or zlib.crc32(data) != crc:
+        raise ValueError("Invalid BGZF data: a block failed its checksum.")
+    return data
+
+
+class GzipDecompressor:
+    """
+    Inflates a gzip stream fed in chunks of any size. Concatenated gzip
+    members, BGZF included, are inflated one after another.
+    """
+
+    def __init__(self):
+        self._inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        self._in_member = False
+
+    def decompress(self, data: bytes) -> bytes:
+        output = []
+        try:
+            while data:
+                self._in_member = True
+                output.append(self._inflater.decompress(data))
+                if not self._inflater.eof:
+                    break
+                # The member ended; anything left over starts the next one.
+                data = self._inflater.unused_data
+                self._inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                self._in_member = False
+        except zlib.error as e:
+            raise ValueError(f"Invalid gzip data: {e}")
+        return b"".join(output)
+
+    def flush(self) -> bytes:
+        """
+        Raises:
+            ValueError: If the stream ended in the middle of a member.
+        """
+        if self._in_member:
+            raise ValueError("Invalid gzip data: the file is truncated.")
+        return b""
+
+    def close(self) -> None:
+        pass
+
+
+class BgzfDecompressor:
+    """
+    Inflates a BGZF stream fed in chunks of any size, inflating the complete
+    blocks of each chunk in parallel. Output keeps the block order.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS):
+        self.workers = max(workers, 1)
+        self._buffer = bytearray()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _complete_blocks(self) -> List[memoryview]:
+        """Takes every complete block off the front of the buffer."""
+        offset = 0
+        bounds = []
+        while True:
+            size = _bgzf_block_size(self._buffer, offset)
+            if size is None or offset + size > len(self._buffer):
+                break
+            bounds.append((offset, offset + size))
+            offset += size
+        data = memoryview(bytes(self._buffer[:offset]))
+        del self._buffer[:offset]
+        return [data[start:end] for start, end in bounds]
+
+    def decompress(self, data: bytes) -> bytes:
+        self._buffer += data
+        blocks = self._complete_blocks()
+        try:
+            if self.workers > 1 and len(blocks) > 1:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="isignify-bgzf")
+                return b"".join(self._executor.map(_inflate_bgzf_block, blocks))
+            return b"".join(map(_inflate_bgzf_block, blocks))
+        except zlib.error as e:
+            raise ValueError(f"Invalid BGZF data: {e}")
+
+    def flush(self) -> bytes:
+        """
+        Raises:
+            ValueError: If the stream ended in the middle of a block.
+        """
+        if self._buffer:
+            raise ValueError("Invalid BGZF data: the file is truncated.")
+        return b""
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+Decompressor = Union[GzipDecompressor, BgzfDecompressor]
+
+
+def decompressor_for(header: bytes, workers: int = DEFAULT_WORKERS) -> Optional[Decompressor]:
+    """The decompressor for a stream starting with `header`, or None if it is not compressed."""
+    if is_bgzf(header):
+        return BgzfDecompressor(workers)
+    if is_gzip(header):
+        return GzipDecompressor()
+    return None
+
+
+class _PrefixedStream:
+    """A stream whose first bytes were already read, put back in front of it."""
+
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._prefix:
+            return self._stream.read(size)
+        if size < 0:
+            data, self._prefix = self._prefix + self._stream.read(), b""
+            return data
+        data, self._prefix = self._prefix[:size], self._prefix[size:]
+        return data
+
+
+class DecompressingReader:
+    """A read-only binary stream of the inflated content of a compressed stream."""
+
+    def __init__(self, stream: BinaryIO, decompressor: Decompressor, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._stream = stream
+        self._decompressor = decompressor
+        self.chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while (size < 0 or len(self._buffer) < size) and not self._eof:
+            chunk = self._stream.read(self.chunk_size)
+            if chunk:
+                self._buffer += self._decompressor.decompress(chunk)
+            else:
+                self._buffer += self._decompressor.flush()
+                self._eof = True
+        size = len(self._buffer) if size < 0 else min(size, len(self._buffer))
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def close(self) -> None:
+        self._decompressor.close()
+
+
+def _read_header(stream: BinaryIO) -> bytes:
+    header = b""
+    while len(header) < _BGZF_HEADER_SIZE:
+        chunk = stream.read(_BGZF_HEADER_SIZE - len(header))
+        if not chunk:
+            break
+        header += chunk
+    return header
+
+
+def open_stream(stream: BinaryIO, workers: int = DEFAULT_WORKERS, chunk_size: int = DEFAULT_CHUNK_SIZE) -> BinaryIO:
+    """
+    Returns a stream of the plain content of `stream`, inflating it if it is
+    gzip or BGZF. Uncompressed streams are read as they are.
+    """
+    header = _read_header(stream)
+    stream = _PrefixedStream(header, stream)
+    decompressor = decompressor_for(header, workers)
+    if decompressor is None:
+        return stream
+    return DecompressingReader(stream, decompressor, chunk_size)
+
+
+@contextmanager
+def open_fasta(source, workers: int = DEFAULT_WORKERS, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[BinaryIO]:
+    """
+    Opens a path or wraps a binary stream, yielding its plain content.
+    Paths are closed afterwards; streams are left open.
+    """
+    with ExitStack() as stack:
+        if isinstance(source, (str, os.PathLike)):
+            source = stack.enter_context(open(source, "rb"))
+        reader = open_stream(source, workers, chunk_size)
+        if isinstance(reader, DecompressingReader):
+            stack.callback(reader.close)
+        yield reader
+
+
+def uncompressed_size_hint(path: Union[str, os.PathLike]) -> int:
+    """
+    The size of a file's plain content, read from its headers without
+    inflating it: exact for uncompressed and BGZF files, and for gzip the
+    length recorded in the last member (exact for the usual single-member
+    file under 4 GiB), but never less than the compressed size.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        if is_bgzf(header):
+            total = 0
+            offset = 0
+            while offset < file_size:
+                f.seek(offset)
+                block_header = f.read(12)
+                if len(block_header) == 12:
+                    block_header += f.read(struct.unpack_from("<H", block_header, 10)[0])
+                size = _bgzf_block_size(block_header, 0)
+                if size is None:
+                    break
+                f.seek(offset + size - 4)
+                total += struct.unpack("<I", f.read(4))[0]
+                offset += size
+            return total
+        if is_gzip(header) and file_size >= 18:
+            f.seek(file_size - 4)
+            return max(struct.unpack("<I", f.read(4))[0], file_size)
+    return file_size
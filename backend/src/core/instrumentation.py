@@ -0,0 +1,174 @@
+"""
+Lightweight per-stage instrumentation of an analysis.
+
+An Instrumentation records, for each named stage, its wall time, the peak
+RSS of the process while it ran, and how many bases and k-mers it handled.
+Code that is not being measured uses NULL_INSTRUMENTATION, whose methods do
+nothing, so instrumented code costs next to nothing when metrics are off.
+"""
+import contextlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import ContextManager, Dict, List, Optional
+
+from src.core.resource_usage import peak_rss_bytes, reset_peak_rss
+
+
+@dataclass
+class StageRecord:
+    """The totals of one stage. A stage entered several times accumulates."""
+    stage: str
+    seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    bases: int = 0
+    kmers: int = 0
+    calls: int = 0
+
+    @property
+    def bases_per_second(self) -> Optional[float]:
+        return self.bases / self.seconds if self.bases and self.seconds > 0 else None
+
+    @property
+    def kmers_per_second(self) -> Optional[float]:
+        return self.kmers / self.seconds if self.kmers and self.seconds > 0 else None
+
+
+class StageTotal:
+    """
+    The wall time and work of a stage entered once per item of a loop. Each
+    `with` block adds its time with nothing but two clock reads; the total is
+    recorded once, by `Instrumentation.stage_total`.
+    """
+
+    __slots__ = ("seconds", "bases", "kmers", "_started")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.bases = 0
+        self.kmers = 0
+        self._started = 0.0
+
+    def __enter__(self) -> "StageTotal":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.seconds += time.perf_counter() - self._started
+
+    def add_work(self, bases: int = 0, kmers: int = 0) -> None:
+        self.bases += bases
+        self.kmers += kmers
+
+
+class _NullStageTotal(StageTotal):
+    """A StageTotal that measures nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "StageTotal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def add_work(self, bases: int = 0, kmers: int = 0) -> None:
+        pass
+
+
+NULL_STAGE_TOTAL = _NullStageTotal()
+
+
+class Instrumentation:
+    """
+    Records stages of one analysis.
+
+    Peak memory is the process's peak RSS, reset when each stage starts, so
+    it includes anything running concurrently in other threads. Stages must
+    not be nested, but `stage_total` blocks may be open alongside each other.
+    """
+
+    enabled = True
+
+    def __init__(self, track_memory: bool = True):
+        self.track_memory = track_memory
+        self._stages: Dict[str, StageRecord] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, stage: str) -> StageRecord:
+        if stage not in self._stages:
+            self._stages[stage] = StageRecord(stage)
+        return self._stages[stage]
+
+    @contextlib.contextmanager
+    def stage(self, stage: str):
+        """Times the block as (part of) `stage`."""
+        if self.track_memory:
+            reset_peak_rss()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            peak = peak_rss_bytes() if self.track_memory else 0
+            with self._lock:
+                record = self._record(stage)
+                record.seconds += seconds
+                record.peak_rss_bytes = max(record.peak_rss_bytes, peak)
+                record.calls += 1
+
+    @contextlib.contextmanager
+    def stage_total(self, stage: str):
+        """
+        Yields a StageTotal for a stage entered once per item of a loop in the
+        block, e.g. once per target sequence. Its time and work are recorded
+        as one call when the block ends, and peak memory is only measured
+        around the whole block, so per-item cost stays at two clock reads.
+        """
+        total = StageTotal()
+        if self.track_memory:
+            reset_peak_rss()
+        try:
+            yield total
+        finally:
+            peak = peak_rss_bytes() if self.track_memory else 0
+            with self._lock:
+                record = self._record(stage)
+                record.seconds += total.seconds
+                record.peak_rss_bytes = max(record.peak_rss_bytes, peak)
+                record.bases += total.bases
+                record.kmers += total.kmers
+                record.calls += 1
+
+    def add_work(self, stage: str, bases: int = 0, kmers: int = 0) -> None:
+        """Adds to the bases and k-mers a stage handled."""
+        with self._lock:
+            record = self._record(stage)
+            record.bases += bases
+            record.kmers += kmers
+
+    def records(self) -> List[StageRecord]:
+        """The stages in the order they were first entered."""
+        with self._lock:
+            return list(self._stages.values())
+
+
+class _NullInstrumentation:
+    """An Instrumentation that records nothing."""
+
+    enabled = False
+
+    def stage(self, stage: str) -> ContextManager:
+        return contextlib.nullcontext()
+
+    def stage_total(self, stage: str) -> ContextManager[StageTotal]:
+        return contextlib.nullcontext(NULL_STAGE_TOTAL)
+
+    def add_work(self, stage: str, bases: int = 0, kmers: int = 0) -> None:
+        pass
+
+    def records(self) -> List[StageRecord]:
+        return []
+
+
+NULL_INSTRUMENTATION = _NullInstrumentation()
@@ -0,0 +1,109 @@
+from typing import Tuple, Union
+import numpy as np
+
+# The largest k-mer that fits into a single uint64 at 2 bits per base.
+MAX_PACKED_KMER_SIZE = 32
+
+# Sentinel code for any byte that is not an upper-case A, C, G or T.
+INVALID_BASE = 255
+
+_BASE_TO_CODE = np.full(256, INVALID_BASE, dtype=np.uint8)
+for _code, _base in enumerate(b"ACGT"):
+    _BASE_TO_CODE[_base] = _code
+
+SequenceLike = Union[str, bytes, bytearray, memoryview, np.ndarray]
+
+# Odd constants of the splitmix64 finalizer.
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def as_uint8_array(sequence: SequenceLike) -> np.ndarray:
+    """
+    Returns a uint8 view of a DNA sequence.
+
+    Bytes-like objects and uint8 arrays are viewed without copying; strings
+    are encoded as ASCII first.
+    """
+    if isinstance(sequence, np.ndarray):
+        return sequence.view(np.uint8)
+    if isinstance(sequence, str):
+        sequence = sequence.encode("ascii", errors="replace")
+    return np.frombuffer(sequence, dtype=np.uint8)
+
+
+def window_text(sequence: SequenceLike, start: int, end: int) -> str:
+    """
+    Returns sequence[start:end] as a string, whatever the sequence type.
+    """
+    window = sequence[start:end]
+    if isinstance(window, str):
+        return window
+    return bytes(window).decode("utf-8", errors="replace")
+
+
+def encode_bases(sequence: SequenceLike) -> np.ndarray:
+    """
+    Encodes a DNA sequence as one 2-bit code per base (A=0, C=1, G=2, T=3).
+
+    Any other character (N, IUPAC codes, lower-case bases) is encoded as
+    INVALID_BASE.
+    """
+    return _BASE_TO_CODE[as_uint8_array(sequence)]
+
+
+def kmer_codes(sequence: SequenceLike, kmer_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the packed uint64 code of every k-mer window in a sequence.
+
+    Args:
+        sequence: The DNA sequence.
+        kmer_size: The k-mer length, between 1 and MAX_PACKED_KMER_SIZE.
+
+    Returns:
+        A tuple (codes, valid) of arrays with one entry per window start.
+        `valid[i]` is False when window i contains a base that cannot be
+        packed; its code is then meaningless.
+    """
+    if not 1 <= kmer_size <= MAX_PACKED_KMER_SIZE:
+        raise ValueError(f"kmer_size must be between 1 and {MAX_PACKED_KMER_SIZE}, got {kmer_size}")
+
+    bases = encode_bases(sequence)
+    window_count = len(bases) - kmer_size + 1
+    if window_count <= 0:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=bool)
+
+    invalid = bases == INVALID_BASE
+    # A window is valid when the number of invalid bases inside it is zero.
+    invalid_prefix = np.concatenate(([0], np.cumsum(invalid, dtype=np.int64)))
+    valid = (invalid_prefix[kmer_size:] - invalid_prefix[:window_count]) == 0
+
+    packed = np.where(invalid, 0, bases).astype(np.uint64)
+    codes = np.zeros(window_count, dtype=np.uint64)
+    two = np.uint64(2)
+    for offset in range(kmer_size):
+        codes <<= two
+        codes |= packed[offset:offset + window_count]
+    return codes, valid
+
+
+def decode_kmer(code: int, kmer_size: int) -> str:
+    """Decodes a packed k-mer code back into its DNA string."""
+    bases = []
+    for _ in range(kmer_size):
+        bases.append("ACGT"[code & 3])
+        code >>= 2
+    return "".join(reversed(bases))
+
+
+def hash_codes(codes: np.ndarray) -> np.ndarray:
+    """
+    Scrambles uint64 k-mer codes with the splitmix64 finalizer, so that
+    every bit of the result depends on every base. uint64 arithmetic wraps.
+    """
+    h = codes ^ (codes >> np.uint64(30))
+    h *= _MIX_1
+    h ^= h >> np.uint64(27)
+    h *= _MIX_2
+    h ^= h >> np.uint64(31)
+    return h
@@ -0,0 +1,240 @@
+"""
+A sparse sketch of a background that proves target stretches shared.
+
+The sketch keeps the background's minimizers (in every run of `window`
+consecutive k-mers, the one with the smallest hash) together with one
+position of each, and the background bases. A target minimizer that is also
+a background minimizer anchors an exact match, which is extended base by base
+in both directions; every target k-mer inside the extended match occurs in
+the background. Closely related genomes share long stretches, so a few
+anchors mark most of the target as shared and the exact lookup only runs on
+the windows that are left.
+
+Nothing is approximate: a window is only marked shared when its bases were
+found in a background sequence, and every other window is looked up exactly.
+"""
+import os
+import tempfile
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.kmer_codec import SequenceLike, as_uint8_array, kmer_codes
+
+# K-mers per minimizer window. Larger windows make a smaller sketch but need
+# longer shared stretches to be sure of an anchor in them.
+DEFAULT_WINDOW = 16
+
+_CODES_FILE = "sketch_codes.npy"
+_POSITIONS_FILE = "sketch_positions.npy"
+_BASES_FILE = "sketch_bases.npy"
+_OFFSETS_FILE = "sketch_offsets.npy"
+_PARAMS_FILE = "sketch_params.npy"
+
+# Minimizers are ranked by a key holding the top bits of a multiplicative
+# hash of the k-mer above its position, so the minimum key of a window also
+# says where it is, and equal hashes go to the leftmost k-mer.
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_POSITION_BITS = 40
+_POSITION_MASK = np.uint64((1 << _POSITION_BITS) - 1)
+_INVALID_KEY = ~_POSITION_MASK
+
+
+def _sliding_minimum(values: np.ndarray, width: int) -> np.ndarray:
+    """
+    min(values[j:j + width]) for every j, in about log2(width) vectorized
+    passes: each pass doubles the span already reduced, and the last two
+    overlapping spans cover the window.
+    """
+    span = 1
+    reduced = values
+    while span * 2 <= width:
+        reduced = np.minimum(reduced[:-span], reduced[span:])
+        span *= 2
+    count = len(values) - width + 1
+    return np.minimum(reduced[:count], reduced[width - span:width - span + count])
+
+
+def minimizer_positions(codes: np.ndarray, valid: np.ndarray, window: int) -> np.ndarray:
+    """
+    The window starts of the minimizers of a sequence's k-mers: the k-mers
+    whose hash is the smallest of some run of `window` consecutive k-mers.
+    K-mers that could not be packed are never minimizers.
+    """
+    if len(codes) == 0:
+        return np.empty(0, dtype=np.int64)
+    window = min(window, len(codes))
+    keys = codes * _HASH_MULTIPLIER
+    keys &= _INVALID_KEY
+    keys[~valid] = _INVALID_KEY
+    keys |= np.arange(len(codes), dtype=np.uint64)
+    # The minimizer of each window; consecutive windows mostly share theirs.
+    minimums = _sliding_minimum(keys, window)
+    minimums = minimums[np.concatenate(([True], minimums[1:] != minimums[:-1]))]
+    positions = (minimums & _POSITION_MASK).astype(np.int64)
+    return positions[valid[positions]]
+
+
+def _match_length(a: np.ndarray, b: np.ndarray) -> int:
+    """The length of the common prefix of two uint8 arrays, compared in growing blocks."""
+    limit = min(len(a), len(b))
+    position, block = 0, 64
+    while position < limit:
+        end = min(position + block, limit)
+        mismatches = np.flatnonzero(a[position:end] != b[position:end])
+        if len(mismatches):
+            return position + int(mismatches[0])
+        position = end
+        block = min(block * 4, 1 << 16)
+    return limit
+
+
+class MinimizerSketch:
+    """
+    The minimizers of a set of background sequences, each with one position
+    in `bases`, the background sequences concatenated. `offsets` holds the
+    start of every sequence in `bases` and the total length, so matches are
+    never extended across two sequences.
+    """
+
+    def __init__(self, kmer_size: int, window: int, codes: np.ndarray, positions: np.ndarray, bases: np.ndarray, offsets: np.ndarray):
+        self.kmer_size = kmer_size
+        self.window = window
+        self.codes = codes
+        self.positions = positions
+        self.bases = bases
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, sequences: Iterable[SequenceLike], kmer_size: int, window: int = DEFAULT_WINDOW) -> "MinimizerSketch":
+        """
+        Sketches background sequences.
+
+        Strings with characters outside ASCII are left out: their bytes do
+        not identify their k-mers, so they could anchor false matches.
+        Leaving a sequence out only makes the sketch prove less.
+        """
+        if window < 1:
+            raise ValueError("The minimizer window must be at least 1.")
+        parts: List[np.ndarray] = []
+        code_parts: List[np.ndarray] = []
+        position_parts: List[np.ndarray] = []
+        offset = 0
+        for sequence in sequences:
+            if isinstance(sequence, str) and not sequence.isascii():
+                continue
+            bases = as_uint8_array(sequence)
+            codes, valid = kmer_codes(bases, kmer_size)
+            positions = minimizer_positions(codes, valid, window)
+            code_parts.append(codes[positions])
+            position_parts.append(positions + offset)
+            parts.append(bases)
+            offset += len(bases)
+
+        codes = np.concatenate(code_parts) if code_parts else np.empty(0, dtype=np.uint64)
+        positions = np.concatenate(position_parts) if position_parts else np.empty(0, dtype=np.int64)
+        # One position per minimizer is enough to anchor a match.
+        order = np.argsort(codes, kind="stable")
+        codes, positions = codes[order], positions[order]
+        first = np.ones(len(codes), dtype=bool)
+        np.not_equal(codes[1:], codes[:-1], out=first[1:])
+        offsets = np.cumsum([0] + [len(part) for part in parts], dtype=np.int64)
+        bases = np.concatenate(parts) if parts else np.empty(0, dtype=np.uint8)
+        return cls(kmer_size, window, codes[first], positions[first], bases, offsets)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def size_bytes(self) -> int:
+        return self.codes.nbytes + self.positions.nbytes + self.bases.nbytes + self.offsets.nbytes
+
+    def _anchors(self, codes: np.ndarray, valid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """The target minimizers found in the sketch, and a background position of each."""
+        targets = minimizer_positions(codes, valid, self.window)
+        if len(self.codes) == 0 or len(targets) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        # Sorted needles walk the sketch in order, as in PackedKmerSet.contains_codes.
+        needles = codes[targets]
+        order = np.argsort(needles)
+        found = np.empty(len(targets), dtype=np.int64)
+        found[order] = np.minimum(np.searchsorted(self.codes, needles[order]), len(self.codes) - 1)
+        hit = self.codes[found] == needles
+        return targets[hit], self.positions[found[hit]]
+
+    def shared_windows(self, sequence: SequenceLike, codes: Optional[np.ndarray] = None, valid: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        A boolean mask over the k-mer windows of a target sequence, True for
+        the windows proven to occur in the background. `codes` and `valid`,
+        from kmer_codes, are computed unless given.
+
+        Anchors are extended in target order; the anchors that fall inside a
+        match already found are skipped, so the work follows the number of
+        shared stretches rather than the number of minimizers.
+        """
+        if codes is None or valid is None:
+            codes, valid = kmer_codes(sequence, self.kmer_size)
+        shared = np.zeros(len(codes), dtype=bool)
+        if isinstance(sequence, str) and not sequence.isascii():
+            return shared
+        target = as_uint8_array(sequence)
+        anchors, background_positions = self._anchors(codes, valid)
+        if len(anchors) == 0:
+            return shared
+        sequence_index = np.searchsorted(self.offsets, background_positions, side="right") - 1
+        lows, highs = self.offsets[sequence_index], self.offsets[sequence_index + 1]
+
+        k = self.kmer_size
+        # The first window not yet marked shared.
+        unmarked = 0
+        i = 0
+        while i < len(anchors):
+            start, position = int(anchors[i]), int(background_positions[i])
+            low, high = int(lows[i]), int(highs[i])
+            # Extend right from the end of the anchor, then left, but not
+            # back over windows that are already marked.
+            right = _match_length(target[start + k:], self.bases[position + k:high])
+            left_limit = min(start - unmarked, position - low)
+            left = _match_length(target[start - left_limit:start][::-1], self.bases[position - left_limit:position][::-1])
+            end_window = start + right + 1
+            shared[start - left:end_window] = True
+            unmarked = end_window
+            i = int(np.searchsorted(anchors, unmarked))
+        return shared
+
+    def save(self, directory: str) -> None:
+        """
+        Writes the sketch as .npy files into an existing directory. Each file
+        is renamed into place once complete, and the parameters file, which
+        marks a sketch as present, comes last.
+        """
+        files = (
+            (_CODES_FILE, np.ascontiguousarray(self.codes, dtype=np.uint64)),
+            (_POSITIONS_FILE, np.ascontiguousarray(self.positions, dtype=np.int64)),
+            (_BASES_FILE, np.ascontiguousarray(self.bases, dtype=np.uint8)),
+            (_OFFSETS_FILE, np.ascontiguousarray(self.offsets, dtype=np.int64)),
+            (_PARAMS_FILE, np.array([self.kmer_size, self.window], dtype=np.int64)),
+        )
+        for name, array in files:
+            fd, partial_path = tempfile.mkstemp(prefix=f".{name}.", dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, array)
+                os.replace(partial_path, os.path.join(directory, name))
+            except BaseException:
+                os.remove(partial_path)
+                raise
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, _PARAMS_FILE))
+
+    @classmethod
+    def load(cls, directory: str) -> "MinimizerSketch":
+        """Opens a saved sketch. Its arrays are memory-mapped, not read."""
+        kmer_size, window = (int(value) for value in np.load(os.path.join(directory, _PARAMS_FILE)))
+        arrays = [
+            np.load(os.path.join(directory, name), mmap_mode="r")
+            for name in (_CODES_FILE, _POSITIONS_FILE, _BASES_FILE, _OFFSETS_FILE)
+        ]
+        return cls(kmer_size, window, *arrays)
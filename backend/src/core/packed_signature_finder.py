@@ -0,0 +1,367 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import multiprocessing
+import os
+import tempfile
+import numpy as np
+
+from src.core.kmer_codec import MAX_PACKED_KMER_SIZE, SequenceLike, kmer_codes, window_text
+from src.core.minimizer_sketch import MinimizerSketch
+from src.core.signature_finder import SignatureFinder
+from src.core.signature_table import SignatureTable
+
+# Number of k-mer windows handled by a single worker task in parallel mode.
+DEFAULT_CHUNK_SIZE = 4_000_000
+
+
+def _drop_sorted_duplicates(codes: np.ndarray) -> np.ndarray:
+    """Removes repeated values from an already sorted array."""
+    if len(codes) < 2:
+        return codes
+    keep = np.empty(len(codes), dtype=bool)
+    keep[0] = True
+    np.not_equal(codes[1:], codes[:-1], out=keep[1:])
+    return codes[keep]
+
+
+def sorted_unique(codes: np.ndarray) -> np.ndarray:
+    """
+    Sorts and deduplicates an array of k-mer codes.
+
+    Equivalent to np.unique, which in recent NumPy versions goes through a
+    much slower hash table for integer input.
+    """
+    return _drop_sorted_duplicates(np.sort(codes))
+
+
+def merge_sorted_unique(parts: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Unions several sorted, deduplicated uint64 arrays into one.
+
+    NumPy's stable sort is a timsort for 64-bit integers, which detects the
+    pre-sorted runs and merges them in O(n log k) instead of re-sorting.
+    """
+    if not parts:
+        return np.empty(0, dtype=np.uint64)
+    return _drop_sorted_duplicates(np.sort(np.concatenate(parts), kind="stable"))
+
+
+def _window_chunks(sequence_length: int, kmer_size: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Splits the k-mer windows of a sequence into (first window, end window) ranges.
+    A worker handling range (s, e) needs the bases sequence[s:e + kmer_size - 1].
+    """
+    window_count = sequence_length - kmer_size + 1
+    return [(start, min(start + chunk_size, window_count)) for start in range(0, max(window_count, 0), chunk_size)]
+
+
+def _ambiguous_kmers(sequence: SequenceLike, valid: np.ndarray, kmer_size: int) -> Set[str]:
+    """Returns the k-mer strings of every window that could not be packed."""
+    return {
+        window_text(sequence, i, i + kmer_size)
+        for i in np.flatnonzero(~valid).tolist()
+    }
+
+
+def worker_process_context() -> multiprocessing.context.BaseContext:
+    """
+    The multiprocessing context of worker pools. Workers are started from a
+    fork server rather than forked from the caller, which may be running
+    threads whose locks a forked child would inherit held.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    # Workers start with the engine and NumPy already imported.
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+def _chunk(sequence: SequenceLike, start: int, end: int) -> SequenceLike:
+    """Slices a sequence into a picklable chunk for a worker task."""
+    chunk = sequence[start:end]
+    return chunk if isinstance(chunk, (str, bytes)) else bytes(chunk)
+
+
+def _background_chunk_worker(sequence: str, kmer_size: int) -> Tuple[np.ndarray, List[str]]:
+    """Process pool task: the sorted unique codes and ambiguous k-mers of one chunk."""
+    codes, valid = kmer_codes(sequence, kmer_size)
+    return sorted_unique(codes[valid]), sorted(_ambiguous_kmers(sequence, valid, kmer_size))
+
+
+# Background code arrays opened by this worker process, keyed by file path.
+_WORKER_BACKGROUNDS: Dict[str, "PackedKmerSet"] = {}
+
+
+def _scan_chunk_worker(
+    sequence: str, offset: int, kmer_size: int, codes_path: str, ambiguous_kmers: Set[str],
+    shared: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Process pool task: the global start indices of unique windows in one
+    target chunk. Windows flagged in `shared` are not looked up.
+    """
+    background = _WORKER_BACKGROUNDS.get(codes_path)
+    if background is None:
+        background = PackedKmerSet(kmer_size, np.load(codes_path, mmap_mode="r"), set())
+        _WORKER_BACKGROUNDS.clear()
+        _WORKER_BACKGROUNDS[codes_path] = background
+    background.ambiguous_kmers = ambiguous_kmers
+    return _unique_window_indices(sequence, background, shared) + offset
+
+
+def _unique_window_indices(
+    target_seq: SequenceLike, background: "PackedKmerSet", shared: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Checks every window of a sequence against the background in one
+    vectorized pass.
+
+    Windows already known to be shared, from `shared` or else from the
+    background's sketch if it has one, are not looked up.
+    """
+    codes, valid = kmer_codes(target_seq, background.kmer_size)
+    sketch = getattr(background, "sketch", None)
+    if shared is None and sketch is not None:
+        shared = sketch.shared_windows(target_seq, codes, valid)
+    if shared is None:
+        unique = ~background.contains_codes(codes)
+    else:
+        unique = np.zeros(len(codes), dtype=bool)
+        candidates = np.flatnonzero(~shared)
+        unique[candidates] = ~background.contains_codes(codes[candidates])
+        valid = valid | shared
+
+    # Windows that could not be packed are checked by their string instead.
+    for i in np.flatnonzero(~valid).tolist():
+        unique[i] = window_text(target_seq, i, i + background.kmer_size) not in background.ambiguous_kmers
+    return np.flatnonzero(unique)
+
+
+class PackedKmerSet:
+    """
+    Background k-mer membership backed by a sorted, deduplicated uint64 array.
+
+    K-mers containing bases that cannot be packed into 2 bits (N, IUPAC codes,
+    lower-case bases) are kept separately as plain strings, so membership is
+    exactly the same as for a Python set of k-mer strings.
+
+    A set may carry a MinimizerSketch of the same background genomes; target
+    windows it proves shared are then not looked up.
+    """
+
+    def __init__(self, kmer_size: int, codes: np.ndarray, ambiguous_kmers: Set[str]):
+        self.kmer_size = kmer_size
+        self.codes = codes
+        self.ambiguous_kmers = ambiguous_kmers
+        # Path of a .npy file holding `codes`, if they are stored on disk.
+        self.codes_path: Optional[str] = None
+        # A temporary .npy copy of in-memory `codes` written for worker processes.
+        self.spilled_path: Optional[str] = None
+        self.sketch: Optional[MinimizerSketch] = None
+
+    def __len__(self) -> int:
+        return len(self.codes) + len(self.ambiguous_kmers)
+
+    def contains_codes(self, codes: np.ndarray) -> np.ndarray:
+        """Returns a boolean mask of which packed codes are in the background."""
+        if len(self.codes) == 0:
+            return np.zeros(len(codes), dtype=bool)
+        # Binary searches with sorted needles walk the background array in
+        # order, which is several times faster than random probes on large
+        # inputs even after paying for the argsort.
+        order = np.argsort(codes)
+        sorted_codes = codes[order]
+        positions = np.searchsorted(self.codes, sorted_codes)
+        np.minimum(positions, len(self.codes) - 1, out=positions)
+        found = np.empty(len(codes), dtype=bool)
+        found[order] = self.codes[positions] == sorted_codes
+        return found
+
+
+class PackedSignatureFinder(SignatureFinder):
+    """
+    A SignatureFinder that encodes bases as 2 bits and compares k-mers as
+    uint64 codes with NumPy instead of Python strings.
+
+    It returns exactly the same signatures as `SignatureFinder`, but supports
+    k-mer sizes of at most 32. With `workers` > 1, background k-mers are
+    extracted and target windows are scanned in chunks on a process pool.
+    With `sketch_window`, backgrounds also get a MinimizerSketch that lets
+    scans skip the lookup of target stretches it proves shared.
+    """
+
+    def __init__(
+        self,
+        kmer_size: int,
+        workers: int = 1,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        sketch_window: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Initializes the PackedSignatureFinder.
+
+        Args:
+            kmer_size: The length of the k-mer to use, between 1 and 32.
+            workers: The number of worker processes. 1 runs everything in-process.
+            chunk_size: The number of k-mer windows per worker task.
+            sketch_window: The minimizer window of background sketches, or
+                           None to build backgrounds without one.
+            executor: A long-lived process pool, started with
+                      `worker_process_context()`, to use instead of starting
+                      one per `worker_pool` block. It is never shut down here.
+        """
+        if not 1 <= kmer_size <= MAX_PACKED_KMER_SIZE:
+            raise ValueError(
+                f"The packed engine supports k-mer sizes from 1 to {MAX_PACKED_KMER_SIZE}, got {kmer_size}."
+            )
+        if workers < 1 or chunk_size < 1:
+            raise ValueError("workers and chunk_size must be at least 1.")
+        super().__init__(kmer_size, sketch_window)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.shared_executor = executor
+        self._executor: Optional[Executor] = None
+        # In-memory backgrounds given a spilled_path inside the current worker_pool block.
+        self._spilled: List[PackedKmerSet] = []
+
+    @contextmanager
+    def worker_pool(self) -> Iterator[Optional[Executor]]:
+        """
+        Keeps one process pool open for every build and scan inside the block:
+        the shared executor if the finder was given one, otherwise a pool
+        started for the block.
+
+        Nested uses share the outermost pool. Yields None in single-worker mode.
+        """
+        if self.workers == 1 or self._executor is not None:
+            yield self._executor
+            return
+
+        if self.shared_executor is not None:
+            pool = nullcontext(self.shared_executor)
+        else:
+            pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_process_context())
+        with pool as executor:
+            self._executor = executor
+            try:
+                yield executor
+            finally:
+                self._executor = None
+                for background in self._spilled:
+                    if os.path.exists(background.spilled_path):
+                        os.remove(background.spilled_path)
+                    background.spilled_path = None
+                self._spilled = []
+
+    def build_background(self, background_sequences: Dict[str, str]) -> PackedKmerSet:
+        """
+        Builds a sorted, deduplicated array of every packed background k-mer.
+        """
+        with self.worker_pool() as executor:
+            if executor is None:
+                partials = [self._background_chunks(seq) for seq in background_sequences.values()]
+            else:
+                futures = [
+                    executor.submit(_background_chunk_worker, _chunk(seq, start, end + self.kmer_size - 1), self.kmer_size)
+                    for seq in background_sequences.values()
+                    for start, end in _window_chunks(len(seq), self.kmer_size, self.chunk_size)
+                ]
+                partials = [future.result() for future in futures]
+
+        ambiguous_kmers: Set[str] = set()
+        for _, chunk_ambiguous in partials:
+            ambiguous_kmers.update(chunk_ambiguous)
+        codes = merge_sorted_unique([chunk_codes for chunk_codes, _ in partials])
+        kmer_set = PackedKmerSet(self.kmer_size, codes, ambiguous_kmers)
+        kmer_set.sketch = self._build_sketch(background_sequences)
+        return kmer_set
+
+    def _prepare_sequence(self, sequence: SequenceLike) -> SequenceLike:
+        """Packed k-mers are computed from str, bytes and uint8 views alike, without copying."""
+        return sequence
+
+    def _background_chunks(self, sequence: SequenceLike) -> Tuple[np.ndarray, Set[str]]:
+        """The sorted unique codes and ambiguous k-mers of a whole sequence."""
+        codes, valid = kmer_codes(sequence, self.kmer_size)
+        # Deduplicate per genome first to keep the merged arrays small.
+        return sorted_unique(codes[valid]), _ambiguous_kmers(sequence, valid, self.kmer_size)
+
+    def find_unique_signatures(
+        self, target_sequences: Dict[str, str], background_sequences: Dict[str, str]
+    ) -> List[Dict]:
+        """
+        Finds unique signatures, sharing one worker pool between the background
+        build and the target scan.
+        """
+        with self.worker_pool():
+            return super().find_unique_signatures(target_sequences, background_sequences)
+
+    def iter_unique_signatures_in_background(
+        self,
+        target_sequences: Dict[str, str],
+        background,
+        progress: Optional[Callable[[float], None]] = None,
+        include_sequence: bool = True,
+    ) -> Iterator[Dict]:
+        with self.worker_pool():
+            yield from super().iter_unique_signatures_in_background(
+                target_sequences, background, progress, include_sequence
+            )
+
+    def find_unique_signature_table(
+        self,
+        target_sequences: Dict[str, str],
+        background,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> SignatureTable:
+        with self.worker_pool():
+            return super().find_unique_signature_table(target_sequences, background, progress)
+
+    def _codes_path(self, background: PackedKmerSet) -> str:
+        """
+        Returns a .npy file with the background codes that workers can mmap,
+        writing a temporary one for in-memory backgrounds.
+        """
+        if background.codes_path is not None:
+            return background.codes_path
+        if background.spilled_path is None:
+            fd, path = tempfile.mkstemp(suffix=".npy", prefix="isignify_background_")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.ascontiguousarray(background.codes))
+            background.spilled_path = path
+            self._spilled.append(background)
+        return background.spilled_path
+
+    def _find_unique_kmer_indices(self, target_seq: str, background: PackedKmerSet) -> np.ndarray:
+        """
+        Checks every target window against the background in one vectorized
+        pass, or in chunks across the worker pool.
+
+        Chunks return global window indices, so runs that cross a chunk
+        boundary are merged correctly afterwards. A background sketch is
+        applied to the whole target here, and each chunk only looks up the
+        windows it did not prove shared.
+        """
+        chunks = _window_chunks(len(target_seq), self.kmer_size, self.chunk_size)
+        if self._executor is None or len(chunks) < 2:
+            return _unique_window_indices(target_seq, background)
+
+        codes_path = self._codes_path(background)
+        sketch = getattr(background, "sketch", None)
+        shared = sketch.shared_windows(target_seq) if sketch is not None else None
+        futures = [
+            self._executor.submit(
+                _scan_chunk_worker,
+                _chunk(target_seq, start, end + self.kmer_size - 1),
+                start,
+                self.kmer_size,
+                codes_path,
+                background.ambiguous_kmers,
+                shared[start:end] if shared is not None else None,
+            )
+            for start, end in chunks
+        ]
+        return np.concatenate([future.result() for future in futures])
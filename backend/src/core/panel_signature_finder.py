@@ -0,0 +1,163 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+from src.core.kmer_codec import SequenceLike, kmer_codes, window_text
+from src.core.packed_signature_finder import PackedSignatureFinder, _ambiguous_kmers, sorted_unique
+
+# Genome membership is stored as one bit per genome in a uint64 mask.
+MAX_PANEL_GENOMES = 64
+
+
+class GenomeOccurrenceTable:
+    """
+    Maps every k-mer of a genome panel to the set of genomes it occurs in.
+
+    `codes` is a sorted array of packed k-mer codes and `masks` holds, for
+    each code, a bit mask with bit i set when genome i contains the k-mer.
+    K-mers that cannot be packed are kept in `ambiguous_masks` by string,
+    so lookups are exact.
+    """
+
+    def __init__(self, kmer_size: int, genome_names: List[str], codes: np.ndarray, masks: np.ndarray, ambiguous_masks: Dict[str, int]):
+        self.kmer_size = kmer_size
+        self.genome_names = genome_names
+        self.codes = codes
+        self.masks = masks
+        self.ambiguous_masks = ambiguous_masks
+
+    def __len__(self) -> int:
+        return len(self.codes) + len(self.ambiguous_masks)
+
+    def group_mask(self, names: Iterable[str]) -> int:
+        """
+        Returns the bit mask of a group of genomes.
+
+        Raises:
+            ValueError: If a name is not in the panel.
+        """
+        mask = 0
+        for name in names:
+            if name not in self.genome_names:
+                raise ValueError(f"Genome '{name}' is not in the panel.")
+            mask |= 1 << self.genome_names.index(name)
+        return mask
+
+    def window_masks(self, sequence: SequenceLike) -> np.ndarray:
+        """Returns the genome mask of every k-mer window of a sequence (0 if in no genome)."""
+        codes, valid = kmer_codes(sequence, self.kmer_size)
+        masks = np.zeros(len(codes), dtype=np.uint64)
+        if len(self.codes):
+            positions = np.searchsorted(self.codes, codes)
+            np.minimum(positions, len(self.codes) - 1, out=positions)
+            found = self.codes[positions] == codes
+            masks[found] = self.masks[positions[found]]
+        for i in np.flatnonzero(~valid).tolist():
+            masks[i] = self.ambiguous_masks.get(window_text(sequence, i, i + self.kmer_size), 0)
+        return masks
+
+
+class PanelSelection:
+    """
+    The background argument for scanning one panel genome: a window is a
+    signature when the genomes containing it are exactly `mask`.
+    """
+
+    def __init__(self, table: GenomeOccurrenceTable, mask: int):
+        self.table = table
+        self.mask = mask
+        self.kmer_size = table.kmer_size
+
+
+class PanelSignatureFinder(PackedSignatureFinder):
+    """
+    Finds signatures for every genome of a panel at once.
+
+    One pass over the panel builds a GenomeOccurrenceTable. A genome's unique
+    signatures are then its windows that occur in no other genome, which is
+    exactly what a single analysis of that genome against the rest of the
+    panel returns. Windows shared by every genome of a subgroup and by no
+    genome outside it can be found the same way.
+    """
+
+    def build_table(self, genomes: Iterable[Tuple[str, Iterable[SequenceLike]]]) -> GenomeOccurrenceTable:
+        """
+        Builds the k-mer to genome occurrence table.
+
+        Args:
+            genomes: (genome name, sequences of that genome) pairs. Each genome
+                     is read once, so they can be loaded lazily one at a time.
+
+        Raises:
+            ValueError: If the panel has more than MAX_PANEL_GENOMES genomes
+                        or repeats a name.
+        """
+        names: List[str] = []
+        code_parts: List[np.ndarray] = []
+        mask_parts: List[np.ndarray] = []
+        ambiguous_masks: Dict[str, int] = {}
+
+        for name, sequences in genomes:
+            if name in names:
+                raise ValueError(f"Genome '{name}' appears more than once in the panel.")
+            if len(names) == MAX_PANEL_GENOMES:
+                raise ValueError(f"A panel can have at most {MAX_PANEL_GENOMES} genomes.")
+            bit = 1 << len(names)
+            names.append(name)
+
+            genome_codes = []
+            for sequence in sequences:
+                codes, valid = kmer_codes(sequence, self.kmer_size)
+                genome_codes.append(sorted_unique(codes[valid]))
+                for kmer in _ambiguous_kmers(sequence, valid, self.kmer_size):
+                    ambiguous_masks[kmer] = ambiguous_masks.get(kmer, 0) | bit
+            genome_codes = sorted_unique(np.concatenate(genome_codes)) if genome_codes else np.empty(0, dtype=np.uint64)
+            code_parts.append(genome_codes)
+            mask_parts.append(np.full(len(genome_codes), bit, dtype=np.uint64))
+
+        codes, masks = self._merge_occurrences(code_parts, mask_parts)
+        return GenomeOccurrenceTable(self.kmer_size, names, codes, masks, ambiguous_masks)
+
+    @staticmethod
+    def _merge_occurrences(code_parts: Sequence[np.ndarray], mask_parts: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Unions per-genome sorted code arrays, OR-ing the masks of equal codes."""
+        if not code_parts:
+            return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.uint64)
+        codes = np.concatenate(code_parts)
+        # The parts are sorted runs, which a stable (tim)sort merges cheaply.
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        masks = np.concatenate(mask_parts)[order]
+        if len(codes) == 0:
+            return codes, masks
+        starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+        return codes[starts], np.bitwise_or.reduceat(masks, starts)
+
+    def selection(self, table: GenomeOccurrenceTable, genome: Optional[str] = None, group: Optional[Iterable[str]] = None) -> PanelSelection:
+        """
+        The selection for one genome's unique signatures, or for the k-mers
+        shared by every genome in `group` and absent from the rest.
+        """
+        return PanelSelection(table, table.group_mask(group if group is not None else [genome]))
+
+    def _find_unique_kmer_indices(self, target_seq: SequenceLike, background: PanelSelection) -> np.ndarray:
+        """Returns the windows whose genome mask is exactly the selected one."""
+        return np.flatnonzero(background.table.window_masks(target_seq) == np.uint64(background.mask))
+
+    def iter_panel_signatures(
+        self,
+        table: GenomeOccurrenceTable,
+        genome: str,
+        sequences: Dict[str, SequenceLike],
+        group: Optional[Iterable[str]] = None,
+        include_sequence: bool = True,
+    ) -> Iterator[Dict]:
+        """
+        Yields the signatures of one panel genome, given its sequences.
+
+        Without `group`, these are the genome's unique signatures. With
+        `group` (which must include `genome`), they are the regions of this
+        genome shared by the whole group and absent from the rest of the panel.
+        """
+        return self.iter_unique_signatures_in_background(
+            sequences, self.selection(table, genome, group), include_sequence=include_sequence
+        )
@@ -0,0 +1,353 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+import os
+import shutil
+import tempfile
+import weakref
+import zlib
+import numpy as np
+
+from src.core.kmer_codec import SequenceLike, hash_codes, kmer_codes, window_text
+from src.core.packed_signature_finder import PackedSignatureFinder, _ambiguous_kmers, sorted_unique
+
+# Default memory cap of a partitioned analysis.
+DEFAULT_MEMORY_LIMIT_BYTES = 1 << 30
+
+# Bucket files are kept open while they are written, so their number is capped
+# well below the usual limit of 1024 open files per process.
+MAX_BUCKETS = 256
+
+# Bytes held per background k-mer while a bucket is sorted or looked up:
+# the codes, a sorted copy and the search positions.
+_BYTES_PER_BACKGROUND_KMER = 24
+# Bytes held per k-mer window while a chunk of a sequence is encoded and
+# partitioned: codes, hashes, bucket ids, the sort order and the records.
+_BYTES_PER_WINDOW = 64
+
+
+def _bucket_ids(codes: np.ndarray, bucket_bits: int) -> np.ndarray:
+    """The bucket of each code: the top `bucket_bits` bits of its hash."""
+    if bucket_bits == 0:
+        return np.zeros(len(codes), dtype=np.intp)
+    return (hash_codes(codes) >> np.uint64(64 - bucket_bits)).astype(np.intp)
+
+
+def _text_bucket_ids(texts: np.ndarray, bucket_bits: int) -> np.ndarray:
+    """The bucket of each ambiguous k-mer, from the CRC-32 of its text."""
+    checksums = np.array([zlib.crc32(text.encode("utf-8")) for text in texts.tolist()], dtype=np.uint64)
+    return _bucket_ids(checksums, bucket_bits)
+
+
+def _ambiguous_dtype(kmer_size: int) -> np.dtype:
+    """The text of an ambiguous k-mer, padded to the k-mer size."""
+    return np.dtype(f"<U{kmer_size}")
+
+
+def _ambiguous_record_dtype(kmer_size: int) -> np.dtype:
+    """An ambiguous target window: its text and its window position."""
+    return np.dtype([("text", _ambiguous_dtype(kmer_size)), ("position", "<i8")])
+
+
+class _BucketWriter:
+    """Appends arrays to one file per bucket, opening each file on first use."""
+
+    def __init__(self, directory: str, prefix: str, bucket_count: int):
+        self.paths = [os.path.join(directory, f"{prefix}_{i:04d}.bin") for i in range(bucket_count)]
+        self._files: Dict[int, object] = {}
+
+    def write(self, values: np.ndarray, bucket_ids: np.ndarray) -> None:
+        """Writes each row of `values` to the file of its bucket."""
+        order = np.argsort(bucket_ids, kind="stable")
+        values = values[order]
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(bucket_ids, minlength=len(self.paths)))))
+        for bucket in np.flatnonzero(bounds[1:] > bounds[:-1]).tolist():
+            if bucket not in self._files:
+                self._files[bucket] = open(self.paths[bucket], "ab")
+            values[bounds[bucket]:bounds[bucket + 1]].tofile(self._files[bucket])
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def __enter__(self) -> "_BucketWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PartitionedBackground:
+    """
+    Background k-mers split by hash into bucket files on disk, each holding
+    the sorted, deduplicated codes of its k-mers. K-mers that cannot be
+    packed are bucketed the same way by the hash of their text, into files of
+    their own. Only one bucket needs to be in memory at a time.
+
+    The directory is removed when the background is closed or garbage collected.
+    """
+
+    def __init__(
+        self, kmer_size: int, directory: str, bucket_count: int, kmer_count: int = 0, ambiguous_count: int = 0
+    ):
+        self.kmer_size = kmer_size
+        self.directory = directory
+        self.bucket_count = bucket_count
+        self.bucket_bits = bucket_count.bit_length() - 1
+        self.kmer_count = kmer_count
+        self.ambiguous_count = ambiguous_count
+        self._finalizer = weakref.finalize(self, shutil.rmtree, directory, True)
+
+    def __len__(self) -> int:
+        return self.kmer_count + self.ambiguous_count
+
+    def bucket_path(self, bucket: int) -> str:
+        return os.path.join(self.directory, f"background_{bucket:04d}.bin")
+
+    def ambiguous_bucket_path(self, bucket: int) -> str:
+        return os.path.join(self.directory, f"ambiguous_{bucket:04d}.bin")
+
+    def load_bucket(self, bucket: int) -> np.ndarray:
+        """The sorted codes of one bucket."""
+        path = self.bucket_path(bucket)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=np.uint64)
+        return np.fromfile(path, dtype=np.uint64)
+
+    def load_ambiguous_bucket(self, bucket: int) -> np.ndarray:
+        """The sorted texts of the ambiguous k-mers of one bucket."""
+        path = self.ambiguous_bucket_path(bucket)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=_ambiguous_dtype(self.kmer_size))
+        return np.fromfile(path, dtype=_ambiguous_dtype(self.kmer_size))
+
+    def close(self) -> None:
+        """Deletes the bucket files."""
+        self._finalizer()
+
+
+class PartitionedSignatureFinder(PackedSignatureFinder):
+    """
+    An out-of-core SignatureFinder for backgrounds too large to hold in memory.
+
+    Background k-mers and target windows are partitioned into bucket files
+    on disk by a prefix of their hash, so a k-mer and every copy of it land in
+    the same bucket. Buckets are then checked one at a time, and the unique
+    windows are reassembled into regions in target order. The result is
+    exactly that of `SignatureFinder`.
+
+    Memory use is bounded by `memory_limit_bytes` plus one byte per target
+    window; the target sequences themselves are held in memory. A background
+    too large to split into MAX_BUCKETS buckets within that limit is refused.
+    """
+
+    def __init__(self, kmer_size: int, memory_limit_bytes: int = DEFAULT_MEMORY_LIMIT_BYTES, work_dir: Optional[str] = None):
+        """
+        Initializes the PartitionedSignatureFinder.
+
+        Args:
+            kmer_size: The length of the k-mer to use, between 1 and 32.
+            memory_limit_bytes: The working memory the bucket sizes and chunk
+                                sizes are chosen for.
+            work_dir: Where bucket files are written. Defaults to the system
+                      temporary directory.
+        """
+        super().__init__(kmer_size)
+        if memory_limit_bytes < 1:
+            raise ValueError("memory_limit_bytes must be at least 1.")
+        self.memory_limit_bytes = memory_limit_bytes
+        self.work_dir = work_dir
+        # Windows encoded at once; half the budget is left for a loaded bucket.
+        self.chunk_windows = max(memory_limit_bytes // (2 * _BYTES_PER_WINDOW), 1024)
+
+    def bucket_count_for(self, expected_kmers: int) -> int:
+        """
+        The number of buckets (a power of two) that keeps one background
+        bucket within half of the memory limit.
+
+        Raises:
+            ValueError: If that takes more than MAX_BUCKETS buckets.
+        """
+        needed = -(-expected_kmers * _BYTES_PER_BACKGROUND_KMER // max(self.memory_limit_bytes // 2, 1))
+        if needed > MAX_BUCKETS:
+            raise ValueError(
+                f"A background of up to {expected_kmers} k-mers needs {needed} buckets to stay within "
+                f"{self.memory_limit_bytes} bytes, more than the {MAX_BUCKETS} allowed. "
+                "Raise the memory limit of the partitioned engine."
+            )
+        bucket_count = 1
+        while bucket_count < needed:
+            bucket_count *= 2
+        return bucket_count
+
+    def build_background(self, background_sequences: Dict[str, str]) -> PartitionedBackground:
+        expected_kmers = sum(max(len(seq) - self.kmer_size + 1, 0) for seq in background_sequences.values())
+        return self.build_partitions(background_sequences.values(), expected_kmers)
+
+    def build_partitions(self, sequences: Iterable[SequenceLike], expected_kmers: int) -> PartitionedBackground:
+        """
+        Writes the background k-mers to bucket files, reading the sequences
+        one at a time and encoding each in chunks.
+
+        Args:
+            sequences: The background sequences, e.g. a generator over files.
+            expected_kmers: An upper bound on the number of background k-mers,
+                            used to choose the number of buckets.
+        """
+        bucket_count = self.bucket_count_for(expected_kmers)
+        if self.work_dir:
+            os.makedirs(self.work_dir, exist_ok=True)
+        directory = tempfile.mkdtemp(prefix="isignify_partitions_", dir=self.work_dir)
+        bucket_bits = bucket_count.bit_length() - 1
+        text_dtype = _ambiguous_dtype(self.kmer_size)
+        try:
+            with _BucketWriter(directory, "background", bucket_count) as writer, \
+                    _BucketWriter(directory, "ambiguous", bucket_count) as ambiguous_writer:
+                for sequence in sequences:
+                    for start in range(0, max(len(sequence) - self.kmer_size + 1, 0), self.chunk_windows):
+                        chunk = sequence[start:start + self.chunk_windows + self.kmer_size - 1]
+                        codes, valid = kmer_codes(chunk, self.kmer_size)
+                        if not valid.all():
+                            texts = np.array(sorted(_ambiguous_kmers(chunk, valid, self.kmer_size)), dtype=text_dtype)
+                            ambiguous_writer.write(texts, _text_bucket_ids(texts, bucket_bits))
+                        codes = sorted_unique(codes[valid])
+                        writer.write(codes, _bucket_ids(codes, bucket_bits))
+
+            # Sort and deduplicate each bucket once, so every scan can use it as is.
+            kmer_count = 0
+            for path in writer.paths:
+                if os.path.exists(path):
+                    codes = sorted_unique(np.fromfile(path, dtype=np.uint64))
+                    codes.tofile(path)
+                    kmer_count += len(codes)
+                    del codes
+            ambiguous_count = 0
+            for path in ambiguous_writer.paths:
+                if os.path.exists(path):
+                    texts = np.unique(np.fromfile(path, dtype=text_dtype))
+                    texts.tofile(path)
+                    ambiguous_count += len(texts)
+                    del texts
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        return PartitionedBackground(self.kmer_size, directory, bucket_count, kmer_count, ambiguous_count)
+
+    def unique_kmer_indices(
+        self,
+        target_sequences: Dict[str, str],
+        background: PartitionedBackground,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> Dict:
+        """Checks every target window, one bucket at a time, and splits the result per sequence."""
+        prepared = [(seq_id, self._prepare_sequence(seq)) for seq_id, seq in target_sequences.items()]
+        window_counts = [max(len(seq) - self.kmer_size + 1, 0) for _, seq in prepared]
+        offsets = np.concatenate(([0], np.cumsum(window_counts, dtype=np.int64)))
+        unique = self._unique_window_mask(prepared, offsets, background, progress)
+        if progress is not None:
+            progress(1.0)
+        return {
+            seq_id: np.flatnonzero(unique[start:end])
+            for (seq_id, _), start, end in zip(prepared, offsets[:-1].tolist(), offsets[1:].tolist())
+        }
+
+    def iter_unique_signatures_in_background(
+        self,
+        target_sequences: Dict[str, str],
+        background: PartitionedBackground,
+        progress: Optional[Callable[[float], None]] = None,
+        include_sequence: bool = True,
+    ) -> Iterator[Dict]:
+        """
+        Yields unique signature regions in target order once every bucket
+        has been checked.
+        """
+        indices = self._timed_unique_kmer_indices(target_sequences, background, progress)
+        with self.instrumentation.stage_total("merge") as merge:
+            for seq_id, target_seq in target_sequences.items():
+                yield from self._signatures_from_indices(
+                    seq_id, self._prepare_sequence(target_seq), indices[seq_id], include_sequence, merge=merge
+                )
+
+    def _unique_window_mask(
+        self,
+        prepared: List,
+        offsets: np.ndarray,
+        background: PartitionedBackground,
+        progress: Optional[Callable[[float], None]],
+    ) -> np.ndarray:
+        """
+        Marks every unique target window, indexed by its position in the
+        concatenated windows of all target sequences.
+        """
+        unique = np.zeros(int(offsets[-1]), dtype=bool)
+        record_dtype = _ambiguous_record_dtype(self.kmer_size)
+        directory = tempfile.mkdtemp(prefix="isignify_target_", dir=self.work_dir)
+        try:
+            # Pass 1: partition (code, window position) records of the target
+            # into the same buckets as the background, and (text, window
+            # position) records of the windows that could not be packed into
+            # the same buckets as the ambiguous background k-mers.
+            with _BucketWriter(directory, "target", background.bucket_count) as writer, \
+                    _BucketWriter(directory, "target_ambiguous", background.bucket_count) as ambiguous_writer:
+                for (_, target_seq), offset in zip(prepared, offsets[:-1].tolist()):
+                    window_count = max(len(target_seq) - self.kmer_size + 1, 0)
+                    for start in range(0, window_count, self.chunk_windows):
+                        chunk = target_seq[start:start + self.chunk_windows + self.kmer_size - 1]
+                        codes, valid = kmer_codes(chunk, self.kmer_size)
+                        invalid = np.flatnonzero(~valid)
+                        if len(invalid):
+                            ambiguous = np.empty(len(invalid), dtype=record_dtype)
+                            ambiguous["text"] = [window_text(chunk, i, i + self.kmer_size) for i in invalid.tolist()]
+                            ambiguous["position"] = invalid + (offset + start)
+                            ambiguous_writer.write(
+                                ambiguous, _text_bucket_ids(ambiguous["text"], background.bucket_bits)
+                            )
+                        positions = np.flatnonzero(valid)
+                        records = np.empty((len(positions), 2), dtype=np.uint64)
+                        records[:, 0] = codes[positions]
+                        records[:, 1] = positions + (offset + start)
+                        writer.write(records, _bucket_ids(records[:, 0], background.bucket_bits))
+
+            # Pass 2: one bucket at a time, look up the target records in
+            # batches against the background codes of that bucket.
+            batch_records = max(self.chunk_windows, 1)
+            for bucket, path in enumerate(writer.paths):
+                if progress is not None:
+                    progress(bucket / background.bucket_count)
+                if not os.path.exists(path):
+                    continue
+                background_codes = background.load_bucket(bucket)
+                record_count = os.path.getsize(path) // 16
+                for first in range(0, record_count, batch_records):
+                    records = np.fromfile(
+                        path, dtype=np.uint64, count=2 * min(batch_records, record_count - first), offset=16 * first
+                    ).reshape(-1, 2)
+                    found = self._contains(background_codes, records[:, 0])
+                    unique[records[~found, 1].astype(np.intp)] = True
+                del background_codes
+
+            for bucket, path in enumerate(ambiguous_writer.paths):
+                if not os.path.exists(path):
+                    continue
+                background_texts = background.load_ambiguous_bucket(bucket)
+                record_count = os.path.getsize(path) // record_dtype.itemsize
+                for first in range(0, record_count, batch_records):
+                    records = np.fromfile(
+                        path, dtype=record_dtype, count=min(batch_records, record_count - first),
+                        offset=record_dtype.itemsize * first,
+                    )
+                    found = self._contains(background_texts, records["text"])
+                    unique[records["position"][~found]] = True
+                del background_texts
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        return unique
+
+    @staticmethod
+    def _contains(sorted_codes: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """A mask of which codes (or k-mer texts) occur in a sorted array of them."""
+        if len(sorted_codes) == 0:
+            return np.zeros(len(codes), dtype=bool)
+        positions = np.searchsorted(sorted_codes, codes)
+        np.minimum(positions, len(sorted_codes) - 1, out=positions)
+        return sorted_codes[positions] == codes
@@ -1,6 +1,92 @@
-import sys
+import os
 import tempfile
-from Bio import SeqIO
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+
+from src.core.compressed_fasta import uncompressed_size_hint
+from src.core.sequence_parser import FastaSource, SequenceParser
+from src.core.signature_table import SignatureTable
+
+# Number of 'N' bases placed between contigs in a merged sequence.
+SPACER_LENGTH = 100
+
+# Line width used when a merged sequence is written back to FASTA.
+FASTA_LINE_WIDTH = 60
+
+
+@dataclass
+class Contig:
+    """The position of one contig inside a merged sequence."""
+    header: str
+    start: int
+    end: int
+
+
+@dataclass
+class MergedGenome:
+    """
+    A multi-contig genome merged into one in-memory sequence.
+
+    `sequence` holds every contig separated by SPACER_LENGTH 'N' bases, and
+    `contigs` is the offset table locating each contig inside it.
+    """
+    header: str
+    sequence: bytearray
+    contigs: List[Contig] = field(default_factory=list)
+
+    def contig_sequences(self) -> Dict[int, memoryview]:
+        """
+        Returns each contig as a zero-copy view into the merged sequence,
+        keyed by its index in `contigs`. Spacers are never included.
+        """
+        view = memoryview(self.sequence)
+        return {i: view[contig.start:contig.end] for i, contig in enumerate(self.contigs)}
+
+    def to_merged_signature(self, signature: Dict) -> Dict:
+        """
+        Converts a signature found in `contig_sequences()` into merged
+        coordinates, keeping the per-contig coordinates alongside them.
+        """
+        contig = self.contigs[signature['sequence_id']]
+        return {
+            **signature,
+            'sequence_id': self.header,
+            'start': contig.start + signature['start'],
+            'end': contig.start + signature['end'],
+            'contig_id': contig.header,
+            'contig_start': signature['start'],
+            'contig_end': signature['end'],
+        }
+
+    def to_merged_signatures(self, signatures: List[Dict]) -> List[Dict]:
+        """Applies `to_merged_signature` to every signature in a list."""
+        return [self.to_merged_signature(sig) for sig in signatures]
+
+    def to_merged_table(self, table: SignatureTable) -> SignatureTable:
+        """
+        Converts a SignatureTable found in `contig_sequences()` into merged
+        coordinates, with the per-contig coordinates as its contig columns.
+        The bases are read from the merged sequence.
+        """
+        contig_index = np.array(table.sequence_ids, dtype=np.int32)[table.sequence_index]
+        offsets = np.array([contig.start for contig in self.contigs], dtype=np.int64)[contig_index]
+        return SignatureTable(
+            [self.header],
+            np.zeros(len(table), dtype=np.int32),
+            table.starts + offsets,
+            table.ends + offsets,
+            sequences=None if table.sequences is None else [self.sequence],
+            bases=table.bases,
+            base_starts=table.base_starts,
+            base_ends=table.base_ends,
+            contig_ids=[contig.header for contig in self.contigs],
+            contig_index=contig_index,
+            contig_starts=table.starts,
+            contig_ends=table.ends,
+        )
+
 
 class FastaPreprocessor:
     """
@@ -8,10 +94,50 @@ class FastaPreprocessor:
     Specifically, it merges multi-contig files into a single-sequence format.
     """
 
+    def merge_contigs(self, source: FastaSource) -> MergedGenome:
+        """
+        Merges every record of a FASTA file into one in-memory sequence.
+
+        The records are streamed once and copied into a single buffer that is
+        preallocated from the file's uncompressed size, with a 100 'N' spacer
+        between contigs.
+
+        Args:
+            source: A path to a FASTA file, or a binary file object. Gzip and
+                    BGZF input is inflated as it is read.
+
+        Returns:
+            The merged genome and its contig offset table. The header is the
+            header of the first record.
+        """
+        capacity = uncompressed_size_hint(source) if isinstance(source, (str, os.PathLike)) else 0
+        buffer = bytearray(capacity)
+        contigs: List[Contig] = []
+        position = 0
+
+        for header, sequence in SequenceParser().iter_records(source, output="bytes"):
+            spacer = SPACER_LENGTH if contigs else 0
+            required = position + spacer + len(sequence)
+            if required > len(buffer):
+                # Only reachable for file objects or many tiny contigs.
+                buffer.extend(bytes(max(required - len(buffer), len(buffer) // 2)))
+
+            buffer[position:position + spacer] = b"N" * spacer
+            position += spacer
+            buffer[position:position + len(sequence)] = sequence
+            contigs.append(Contig(header=header, start=position, end=position + len(sequence)))
+            position += len(sequence)
+
+        del buffer[position:]
+        return MergedGenome(header=contigs[0].header if contigs else "", sequence=buffer, contigs=contigs)
+
     def process_file(self, input_path: str) -> str:
         """
         Checks a FASTA file, and if it's multi-contig, merges it.
 
+        Prefer `merge_contigs`, which returns the merged sequence in memory
+        instead of writing it to a new file.
+
         Args:
             input_path: The path to the input FASTA file.
 
@@ -20,32 +146,23 @@ class FastaPreprocessor:
             If no processing was needed, it returns the original input_path.
         """
         try:
-            # Read all sequences from the input file 
-            records = list(SeqIO.parse(input_path, "fasta"))
-
-            # If there's more than one record, it's a multi-contig file 
-            if len(records) > 1:
-                print(f"Merging {len(records)} contigs from {input_path}")
-                
-                # Use the first record as the base for the merged sequence 
-                merged_record = records[0]
-                merged_sequence = str(records[0].seq)
-
-                # Append subsequent records with a 100 'N' spacer 
-                for record in records[1:]:
-                    merged_sequence += 'N' * 100 + str(record.seq)
-                
-                merged_record.seq = merged_sequence
-                
+            genome = self.merge_contigs(input_path)
+
+            # If there's more than one record, it's a multi-contig file
+            if len(genome.contigs) > 1:
+                print(f"Merging {len(genome.contigs)} contigs from {input_path}")
+
                 # Create a new temporary file to store the result
-                with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix=".fna") as tmp_file:
-                    SeqIO.write(merged_record, tmp_file, "fasta")
+                with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix=".fna") as tmp_file:
+                    tmp_file.write(genome.header.encode("utf-8") + b"\n")
+                    for start in range(0, len(genome.sequence), FASTA_LINE_WIDTH):
+                        tmp_file.write(genome.sequence[start:start + FASTA_LINE_WIDTH] + b"\n")
                     return tmp_file.name
             else:
-                # If only one sequence, no changes needed, return the original path 
+                # If only one sequence, no changes needed, return the original path
                 print("File already has one sequence; no changes needed.")
                 return input_path
         except Exception as e:
             print(f"Error processing FASTA file {input_path}: {e}")
             # In case of error, return the original path to let the next step handle it
-            return input_path
\ No newline at end of file
+            return input_path
@@ -0,0 +1,137 @@
+"""
+Merging unique k-mer windows into regions, and filtering the regions
+before any of them is turned into a signature.
+
+Regions are handled as arrays of (start, end) coordinates, so filters cost
+a few vectorized passes however many regions there are; only the regions
+that pass are sliced out of the target and formatted.
+"""
+import heapq
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.kmer_codec import SequenceLike, as_uint8_array
+
+_IS_GC = np.zeros(256, dtype=np.uint8)
+_IS_GC[list(b"GCgc")] = 1
+# Anything but a (possibly soft-masked) A, C, G or T.
+_IS_AMBIGUOUS = np.ones(256, dtype=np.uint8)
+_IS_AMBIGUOUS[list(b"ACGTacgt")] = 0
+
+
+def index_runs(indices) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Splits sorted window start indices into runs of consecutive indices and
+    returns the first and last index of each run, by finding the breaks
+    between runs instead of walking every index.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    if len(indices) == 0:
+        return indices, indices
+    breaks = np.flatnonzero(np.diff(indices) != 1)
+    starts = np.concatenate(([indices[0]], indices[breaks + 1]))
+    lasts = np.concatenate((indices[breaks], [indices[-1]]))
+    return starts, lasts
+
+
+def _region_counts(sequence: SequenceLike, starts: np.ndarray, ends: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """The number of bases flagged by `table` in each region [start, end)."""
+    low, high = int(starts.min()), int(ends.max())
+    flagged = table[as_uint8_array(sequence)[low:high]]
+    totals = np.zeros(high - low + 1, dtype=np.int64)
+    np.cumsum(flagged, out=totals[1:])
+    return totals[ends - low] - totals[starts - low]
+
+
+@dataclass(frozen=True)
+class RegionFilter:
+    """
+    Which signature regions to keep. Unset criteria keep everything.
+
+    GC content and the ambiguous fraction are fractions of the region's
+    length; ambiguous bases are anything but A, C, G or T in either case.
+    `top_n` keeps the longest regions (the earliest of equally long ones),
+    still reported in target order.
+    """
+    min_length: Optional[int] = None
+    max_length: Optional[int] = None
+    min_gc: Optional[float] = None
+    max_gc: Optional[float] = None
+    max_ambiguous_fraction: Optional[float] = None
+    top_n: Optional[int] = None
+
+    def __post_init__(self):
+        for name in ("min_length", "max_length", "top_n"):
+            value = getattr(self, name)
+            if value is not None and value < 1:
+                raise ValueError(f"{name} must be at least 1.")
+        for name in ("min_gc", "max_gc", "max_ambiguous_fraction"):
+            value = getattr(self, name)
+            if value is not None and not 0.0 <= value <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1.")
+        if self.min_length is not None and self.max_length is not None and self.min_length > self.max_length:
+            raise ValueError("min_length must not be greater than max_length.")
+        if self.min_gc is not None and self.max_gc is not None and self.min_gc > self.max_gc:
+            raise ValueError("min_gc must not be greater than max_gc.")
+
+    @property
+    def is_active(self) -> bool:
+        return any(value is not None for value in self.options().values())
+
+    def options(self) -> Dict:
+        """The criteria as a dictionary, e.g. for cache keys."""
+        return {
+            "min_length": self.min_length,
+            "max_length": self.max_length,
+            "min_gc": self.min_gc,
+            "max_gc": self.max_gc,
+            "max_ambiguous_fraction": self.max_ambiguous_fraction,
+            "top_n": self.top_n,
+        }
+
+    def select(self, starts: np.ndarray, ends: np.ndarray, sequence: SequenceLike) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (start, end) arrays of the regions of one sequence that
+        pass the filter. Cheap criteria are applied first, so base
+        composition is only counted for regions of an acceptable length.
+        """
+        lengths = ends - starts
+        keep = np.ones(len(starts), dtype=bool)
+        if self.min_length is not None:
+            keep &= lengths >= self.min_length
+        if self.max_length is not None:
+            keep &= lengths <= self.max_length
+        starts, ends, lengths = starts[keep], ends[keep], lengths[keep]
+
+        if len(starts) and (self.min_gc is not None or self.max_gc is not None):
+            gc = _region_counts(sequence, starts, ends, _IS_GC) / lengths
+            keep = np.ones(len(starts), dtype=bool)
+            if self.min_gc is not None:
+                keep &= gc >= self.min_gc
+            if self.max_gc is not None:
+                keep &= gc <= self.max_gc
+            starts, ends, lengths = starts[keep], ends[keep], lengths[keep]
+
+        if len(starts) and self.max_ambiguous_fraction is not None:
+            ambiguous = _region_counts(sequence, starts, ends, _IS_AMBIGUOUS) / lengths
+            keep = ambiguous <= self.max_ambiguous_fraction
+            starts, ends, lengths = starts[keep], ends[keep], lengths[keep]
+
+        if self.top_n is not None and len(starts) > self.top_n:
+            # Longest first, earliest first among equals; then back to target order.
+            chosen = np.sort(np.lexsort((starts, -lengths))[:self.top_n])
+            starts, ends = starts[chosen], ends[chosen]
+        return starts, ends
+
+
+def longest_signatures(signatures: Iterable[Dict], count: int) -> List[Dict]:
+    """
+    The `count` longest signatures (the earliest of equally long ones), in
+    their original order. Only `count` signatures are held at a time.
+    """
+    longest = heapq.nsmallest(
+        count, enumerate(signatures), key=lambda item: (-item[1]['length'], item[0])
+    )
+    return [sig for _, sig in sorted(longest, key=lambda item: item[0])]
@@ -0,0 +1,57 @@
+"""
+Helpers for measuring the memory use of the current process.
+"""
+import resource
+import sys
+from typing import Optional
+
+_PROC_STATUS = "/proc/self/status"
+_PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def current_rss_bytes() -> Optional[int]:
+    """The resident set size of this process, or None where it cannot be read."""
+    return _read_status_field("VmRSS")
+
+
+def peak_rss_bytes() -> int:
+    """
+    The peak resident set size of this process, in bytes, since it started
+    or since the last successful `reset_peak_rss`.
+    """
+    peak = _read_status_field("VmHWM")
+    if peak is not None:
+        return peak
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def reset_peak_rss() -> bool:
+    """
+    Resets the peak RSS to the current RSS so a later `peak_rss_bytes` covers
+    only what happens in between. Only supported on Linux.
+
+    The peak is process-wide, so work running concurrently in other threads
+    is included.
+
+    Returns:
+        True if the peak was reset.
+    """
+    try:
+        with open(_PROC_CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _read_status_field(name: str) -> Optional[int]:
+    try:
+        with open(_PROC_STATUS) as f:
+            for line in f:
+                if line.startswith(name + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
@@ -1,9 +1,117 @@
-from typing import Dict
+from typing import BinaryIO, Dict, Iterator, Tuple, Union
+import os
+import numpy as np
+
+from src.core.compressed_fasta import open_fasta
+
+# Number of bytes read from the file at a time.
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+# The sequence types the parser can return, selected with `output`.
+OUTPUT_TYPES = ("str", "bytes", "array")
+
+FastaSource = Union[str, os.PathLike, BinaryIO]
+
 
 class SequenceParser:
     """A simple parser for reading FASTA formatted sequence files."""
 
-    def parse(self, file_path: str) -> Dict[str, str]:
+    def __init__(self, block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Initializes the SequenceParser.
+
+        Args:
+            block_size: The number of bytes read from the file at a time.
+        """
+        self.block_size = block_size
+
+    def _iter_raw_records(self, stream: BinaryIO) -> Iterator[Tuple[bytes, bytes]]:
+        """
+        Yields (header line, sequence) pairs as bytes, reading the stream in
+        large blocks and joining each record's lines once at the end.
+        """
+        header = None
+        parts = []
+        leftover = b""
+        # True while the sequence line in progress has already been partly
+        # added to `parts`, so very long lines are never re-copied per block.
+        in_sequence_line = False
+
+        while True:
+            block = stream.read(self.block_size)
+            if not block:
+                lines = [leftover]
+            else:
+                lines = (leftover + block).split(b"\n")
+                # The last line may continue in the next block.
+                leftover = lines.pop()
+
+            for i, line in enumerate(lines):
+                if in_sequence_line and i == 0:
+                    # The rest of a sequence line started in an earlier block.
+                    parts.append(line.rstrip())
+                    in_sequence_line = False
+                    continue
+
+                line = line.strip()
+                if not line:
+                    continue  # Skip empty lines
+
+                if line.startswith(b">"):
+                    if header is not None:
+                        yield header, b"".join(parts)
+                    header = line
+                    parts = []
+                elif header is not None:
+                    parts.append(line)
+
+            if not block:
+                break
+
+            # Move an unfinished sequence line into `parts` now instead of
+            # carrying it over; header lines are kept whole.
+            fragment = leftover if in_sequence_line else leftover.lstrip()
+            if header is not None and fragment and (in_sequence_line or not fragment.startswith(b">")):
+                # Trailing whitespace is carried over, in case the line ends there.
+                body = fragment.rstrip()
+                parts.append(body)
+                leftover = fragment[len(body):]
+                in_sequence_line = True
+
+        if header is not None:
+            yield header, b"".join(parts)
+
+    def iter_records(self, source: FastaSource, output: str = "str") -> Iterator[Tuple[str, Union[str, bytes, np.ndarray]]]:
+        """
+        Streams the records of a FASTA file one at a time.
+
+        Args:
+            source: A path to a FASTA file, or a binary file object. Gzip and
+                    BGZF input is inflated as it is read.
+            output: The type of each sequence: "str", "bytes", or "array" for a
+                    read-only NumPy uint8 view of the bytes (no extra copy).
+
+        Yields:
+            (header, sequence) tuples, where the header includes the leading '>'.
+        """
+        if output not in OUTPUT_TYPES:
+            raise ValueError(f"output must be one of {OUTPUT_TYPES}, got '{output}'")
+
+        with open_fasta(source, chunk_size=self.block_size) as stream:
+            yield from self._convert_records(self._iter_raw_records(stream), output)
+
+    @staticmethod
+    def _convert_records(records: Iterator[Tuple[bytes, bytes]], output: str):
+        for header, sequence in records:
+            header = header.decode("utf-8", errors="replace")
+            if output == "str":
+                yield header, sequence.decode("utf-8", errors="replace")
+            elif output == "array":
+                yield header, np.frombuffer(sequence, dtype=np.uint8)
+            else:
+                yield header, sequence
+
+    def parse(self, file_path: FastaSource, output: str = "str") -> Dict[str, Union[str, bytes, np.ndarray]]:
         """
         Reads a FASTA file and returns a dictionary of its sequences.
 
@@ -12,27 +120,19 @@ class SequenceParser:
 
         Args:
             file_path: The absolute or relative path to the FASTA file.
+            output: The type of each sequence, as for `iter_records`.
 
         Returns:
             A dictionary where keys are the sequence headers (e.g., '>seq1')
             and values are the corresponding DNA sequence strings.
         """
-        sequences: Dict[str, str] = {}
-        current_sequence_header = ""
+        if output not in OUTPUT_TYPES:
+            raise ValueError(f"output must be one of {OUTPUT_TYPES}, got '{output}'")
+        sequences: Dict[str, Union[str, bytes, np.ndarray]] = {}
 
         try:
-            with open(file_path, 'r') as file:
-                for line in file:
-                    line = line.strip()
-                    if not line:
-                        continue  # Skip empty lines
-
-                    if line.startswith('>'):
-                        current_sequence_header = line
-                        sequences[current_sequence_header] = ""
-                    elif current_sequence_header:
-                        # Append the sequence data to the current header
-                        sequences[current_sequence_header] += line
+            for header, sequence in self.iter_records(file_path, output=output):
+                sequences[header] = sequence
         except FileNotFoundError:
             print(f"Error: File not found at {file_path}")
             return {}
@@ -40,4 +140,4 @@ class SequenceParser:
             print(f"An error occurred: {e}")
             return {}
 
-        return sequences
\ No newline at end of file
+        return sequences
@@ -1,19 +1,48 @@
-from typing import Dict, Set, List
+from typing import Callable, Dict, Iterator, Set, List, Optional, Tuple
+import numpy as np
+
+from src.core.instrumentation import NULL_INSTRUMENTATION, NULL_STAGE_TOTAL, StageTotal
+from src.core.kmer_codec import MAX_PACKED_KMER_SIZE
+from src.core.minimizer_sketch import MinimizerSketch
+from src.core.regions import RegionFilter, index_runs
+from src.core.signature_table import SignatureTable
+
+
+class KmerSet(set):
+    """
+    A set of background k-mer strings, with a MinimizerSketch of the same
+    genomes if one was built.
+    """
+    sketch: Optional[MinimizerSketch] = None
+
+
 class SignatureFinder:
     """
     Finds unique DNA sequences (signatures) in a target genome by comparing
     it against a set of background genomes.
     """
 
-    def __init__(self, kmer_size: int):
+    # Records the scan and merge stages when set to an Instrumentation.
+    instrumentation = NULL_INSTRUMENTATION
+    # Drops regions before they are formatted as signatures when set.
+    region_filter: Optional[RegionFilter] = None
+
+    def __init__(self, kmer_size: int, sketch_window: Optional[int] = None):
         """
         Initializes the SignatureFinder.
 
         Args:
             kmer_size: The length of the k-mer to use for signature discovery.
                        A k-mer is a DNA sequence of a specific length 'k'.
+            sketch_window: The minimizer window of background sketches, or
+                           None to build backgrounds without one. Target
+                           windows a sketch proves shared are not looked up.
+                           Only k-mer sizes up to 32 are sketched.
         """
+        if sketch_window is not None and sketch_window < 1:
+            raise ValueError("sketch_window must be at least 1.")
         self.kmer_size = kmer_size
+        self.sketch_window = sketch_window
 
     def _generate_kmers(self, sequence: str) -> Set[str]:
         """
@@ -33,64 +62,244 @@ class SignatureFinder:
             for i in range(len(sequence) - self.kmer_size + 1)
         }
 
+    def _prepare_sequence(self, sequence) -> str:
+        """
+        Converts a sequence given as bytes, a memoryview or a uint8 array into
+        the string form this engine works on. Strings are returned unchanged.
+        """
+        if isinstance(sequence, str):
+            return sequence
+        return bytes(sequence).decode("utf-8", errors="replace")
+
+    def build_background(self, background_sequences: Dict[str, str]) -> Set[str]:
+        """
+        Builds the background k-mer collection that target k-mers are checked against.
+
+        Subclasses override this (together with `_find_unique_kmer_indices`)
+        to provide a different k-mer engine.
+        """
+        background_kmers = KmerSet()
+        for seq in background_sequences.values():
+            background_kmers.update(self._generate_kmers(self._prepare_sequence(seq)))
+        background_kmers.sketch = self._build_sketch(background_sequences)
+        return background_kmers
+
+    def _build_sketch(self, background_sequences: Dict[str, str]) -> Optional[MinimizerSketch]:
+        """The MinimizerSketch of a background, if this finder builds them."""
+        if self.sketch_window is None or self.kmer_size > MAX_PACKED_KMER_SIZE:
+            return None
+        return MinimizerSketch.build(background_sequences.values(), self.kmer_size, self.sketch_window)
+
+    def _find_unique_kmer_indices(self, target_seq: str, background) -> List[int]:
+        """
+        Returns the starting positions of all k-mers in the target that are
+        NOT present in the background.
+
+        Windows that the background's sketch, if any, proves shared are
+        skipped without a lookup.
+        """
+        sketch = getattr(background, "sketch", None)
+        windows = range(len(target_seq) - self.kmer_size + 1)
+        if sketch is not None:
+            windows = np.flatnonzero(~sketch.shared_windows(target_seq)).tolist()
+        return [
+            i
+            for i in windows
+            if target_seq[i:i + self.kmer_size] not in background
+        ]
+
+    def _merge_kmer_indices(self, unique_kmer_indices: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Merges consecutive k-mer start indices into regions, returned as the
+        arrays of each region's start and last k-mer start.
+        """
+        return index_runs(unique_kmer_indices)
+
     def find_unique_signatures(
         self, target_sequences: Dict[str, str], background_sequences: Dict[str, str]
     ) -> List[Dict]:
         """
         The main analysis function to find and merge unique signature regions.
         """
-        # Step 1: Build a single, efficient set of all background k-mers.
-        background_kmers = set()
-        for seq in background_sequences.values():
-            background_kmers.update(self._generate_kmers(seq))
+        # Step 1: Build a single, efficient collection of all background k-mers.
+        background = self.build_background(background_sequences)
+        return self.find_unique_signatures_in_background(target_sequences, background)
+
+    def find_unique_signatures_in_background(
+        self,
+        target_sequences: Dict[str, str],
+        background,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> List[Dict]:
+        """
+        Finds unique signature regions against an already built background
+        (the value returned by `build_background`).
+
+        If given, `progress` is called with the fraction of target bases
+        scanned after each target sequence.
+        """
+        return list(self.iter_unique_signatures_in_background(target_sequences, background, progress))
 
-        all_signatures = []
+    def iter_unique_signatures_in_background(
+        self,
+        target_sequences: Dict[str, str],
+        background,
+        progress: Optional[Callable[[float], None]] = None,
+        include_sequence: bool = True,
+    ) -> Iterator[Dict]:
+        """
+        Yields unique signature regions one at a time, in target order, as
+        each target sequence is scanned.
+
+        With `include_sequence` False, the 'sequence' field is None and the
+        region's bases are never copied out of the target.
+        """
+        total_length = sum(len(seq) for seq in target_sequences.values()) or 1
+        scanned_length = 0
 
-        # Step 2: Process each target sequence individually.
+        # Step 2: Process each target sequence individually. The scan and
+        # merge of every sequence are recorded as one call of each stage.
+        with self.instrumentation.stage_total("scan") as scan, self.instrumentation.stage_total("merge") as merge:
+            for seq_id, target_seq in target_sequences.items():
+                if progress is not None:
+                    progress(scanned_length / total_length)
+                scanned_length += len(target_seq)
+                target_seq = self._prepare_sequence(target_seq)
+
+                # Step 3: Find the starting positions of all k-mers in the target
+                # that are NOT present in the background set.
+                with scan:
+                    unique_kmer_indices = self._find_unique_kmer_indices(target_seq, background)
+                scan.add_work(bases=len(target_seq), kmers=max(len(target_seq) - self.kmer_size + 1, 0))
+
+                yield from self._signatures_from_indices(
+                    seq_id, target_seq, unique_kmer_indices, include_sequence, merge=merge
+                )
+
+        if progress is not None:
+            progress(1.0)
+
+    def unique_kmer_indices(
+        self,
+        target_sequences: Dict[str, str],
+        background,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> Dict:
+        """
+        Returns the start indices of the unique k-mers of every target
+        sequence, keyed like `target_sequences`, before they are merged into
+        regions. Engines that check all target sequences in one pass
+        override this and build their signatures from it.
+        """
+        indices = {}
+        total_length = sum(len(seq) for seq in target_sequences.values()) or 1
+        scanned_length = 0
         for seq_id, target_seq in target_sequences.items():
-            
-            # Step 3: Find the starting positions of all k-mers in the target
-            # that are NOT present in the background set.
-            unique_kmer_indices = [
-                i
-                for i in range(len(target_seq) - self.kmer_size + 1)
-                if target_seq[i:i + self.kmer_size] not in background_kmers
+            if progress is not None:
+                progress(scanned_length / total_length)
+            scanned_length += len(target_seq)
+            indices[seq_id] = self._find_unique_kmer_indices(self._prepare_sequence(target_seq), background)
+        if progress is not None:
+            progress(1.0)
+        return indices
+
+    def _timed_unique_kmer_indices(
+        self,
+        target_sequences: Dict[str, str],
+        background,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> Dict:
+        """`unique_kmer_indices`, recorded as the scan stage."""
+        with self.instrumentation.stage("scan"):
+            indices = self.unique_kmer_indices(target_sequences, background, progress)
+        self.instrumentation.add_work(
+            "scan",
+            bases=sum(len(seq) for seq in target_sequences.values()),
+            kmers=sum(max(len(seq) - self.kmer_size + 1, 0) for seq in target_sequences.values()),
+        )
+        return indices
+
+    def find_unique_signature_table(
+        self,
+        target_sequences: Dict[str, str],
+        background,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> SignatureTable:
+        """
+        Finds unique signature regions like `find_unique_signatures_in_background`,
+        but returns them as a SignatureTable: columns of coordinates that
+        refer to the target sequences, whose bases are only sliced out when
+        a signature is read.
+        """
+        prepared = {seq_id: self._prepare_sequence(seq) for seq_id, seq in target_sequences.items()}
+        indices = self._timed_unique_kmer_indices(prepared, background, progress)
+        with self.instrumentation.stage_total("merge") as merge:
+            regions = [
+                self._regions_from_indices(seq, indices[seq_id], merge=merge) for seq_id, seq in prepared.items()
             ]
+        return SignatureTable.from_regions(list(prepared), list(prepared.values()), regions)
 
-            if not unique_kmer_indices:
-                continue # No unique k-mers found in this sequence, move to the next.
-
-            # Step 4: Merge consecutive k-mer indices into regions.
-            merged_regions = []
-            start_of_region = unique_kmer_indices[0]
-            end_of_region_kmer_start = unique_kmer_indices[0]
-
-            for i in range(1, len(unique_kmer_indices)):
-                # Check if the current k-mer start is adjacent to the previous one
-                if unique_kmer_indices[i] == end_of_region_kmer_start + 1:
-                    end_of_region_kmer_start = unique_kmer_indices[i]
-                else:
-                    # The chain is broken, finalize the previous region
-                    merged_regions.append((start_of_region, end_of_region_kmer_start))
-                    # Start a new region
-                    start_of_region = unique_kmer_indices[i]
-                    end_of_region_kmer_start = unique_kmer_indices[i]
-            
-            # Add the last region after the loop finishes
-            merged_regions.append((start_of_region, end_of_region_kmer_start))
-
-            # Step 5: Format the merged regions into the final output structure.
-            for start, end_kmer_start in merged_regions:
-                # The end of the sequence is the end of the last k-mer in the chain
-                end = end_kmer_start + self.kmer_size
+    def _regions_from_indices(
+        self,
+        target_seq,
+        unique_kmer_indices,
+        kmer_size: Optional[int] = None,
+        merge: StageTotal = NULL_STAGE_TOTAL,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Merges the unique k-mer start indices of one target sequence into
+        regions, returned as the arrays of their starts and ends, and drops
+        the regions `region_filter` rejects.
+
+        `kmer_size` defaults to the finder's; engines that answer for several
+        k-mer sizes pass the one the indices were found with. The time and
+        k-mers merged are added to `merge`, the caller's total of the merge
+        stage.
+        """
+        kmer_size = kmer_size or self.kmer_size
+        if len(unique_kmer_indices) == 0:
+            # No unique k-mers found in this sequence.
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        with merge:
+            starts, end_kmer_starts = self._merge_kmer_indices(unique_kmer_indices)
+            # The end of a region is the end of the last k-mer in the chain
+            ends = end_kmer_starts + kmer_size
+            if self.region_filter is not None:
+                starts, ends = self.region_filter.select(starts, ends, target_seq)
+        merge.add_work(kmers=len(unique_kmer_indices))
+        return starts, ends
+
+    def _signatures_from_indices(
+        self,
+        seq_id,
+        target_seq,
+        unique_kmer_indices,
+        include_sequence: bool = True,
+        kmer_size: Optional[int] = None,
+        merge: StageTotal = NULL_STAGE_TOTAL,
+    ) -> Iterator[Dict]:
+        """
+        Merges the unique k-mer start indices of one target sequence into
+        regions and formats them as signature dictionaries.
+        """
+        # Step 4: Merge consecutive k-mer indices into regions, and drop
+        # filtered-out regions while they are still plain coordinates.
+        starts, ends = self._regions_from_indices(target_seq, unique_kmer_indices, kmer_size, merge)
+
+        # Step 5: Format the merged regions into the final output structure.
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            sequence_str = None
+            if include_sequence:
                 sequence_str = target_seq[start:end]
-                
-                all_signatures.append({
-                    'sequence_id': seq_id,
-                    'start': start,
-                    'end': end,
-                    'length': len(sequence_str),
-                    'sequence': sequence_str
-                })
-
-        return all_signatures
\ No newline at end of file
+                if not isinstance(sequence_str, str):
+                    # Engines that work on bytes or uint8 arrays still report text.
+                    sequence_str = bytes(sequence_str).decode("utf-8", errors="replace")
+
+            yield {
+                'sequence_id': seq_id,
+                'start': start,
+                'end': end,
+                'length': end - start,
+                'sequence': sequence_str
+            }
@@ -0,0 +1,222 @@
+"""
+Signatures as columns of NumPy arrays instead of one dictionary each.
+
+A table costs a few bytes per signature and never copies the signature's
+bases out of the target: they are sliced from the target sequence only when
+a signature is serialized. A table still reads like the list of signature
+dictionaries the finders yield (len(), iteration, indexing and slicing), so
+code written for those lists keeps working on it.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from src.core.kmer_codec import SequenceLike
+
+
+def _region_text(sequence: SequenceLike, start: int, end: int) -> str:
+    """sequence[start:end] as text, decoded the way the finders decode their regions."""
+    region = sequence[start:end]
+    if isinstance(region, str):
+        return region
+    return bytes(region).decode("utf-8", errors="replace")
+
+
+class SignatureTable:
+    """
+    Signature i was found in sequence `sequence_ids[sequence_index[i]]` and
+    spans [starts[i], ends[i]).
+
+    Its bases are read from `sequences[sequence_index[i]]`, references to
+    the target sequences, at those coordinates. A compacted table instead
+    keeps every signature's bases in one string, at [base_starts[i],
+    base_ends[i]), and no reference to the target. Those offsets count
+    characters of the decoded text, which can differ from the signature's
+    length in bytes. A table with neither has coordinates only.
+
+    Tables of genomes merged by the preprocessor report merged coordinates
+    and also carry contig columns: signature i lies in contig
+    `contig_ids[contig_index[i]]`, at [contig_starts[i], contig_ends[i]).
+    """
+
+    def __init__(
+        self,
+        sequence_ids: List,
+        sequence_index: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        sequences: Optional[List[SequenceLike]] = None,
+        bases: Optional[str] = None,
+        base_starts: Optional[np.ndarray] = None,
+        base_ends: Optional[np.ndarray] = None,
+        contig_ids: Optional[List[str]] = None,
+        contig_index: Optional[np.ndarray] = None,
+        contig_starts: Optional[np.ndarray] = None,
+        contig_ends: Optional[np.ndarray] = None,
+    ):
+        self.sequence_ids = sequence_ids
+        self.sequence_index = sequence_index
+        self.starts = starts
+        self.ends = ends
+        self.sequences = sequences
+        self.bases = bases
+        self.base_starts = base_starts
+        self.base_ends = base_ends
+        self.contig_ids = contig_ids
+        self.contig_index = contig_index
+        self.contig_starts = contig_starts
+        self.contig_ends = contig_ends
+
+    @classmethod
+    def from_regions(
+        cls, sequence_ids: List, sequences: Optional[List[SequenceLike]], regions: Sequence
+    ) -> "SignatureTable":
+        """
+        Builds a table from the (starts, ends) arrays of each sequence, in
+        the order of `sequence_ids`.
+        """
+        counts = [len(starts) for starts, _ in regions]
+        return cls(
+            sequence_ids,
+            np.repeat(np.arange(len(regions), dtype=np.int32), counts),
+            np.concatenate([starts for starts, _ in regions] or [np.empty(0)]).astype(np.int64),
+            np.concatenate([ends for _, ends in regions] or [np.empty(0)]).astype(np.int64),
+            sequences=sequences,
+        )
+
+    @classmethod
+    def from_dicts(cls, signatures: Iterable[Dict]) -> "SignatureTable":
+        """Builds a compacted table from signature dictionaries."""
+        signatures = list(signatures)
+        sequence_ids: Dict = {}
+        sequence_index = [sequence_ids.setdefault(sig['sequence_id'], len(sequence_ids)) for sig in signatures]
+        table = cls(
+            list(sequence_ids),
+            np.array(sequence_index, dtype=np.int32),
+            np.array([sig['start'] for sig in signatures], dtype=np.int64),
+            np.array([sig['end'] for sig in signatures], dtype=np.int64),
+        )
+        if signatures and signatures[0].get('sequence') is not None:
+            table._set_bases([sig['sequence'] for sig in signatures])
+        if signatures and signatures[0].get('contig_id') is not None:
+            contig_ids: Dict = {}
+            table.contig_index = np.array(
+                [contig_ids.setdefault(sig['contig_id'], len(contig_ids)) for sig in signatures], dtype=np.int32
+            )
+            table.contig_ids = list(contig_ids)
+            table.contig_starts = np.array([sig['contig_start'] for sig in signatures], dtype=np.int64)
+            table.contig_ends = np.array([sig['contig_end'] for sig in signatures], dtype=np.int64)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return self.ends - self.starts
+
+    @property
+    def has_bases(self) -> bool:
+        return self.sequences is not None or self.bases is not None
+
+    @property
+    def has_contigs(self) -> bool:
+        return self.contig_ids is not None
+
+    @property
+    def size_bytes(self) -> int:
+        """The memory held by the columns and compacted bases, not counting referenced sequences."""
+        arrays = (
+            self.sequence_index, self.starts, self.ends, self.base_starts, self.base_ends,
+            self.contig_index, self.contig_starts, self.contig_ends,
+        )
+        return sum(array.nbytes for array in arrays if array is not None) + len(self.bases or "")
+
+    def iter_sequences(self) -> Iterator[Optional[str]]:
+        """Yields each signature's bases, or None for every signature of a coordinates-only table."""
+        if self.bases is not None:
+            for base_start, base_end in zip(self.base_starts.tolist(), self.base_ends.tolist()):
+                yield self.bases[base_start:base_end]
+        elif self.sequences is not None:
+            sequences = self.sequences
+            for index, start, end in zip(self.sequence_index.tolist(), self.starts.tolist(), self.ends.tolist()):
+                yield _region_text(sequences[index], start, end)
+        else:
+            yield from (None for _ in range(len(self)))
+
+    def iter_dicts(self, include_sequence: bool = True) -> Iterator[Dict]:
+        """
+        Yields the signatures as the dictionaries the finders yield, with
+        'sequence' None unless `include_sequence` and the table has bases.
+        """
+        ids = self.sequence_ids
+        sequences = self.iter_sequences() if include_sequence else (None for _ in range(len(self)))
+        rows = zip(self.sequence_index.tolist(), self.starts.tolist(), self.ends.tolist(), sequences)
+        if not self.has_contigs:
+            for index, start, end, sequence in rows:
+                yield {'sequence_id': ids[index], 'start': start, 'end': end, 'length': end - start, 'sequence': sequence}
+            return
+        contig_ids = self.contig_ids
+        contigs = zip(self.contig_index.tolist(), self.contig_starts.tolist(), self.contig_ends.tolist())
+        for (index, start, end, sequence), (contig, contig_start, contig_end) in zip(rows, contigs):
+            yield {
+                'sequence_id': ids[index], 'start': start, 'end': end, 'length': end - start, 'sequence': sequence,
+                'contig_id': contig_ids[contig], 'contig_start': contig_start, 'contig_end': contig_end,
+            }
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.iter_dicts()
+
+    def __getitem__(self, key):
+        """A signature dictionary for an integer, a table for a slice."""
+        if isinstance(key, slice):
+            return self.take(np.arange(len(self))[key])
+        return next(self.take(np.array([range(len(self))[key]])).iter_dicts())
+
+    def take(self, indices: np.ndarray) -> "SignatureTable":
+        """The signatures at `indices`, in that order. Columns are copied; bases and IDs are shared."""
+        def pick(array: Optional[np.ndarray]) -> Optional[np.ndarray]:
+            return None if array is None else array[indices]
+
+        return SignatureTable(
+            self.sequence_ids, self.sequence_index[indices], self.starts[indices], self.ends[indices],
+            sequences=self.sequences, bases=self.bases,
+            base_starts=pick(self.base_starts), base_ends=pick(self.base_ends),
+            contig_ids=self.contig_ids, contig_index=pick(self.contig_index),
+            contig_starts=pick(self.contig_starts), contig_ends=pick(self.contig_ends),
+        )
+
+    def longest(self, count: int) -> "SignatureTable":
+        """
+        The `count` longest signatures (the earliest of equally long ones),
+        in table order, as `longest_signatures` picks them.
+        """
+        if len(self) <= count:
+            return self
+        return self.take(np.sort(np.lexsort((np.arange(len(self)), -self.lengths))[:count]))
+
+    def compact(self) -> "SignatureTable":
+        """
+        A copy holding only the signatures' own bases, so it no longer keeps
+        the target sequences in memory.
+        """
+        if self.sequences is None:
+            return self
+        texts = list(self.iter_sequences())
+        table = self.take(np.arange(len(self)))
+        table.sequences = None
+        table._set_bases(texts)
+        return table
+
+    def _set_bases(self, texts: List[str]) -> None:
+        """Keeps each signature's text, in row order, in one string."""
+        lengths = np.array([len(text) for text in texts], dtype=np.int64)
+        self.bases = "".join(texts)
+        self.base_ends = np.cumsum(lengths)
+        self.base_starts = self.base_ends - lengths
+
+    def without_bases(self) -> "SignatureTable":
+        """The same signatures with coordinates only."""
+        table = self.take(np.arange(len(self)))
+        table.sequences = table.bases = table.base_starts = table.base_ends = None
+        return table
@@ -0,0 +1,153 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+from src.core.kmer_codec import SequenceLike, as_uint8_array
+
+# Symbol placed after every background sequence. Bytes use 0-255, so no
+# base can match it.
+_BACKGROUND_SEPARATOR = 256
+
+
+class PrefixRanks:
+    """
+    A suffix array of a text sorted by the first `max_length` symbols of
+    each suffix, built by prefix doubling with NumPy.
+
+    `order` lists suffix start positions in sorted order. `ranks[j][p]` is
+    the rank of the `spans[j]` symbols starting at p, so two positions have
+    equal ranks at level j exactly when their next `spans[j]` symbols are
+    equal. These rank levels give the longest common prefix of any two
+    suffixes in a few vectorized steps, without a separate LCP array.
+
+    The first level packs as many symbols as fit into one int64 key, so the
+    doubling starts from a span of about 8 to 16 symbols instead of 1.
+
+    Suffixes that share their first `max_length` symbols are in arbitrary
+    order among themselves; with max_length=None the full suffix array is built.
+    """
+
+    def __init__(self, text: np.ndarray, max_length: Optional[int] = None):
+        self.text = np.asarray(text, dtype=np.int32)
+        self.length = len(text)
+        self.spans: List[int] = []
+        self.ranks: List[np.ndarray] = []
+        self.order = self._build(max_length)
+
+    def _packed_keys(self) -> Tuple[np.ndarray, int]:
+        """Packs the symbols at each position and the following ones into an int64 key."""
+        symbols, dense = np.unique(self.text, return_inverse=True)
+        # 0 is kept for positions past the end of the text.
+        dense = dense.astype(np.int64) + 1
+        bits = max(int(len(symbols)).bit_length(), 1)
+        span = max(62 // bits, 1)
+        keys = np.zeros(self.length, dtype=np.int64)
+        for offset in range(span):
+            keys <<= bits
+            if offset < self.length:
+                keys[:self.length - offset] |= dense[offset:]
+        return keys, span
+
+    @staticmethod
+    def _dense_ranks(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorts the keys and numbers each distinct key by its position in sorted order."""
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        rank = np.empty(len(keys), dtype=np.int64)
+        rank[order] = np.concatenate(([0], np.cumsum(sorted_keys[1:] != sorted_keys[:-1])))
+        return order, rank
+
+    def _build(self, max_length: Optional[int]) -> np.ndarray:
+        n = self.length
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        keys, span = self._packed_keys()
+        order, rank = self._dense_ranks(keys)
+        del keys
+        while True:
+            self.spans.append(span)
+            self.ranks.append(rank.astype(np.int32))
+            if rank[order[-1]] == n - 1 or (max_length is not None and span >= max_length):
+                return order
+            # Sort by (rank of the first span symbols, rank of the next span symbols).
+            # Positions past the end rank below every symbol.
+            second = np.zeros(n, dtype=np.int64)
+            second[:n - span] = rank[span:] + 1
+            order, rank = self._dense_ranks(rank * (int(rank.max()) + 2) + second)
+            span *= 2
+
+    def common_prefix_lengths(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """
+        Returns the length of the common prefix of the suffixes at each pair
+        of positions, up to about twice the longest span.
+        """
+        lengths = np.zeros(len(first), dtype=np.int64)
+        last = self.length - 1
+
+        def equal_at(values: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+            a = first[pairs] + lengths[pairs]
+            b = second[pairs] + lengths[pairs]
+            in_range = (a <= last) & (b <= last)
+            return in_range & (values[np.minimum(a, last)] == values[np.minimum(b, last)])
+
+        everything = np.arange(len(first))
+        for span, ranks in zip(reversed(self.spans), reversed(self.ranks)):
+            lengths[everything[equal_at(ranks, everything)]] += span
+        # The remainder is shorter than the first span; compare symbol by
+        # symbol, only for the pairs that still match.
+        active = everything
+        for _ in range(self.spans[0] - 1 if self.spans else 0):
+            active = active[equal_at(self.text, active)]
+            if len(active) == 0:
+                break
+            lengths[active] += 1
+        return lengths
+
+
+def matching_statistics(
+    targets: Sequence[SequenceLike], backgrounds: Sequence[SequenceLike], max_length: int
+) -> List[np.ndarray]:
+    """
+    For every position of every target, the length of the longest substring
+    starting there that also occurs in some background, capped at `max_length`.
+
+    The targets and backgrounds are concatenated with separators that
+    cannot match anything, one suffix array is built over all of them, and
+    each target suffix is compared with its nearest background suffixes in
+    sorted order, which share the longest prefix with it.
+    """
+    pieces: List[np.ndarray] = []
+    for background in backgrounds:
+        pieces.append(as_uint8_array(background).astype(np.int32))
+        pieces.append(np.array([_BACKGROUND_SEPARATOR], dtype=np.int32))
+    background_length = sum(len(piece) for piece in pieces)
+    for i, target in enumerate(targets):
+        pieces.append(as_uint8_array(target).astype(np.int32))
+        # A distinct end symbol per target keeps targets from matching across their ends.
+        pieces.append(np.array([_BACKGROUND_SEPARATOR + 1 + i], dtype=np.int32))
+
+    text = np.concatenate(pieces) if pieces else np.empty(0, dtype=np.int32)
+    n = len(text)
+    index = PrefixRanks(text, max_length)
+
+    in_sorted_order = np.arange(n)
+    is_background = index.order < background_length
+    # For each suffix in sorted order, the closest background suffix at or before / after it.
+    previous = np.maximum.accumulate(np.where(is_background, in_sorted_order, -1))
+    following = np.minimum.accumulate(np.where(is_background, in_sorted_order, n)[::-1])[::-1]
+
+    matched = np.zeros(n, dtype=np.int64)
+    target_ranks = np.flatnonzero(~is_background)
+    for neighbours in (previous[target_ranks], following[target_ranks]):
+        has_neighbour = (neighbours >= 0) & (neighbours < n)
+        ranks = target_ranks[has_neighbour]
+        positions = index.order[ranks]
+        lengths = index.common_prefix_lengths(positions, index.order[neighbours[has_neighbour]])
+        matched[positions] = np.maximum(matched[positions], lengths)
+    np.minimum(matched, max_length, out=matched)
+
+    statistics = []
+    offset = background_length
+    for target in targets:
+        statistics.append(matched[offset:offset + len(target)])
+        offset += len(target) + 1
+    return statistics
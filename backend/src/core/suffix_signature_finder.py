@@ -0,0 +1,150 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+from src.core.kmer_codec import SequenceLike
+from src.core.signature_finder import SignatureFinder
+from src.core.suffix_array import matching_statistics
+
+
+class MinimalUniqueLengths:
+    """
+    For every target position, how far a substring starting there matches
+    some background, capped at `max_kmer_size`.
+
+    The k-mer at position i is unique for every k above that match length,
+    so unique windows for any k up to `max_kmer_size` are read off with a
+    single comparison, without rebuilding anything.
+    """
+
+    def __init__(self, max_kmer_size: int, matched_lengths: Dict[object, np.ndarray]):
+        self.max_kmer_size = max_kmer_size
+        self.matched_lengths = matched_lengths
+
+    def _check_kmer_size(self, kmer_size: int) -> None:
+        if not 1 <= kmer_size <= self.max_kmer_size:
+            raise ValueError(f"k-mer size must be between 1 and {self.max_kmer_size}, got {kmer_size}.")
+
+    def unique_indices(self, seq_id, kmer_size: int) -> np.ndarray:
+        """The start indices of the k-mers of a target sequence that occur in no background."""
+        self._check_kmer_size(kmer_size)
+        matched = self.matched_lengths[seq_id]
+        window_count = max(len(matched) - kmer_size + 1, 0)
+        return np.flatnonzero(matched[:window_count] < kmer_size)
+
+    def shortest_unique_lengths(self, seq_id) -> np.ndarray:
+        """
+        The length of the shortest substring starting at each position that
+        occurs in no background, or 0 where there is none of at most
+        `max_kmer_size` bases within the sequence.
+        """
+        matched = self.matched_lengths[seq_id]
+        lengths = matched + 1
+        fits = (lengths <= self.max_kmer_size) & (np.arange(len(matched)) + lengths <= len(matched))
+        return np.where(fits, lengths, 0)
+
+
+class SuffixArraySignatureFinder(SignatureFinder):
+    """
+    A SignatureFinder that builds one suffix array over the target and the
+    backgrounds and derives the unique regions for any k-mer size from it.
+
+    The result is exactly that of `SignatureFinder`, for any k-mer size up
+    to `max_kmer_size` (no 32-base limit), and a sweep over several k-mer
+    sizes costs one build. The target and every background are held in
+    memory together while the suffix array is built.
+    """
+
+    def __init__(self, kmer_size: int, max_kmer_size: Optional[int] = None):
+        """
+        Initializes the SuffixArraySignatureFinder.
+
+        Args:
+            kmer_size: The k-mer size `find_unique_signatures` reports for.
+            max_kmer_size: The largest k-mer size a sweep may ask for.
+                           Defaults to `kmer_size`; larger values cost a
+                           few more sorting rounds.
+        """
+        if kmer_size < 1:
+            raise ValueError(f"k-mer size must be at least 1, got {kmer_size}.")
+        super().__init__(kmer_size)
+        self.max_kmer_size = max(max_kmer_size or kmer_size, kmer_size)
+
+    def _prepare_sequence(self, sequence: SequenceLike) -> SequenceLike:
+        """The suffix array is built from str, bytes and uint8 views alike."""
+        return sequence
+
+    def build_background(self, background_sequences: Dict[str, str]) -> List[SequenceLike]:
+        """
+        The background of this engine is the sequences themselves; the suffix
+        array is built together with the target.
+        """
+        return list(background_sequences.values())
+
+    def minimal_unique_lengths(self, target_sequences: Dict[str, str], background: List[SequenceLike]) -> MinimalUniqueLengths:
+        """
+        Builds the suffix array over every target and background sequence
+        and computes the match length at every target position.
+        """
+        targets = [self._prepare_sequence(seq) for seq in target_sequences.values()]
+        matched = matching_statistics(targets, background, self.max_kmer_size)
+        return MinimalUniqueLengths(self.max_kmer_size, dict(zip(target_sequences.keys(), matched)))
+
+    def iter_signatures_for_kmer_size(
+        self,
+        lengths: MinimalUniqueLengths,
+        target_sequences: Dict[str, str],
+        kmer_size: int,
+        include_sequence: bool = True,
+    ) -> Iterator[Dict]:
+        """Yields the unique signature regions for one k-mer size, in target order."""
+        with self.instrumentation.stage_total("merge") as merge:
+            for seq_id, target_seq in target_sequences.items():
+                indices = lengths.unique_indices(seq_id, kmer_size)
+                yield from self._signatures_from_indices(
+                    seq_id, target_seq, indices, include_sequence, kmer_size=kmer_size, merge=merge
+                )
+
+    def sweep(
+        self,
+        target_sequences: Dict[str, str],
+        background: List[SequenceLike],
+        kmer_sizes: Iterable[int],
+        include_sequence: bool = True,
+    ) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Yields (k-mer size, signatures) for each requested size from a single
+        suffix array build.
+        """
+        kmer_sizes = list(kmer_sizes)
+        if kmer_sizes and max(kmer_sizes) > self.max_kmer_size:
+            raise ValueError(f"This finder was created for k-mer sizes up to {self.max_kmer_size}.")
+        lengths = self.minimal_unique_lengths(target_sequences, background)
+        for kmer_size in kmer_sizes:
+            yield kmer_size, list(self.iter_signatures_for_kmer_size(lengths, target_sequences, kmer_size, include_sequence))
+
+    def unique_kmer_indices(
+        self,
+        target_sequences: Dict[str, str],
+        background: List[SequenceLike],
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> Dict:
+        if progress is not None:
+            progress(0.0)
+        lengths = self.minimal_unique_lengths(target_sequences, background)
+        if progress is not None:
+            progress(1.0)
+        return {seq_id: lengths.unique_indices(seq_id, self.kmer_size) for seq_id in target_sequences}
+
+    def iter_unique_signatures_in_background(
+        self,
+        target_sequences: Dict[str, str],
+        background: List[SequenceLike],
+        progress: Optional[Callable[[float], None]] = None,
+        include_sequence: bool = True,
+    ) -> Iterator[Dict]:
+        indices = self._timed_unique_kmer_indices(target_sequences, background, progress)
+        with self.instrumentation.stage_total("merge") as merge:
+            for seq_id, target_seq in target_sequences.items():
+                yield from self._signatures_from_indices(
+                    seq_id, target_seq, indices[seq_id], include_sequence, merge=merge
+                )
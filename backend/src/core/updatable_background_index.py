@@ -0,0 +1,453 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from typing import AbstractSet, Dict, Iterable, List, Set, Tuple
+import numpy as np
+
+from src.core.kmer_codec import MAX_PACKED_KMER_SIZE, SequenceLike, kmer_codes
+from src.core.packed_signature_finder import _ambiguous_kmers, merge_sorted_unique, sorted_unique
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+# Prebuilt index IDs are 64 hex digits; names must not be mistaken for one.
+_INDEX_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+_GENOME_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+_STATE_FILE = "state.json"
+# The counts an unfinished add or remove is changing, as they were before it.
+_JOURNAL_FILE = "pending_update.npz"
+_SEGMENT_DIR = "segments"
+_GENOME_DIR = "genomes"
+
+
+class _Segment:
+    """
+    A sorted array of k-mer codes with a reference count per code. The counts
+    are memory-mapped, so updating a few of them writes only those pages.
+    """
+
+    def __init__(self, segment_id: str, codes: np.ndarray, counts: np.ndarray):
+        self.segment_id = segment_id
+        self.codes = codes
+        self.counts = counts
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def locate(self, codes: np.ndarray) -> np.ndarray:
+        """The position of each code in this segment, or -1 where it is absent."""
+        if len(self.codes) == 0:
+            return np.full(len(codes), -1, dtype=np.int64)
+        positions = np.searchsorted(self.codes, codes)
+        np.minimum(positions, len(self.codes) - 1, out=positions)
+        return np.where(self.codes[positions] == codes, positions, -1)
+
+
+class UpdatableBackgroundIndex:
+    """
+    A persistent background k-mer index that genomes can be added to and
+    removed from one at a time.
+
+    Every k-mer carries a reference count: the number of panel genomes that
+    contain it. Adding or removing a genome only touches that genome's
+    k-mers, so an update costs time proportional to the genome, not to the
+    panel. This is done with a small log-structured layout:
+
+    - Codes live in sorted segments with a count per code. Each code is in
+      exactly one segment.
+    - A genome's k-mers that are already present get their counts bumped in
+      place. New k-mers form a new segment.
+    - Removing a genome decrements its k-mers' counts. A k-mer whose count
+      drops to zero stays in its segment as a tombstone.
+    - When a new segment is at least half the size of the one before it, the
+      two are merged and their tombstones dropped. This keeps the segment
+      count logarithmic and the merge cost amortized over the updates.
+
+    Before an update changes counts in place, the old values of those counts
+    are written to a journal. An update is complete once the state file lists
+    it. If the process dies before that, `open` restores the journaled counts,
+    so the counts on disk always match the genomes in the state file. An
+    update that raises is undone the same way before the error propagates.
+
+    The index can be passed to PackedSignatureFinder (in-process) as a
+    background, and queries see every finished update immediately.
+    """
+
+    def __init__(self, path: str, state: Dict, segments: List[_Segment], ambiguous_counts: Dict[str, int]):
+        self.path = path
+        self.name = state["name"]
+        self.kmer_size = state["kmer_size"]
+        self.run_preprocessor = state.get("run_preprocessor", False)
+        self.genomes: Dict[str, Dict] = state["genomes"]
+        self._segments = segments
+        self._ambiguous_counts = ambiguous_counts
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _index_path(index_dir: str, name: str) -> str:
+        if not _NAME_PATTERN.match(name) or _INDEX_ID_PATTERN.match(name):
+            raise ValueError(
+                f"Invalid background name '{name}'. Use up to 64 letters, digits, '_', '.' or '-'."
+            )
+        return os.path.join(index_dir, name)
+
+    @classmethod
+    def exists(cls, index_dir: str, name: str) -> bool:
+        """Returns True if an updatable background with this name is on disk."""
+        try:
+            return os.path.exists(os.path.join(cls._index_path(index_dir, name), _STATE_FILE))
+        except ValueError:
+            return False
+
+    @classmethod
+    def create(cls, index_dir: str, name: str, kmer_size: int, run_preprocessor: bool = False) -> "UpdatableBackgroundIndex":
+        """
+        Creates an empty updatable background.
+
+        Raises:
+            ValueError: If the name or k-mer size is invalid, or the name is taken.
+        """
+        if not 1 <= kmer_size <= MAX_PACKED_KMER_SIZE:
+            raise ValueError(f"k-mer size must be between 1 and {MAX_PACKED_KMER_SIZE}, got {kmer_size}.")
+        path = cls._index_path(index_dir, name)
+        if cls.exists(index_dir, name):
+            raise ValueError(f"A background named '{name}' already exists.")
+        os.makedirs(os.path.join(path, _SEGMENT_DIR), exist_ok=True)
+        os.makedirs(os.path.join(path, _GENOME_DIR), exist_ok=True)
+        index = cls(path, {"name": name, "kmer_size": kmer_size, "run_preprocessor": run_preprocessor, "genomes": {}}, [], {})
+        index._write_state()
+        return index
+
+    @classmethod
+    def open(cls, index_dir: str, name: str) -> "UpdatableBackgroundIndex":
+        """
+        Opens an updatable background from disk. Segment codes are memory-mapped.
+
+        Raises:
+            FileNotFoundError: If no background with this name exists.
+        """
+        path = cls._index_path(index_dir, name)
+        if not cls.exists(index_dir, name):
+            raise FileNotFoundError(f"Background '{name}' was not found.")
+        with open(os.path.join(path, _STATE_FILE)) as f:
+            state = json.load(f)
+        if os.path.exists(os.path.join(path, _JOURNAL_FILE)):
+            cls._recover(path, state)
+
+        segments = [
+            _Segment(
+                segment_id,
+                np.load(os.path.join(path, _SEGMENT_DIR, f"{segment_id}.codes.npy"), mmap_mode="r"),
+                np.load(os.path.join(path, _SEGMENT_DIR, f"{segment_id}.counts.npy"), mmap_mode="r+"),
+            )
+            for segment_id in state["segments"]
+        ]
+        ambiguous_counts: Dict[str, int] = {}
+        for genome_id in state["genomes"]:
+            for kmer in cls._read_ambiguous(path, genome_id):
+                ambiguous_counts[kmer] = ambiguous_counts.get(kmer, 0) + 1
+        return cls(path, state, segments, ambiguous_counts)
+
+    @classmethod
+    def list_names(cls, index_dir: str) -> List[str]:
+        """Returns the names of every updatable background in a directory."""
+        if not os.path.isdir(index_dir):
+            return []
+        return [name for name in sorted(os.listdir(index_dir)) if cls.exists(index_dir, name)]
+
+    def delete(self) -> None:
+        """Deletes the background from disk."""
+        with self._lock:
+            self._segments = []
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    @property
+    def ambiguous_kmers(self) -> AbstractSet[str]:
+        """The k-mers that could not be packed and occur in at least one genome."""
+        return self._ambiguous_counts.keys()
+
+    @property
+    def kmer_count(self) -> int:
+        """The number of distinct k-mers in the current panel."""
+        with self._lock:
+            packed = sum(int(np.count_nonzero(segment.counts)) for segment in self._segments)
+        return packed + len(self._ambiguous_counts)
+
+    def __len__(self) -> int:
+        return self.kmer_count
+
+    @property
+    def content_id(self) -> str:
+        """A hash of the k-mer size and the genomes in the panel; changes with every update."""
+        key = json.dumps({"kmer_size": self.kmer_size, "run_preprocessor": self.run_preprocessor, "genomes": sorted(self.genomes)})
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def contains_codes(self, codes: np.ndarray) -> np.ndarray:
+        """Returns a boolean mask of which packed codes occur in at least one genome."""
+        found = np.zeros(len(codes), dtype=bool)
+        if len(codes) == 0:
+            return found
+        order = np.argsort(codes)
+        sorted_codes = codes[order]
+        with self._lock:
+            for segment in self._segments:
+                positions = segment.locate(sorted_codes)
+                present = positions >= 0
+                present[present] = segment.counts[positions[present]] > 0
+                found[order[present]] = True
+        return found
+
+    def reference_counts(self, codes: np.ndarray) -> np.ndarray:
+        """The number of panel genomes containing each packed code."""
+        counts = np.zeros(len(codes), dtype=np.uint32)
+        with self._lock:
+            for segment in self._segments:
+                positions = segment.locate(codes)
+                present = positions >= 0
+                counts[present] = segment.counts[positions[present]]
+        return counts
+
+    def add_genome(self, genome_id: str, name: str, sequences: Iterable[SequenceLike]) -> Dict:
+        """
+        Adds a genome to the panel.
+
+        Args:
+            genome_id: The SHA-256 hex digest of the genome file.
+            name: A display name, e.g. the file name.
+            sequences: The genome's sequences.
+
+        Returns:
+            The genome's entry: its ID, name and number of distinct k-mers.
+
+        Raises:
+            ValueError: If the genome is already in the panel.
+        """
+        if not _GENOME_ID_PATTERN.match(genome_id):
+            raise ValueError(f"Invalid genome ID '{genome_id}'.")
+        if genome_id in self.genomes:
+            raise ValueError(f"Genome '{genome_id}' is already in background '{self.name}'.")
+
+        parts = []
+        ambiguous: Set[str] = set()
+        for sequence in sequences:
+            codes, valid = kmer_codes(sequence, self.kmer_size)
+            parts.append(sorted_unique(codes[valid]))
+            ambiguous.update(_ambiguous_kmers(sequence, valid, self.kmer_size))
+        genome_codes = merge_sorted_unique(parts)
+
+        with self._lock:
+            # Checked again under the lock: a concurrent upload of the same
+            # genome may have finished while this one was being encoded.
+            if genome_id in self.genomes:
+                raise ValueError(f"Genome '{genome_id}' is already in background '{self.name}'.")
+            new = np.ones(len(genome_codes), dtype=bool)
+            changes = []
+            for segment in self._segments:
+                positions = segment.locate(genome_codes)
+                present = positions >= 0
+                changes.append((segment, positions[present]))
+                new &= ~present
+            self._begin_update("add", genome_id, changes)
+            try:
+                np.save(self._genome_path(genome_id), genome_codes)
+                with open(self._genome_path(genome_id, ambiguous=True), "w") as f:
+                    for kmer in sorted(ambiguous):
+                        f.write(kmer + "\n")
+                for segment, positions in changes:
+                    segment.counts[positions] += 1
+                if new.any():
+                    self._segments.append(self._write_segment(genome_codes[new], np.ones(int(new.sum()), dtype=np.uint32)))
+                for kmer in ambiguous:
+                    self._ambiguous_counts[kmer] = self._ambiguous_counts.get(kmer, 0) + 1
+
+                entry = {"genome_id": genome_id, "name": name, "kmer_count": len(genome_codes) + len(ambiguous)}
+                self.genomes[genome_id] = entry
+                merged = self._compact()
+                self._write_state()
+            except Exception:
+                self._roll_back()
+                raise
+            # Merged segments are only deleted once the state no longer lists them.
+            for segment in merged:
+                self._remove_segment_files(segment)
+            os.remove(os.path.join(self.path, _JOURNAL_FILE))
+        return entry
+
+    def remove_genome(self, genome_id: str) -> None:
+        """
+        Removes a genome from the panel.
+
+        Raises:
+            KeyError: If the genome is not in the panel.
+        """
+        with self._lock:
+            if genome_id not in self.genomes:
+                raise KeyError(genome_id)
+            genome_codes = np.load(self._genome_path(genome_id))
+            changes = []
+            for segment in self._segments:
+                positions = segment.locate(genome_codes)
+                changes.append((segment, positions[positions >= 0]))
+            self._begin_update("remove", genome_id, changes)
+            try:
+                for segment, positions in changes:
+                    segment.counts[positions] -= 1
+                for kmer in self._read_ambiguous(self.path, genome_id):
+                    self._ambiguous_counts[kmer] -= 1
+                    if self._ambiguous_counts[kmer] == 0:
+                        del self._ambiguous_counts[kmer]
+
+                del self.genomes[genome_id]
+                self._write_state()
+            except Exception:
+                self._roll_back()
+                raise
+            os.remove(self._genome_path(genome_id))
+            os.remove(self._genome_path(genome_id, ambiguous=True))
+            os.remove(os.path.join(self.path, _JOURNAL_FILE))
+
+    def _begin_update(self, operation: str, genome_id: str, changes: List[Tuple[_Segment, np.ndarray]]) -> None:
+        """
+        Journals the counts at the given positions of each segment before an
+        add or remove changes them. Call with the lock held.
+        """
+        arrays = {
+            "operation": np.array(operation),
+            "genome_id": np.array(genome_id),
+            "segment_ids": np.array([segment.segment_id for segment, _ in changes], dtype=str),
+            "offsets": np.cumsum([0] + [len(positions) for _, positions in changes], dtype=np.int64),
+            "positions": np.concatenate([positions for _, positions in changes] or [np.empty(0, dtype=np.int64)]),
+            "counts": np.concatenate(
+                [np.asarray(segment.counts[positions]) for segment, positions in changes] or [np.empty(0, dtype=np.uint32)]
+            ),
+        }
+        staging_path = os.path.join(self.path, f".{_JOURNAL_FILE}.{uuid.uuid4().hex}")
+        with open(staging_path, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(staging_path, os.path.join(self.path, _JOURNAL_FILE))
+
+    @classmethod
+    def _recover(cls, path: str, state: Dict) -> None:
+        """
+        Finishes or undoes the update an earlier process left in the journal.
+
+        An add is complete if the state lists its genome and a remove if it
+        no longer does. Otherwise the journaled counts are written back and
+        the genome files of an unfinished add are removed. Segment files the
+        state does not list are leftovers of the interrupted update.
+        """
+        journal_path = os.path.join(path, _JOURNAL_FILE)
+        with np.load(journal_path) as journal:
+            operation, genome_id = str(journal["operation"]), str(journal["genome_id"])
+            segment_ids, offsets = journal["segment_ids"].tolist(), journal["offsets"]
+            positions, counts = journal["positions"], journal["counts"]
+        completed = (genome_id in state["genomes"]) == (operation == "add")
+        if not completed:
+            for i, segment_id in enumerate(segment_ids):
+                if segment_id not in state["segments"]:
+                    continue
+                segment_counts = np.load(os.path.join(path, _SEGMENT_DIR, f"{segment_id}.counts.npy"), mmap_mode="r+")
+                segment_counts[positions[offsets[i]:offsets[i + 1]]] = counts[offsets[i]:offsets[i + 1]]
+                segment_counts.flush()
+        # An unfinished add's genome files, or a finished remove's, are not needed.
+        if completed != (operation == "add"):
+            for name in (f"{genome_id}.npy", f"{genome_id}.ambiguous.txt"):
+                if os.path.exists(os.path.join(path, _GENOME_DIR, name)):
+                    os.remove(os.path.join(path, _GENOME_DIR, name))
+        listed = set(state["segments"])
+        for name in os.listdir(os.path.join(path, _SEGMENT_DIR)):
+            if name.split(".", 1)[0] not in listed:
+                os.remove(os.path.join(path, _SEGMENT_DIR, name))
+        os.remove(journal_path)
+
+    def _roll_back(self) -> None:
+        """
+        Undoes an add or remove that raised after it was journaled, the way
+        `open` would after a crash, and reloads the panel from disk. Call
+        with the lock held.
+        """
+        restored = self.open(os.path.dirname(self.path), self.name)
+        self.genomes = restored.genomes
+        self._segments = restored._segments
+        self._ambiguous_counts = restored._ambiguous_counts
+
+    def _compact(self) -> List[_Segment]:
+        """
+        Merges the newest segments while the newest is at least half the size
+        of the one before. Returns the segments that were merged away.
+        """
+        merged = []
+        while len(self._segments) >= 2 and 2 * len(self._segments[-1]) >= len(self._segments[-2]):
+            older, newer = self._segments[-2], self._segments[-1]
+            codes = np.concatenate((older.codes, newer.codes))
+            counts = np.concatenate((older.counts, newer.counts))
+            order = np.argsort(codes, kind="stable")
+            live = order[counts[order] > 0]
+            self._segments[-2:] = [self._write_segment(codes[live], counts[live])]
+            merged.extend((older, newer))
+        return merged
+
+    def _genome_path(self, genome_id: str, ambiguous: bool = False) -> str:
+        return os.path.join(self.path, _GENOME_DIR, f"{genome_id}.{'ambiguous.txt' if ambiguous else 'npy'}")
+
+    @staticmethod
+    def _read_ambiguous(path: str, genome_id: str) -> List[str]:
+        with open(os.path.join(path, _GENOME_DIR, f"{genome_id}.ambiguous.txt")) as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+
+    def _segment_path(self, segment_id: str, kind: str) -> str:
+        return os.path.join(self.path, _SEGMENT_DIR, f"{segment_id}.{kind}.npy")
+
+    def _write_segment(self, codes: np.ndarray, counts: np.ndarray) -> _Segment:
+        segment_id = uuid.uuid4().hex
+        np.save(self._segment_path(segment_id, "codes"), np.ascontiguousarray(codes, dtype=np.uint64))
+        counts_file = np.lib.format.open_memmap(
+            self._segment_path(segment_id, "counts"), mode="w+", dtype=np.uint32, shape=(len(counts),)
+        )
+        counts_file[:] = counts
+        counts_file.flush()
+        return _Segment(segment_id, np.load(self._segment_path(segment_id, "codes"), mmap_mode="r"), counts_file)
+
+    def _remove_segment_files(self, segment: _Segment) -> None:
+        for kind in ("codes", "counts"):
+            try:
+                os.remove(self._segment_path(segment.segment_id, kind))
+            except OSError:
+                pass
+
+    def _write_state(self) -> None:
+        """
+        Flushes the counts and atomically replaces the state file, which
+        completes a journaled update.
+        """
+        for segment in self._segments:
+            if isinstance(segment.counts, np.memmap):
+                segment.counts.flush()
+        state = {
+            "name": self.name,
+            "kmer_size": self.kmer_size,
+            "run_preprocessor": self.run_preprocessor,
+            "segments": [segment.segment_id for segment in self._segments],
+            "genomes": self.genomes,
+        }
+        staging_path = os.path.join(self.path, f".{_STATE_FILE}.{uuid.uuid4().hex}")
+        with open(staging_path, "w") as f:
+            json.dump(state, f)
+        os.replace(staging_path, os.path.join(self.path, _STATE_FILE))
+
+    def info(self) -> Dict:
+        """Describes the background for the API."""
+        return {
+            "name": self.name,
+            "kmer_size": self.kmer_size,
+            "run_preprocessor": self.run_preprocessor,
+            "kmer_count": self.kmer_count,
+            "segment_count": len(self._segments),
+            "content_id": self.content_id,
+            "genomes": list(self.genomes.values()),
+        }
@@ -1,12 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.api.v1 import analysis_routes
+from src import config
+from src.api.v1 import analysis_routes, background_routes, cache_routes, index_routes, job_routes, metrics_routes, panel_routes, result_routes
+from src.services.job_manager import job_manager
+from src.services.model_manager import summary_model
+from src.services.worker_processes import worker_processes
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the shared engine worker processes and optionally starts loading
+    the summary model at startup; on shutdown, stops the job workers and
+    engine workers and releases the model.
+    """
+    worker_processes.start()
+    if config.LLM_WARMUP:
+        summary_model.warm_up()
+    yield
+    job_manager.shutdown()
+    worker_processes.shutdown()
+    summary_model.unload()
+
 
 # Create an instance of the FastAPI class
 app = FastAPI(
     title="iSignify API",
     description="API for identifying unique microbial DNA signatures.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # --- NEW: Add CORS Middleware ---
@@ -34,4 +57,12 @@ async def read_root():
     return {"message": "Welcome to the iSignify API!"}
 
 # Include the analysis router in our main application
-app.include_router(analysis_routes.router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(analysis_routes.router, prefix="/api/v1")
+app.include_router(index_routes.router, prefix="/api/v1")
+app.include_router(job_routes.router, prefix="/api/v1")
+app.include_router(panel_routes.router, prefix="/api/v1")
+app.include_router(result_routes.router, prefix="/api/v1")
+app.include_router(cache_routes.router, prefix="/api/v1")
+app.include_router(background_routes.router, prefix="/api/v1")
+# Prometheus scrapes /metrics at the root, by convention.
+app.include_router(metrics_routes.router)
@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class Signature(BaseModel):
     """
@@ -9,7 +10,26 @@ class Signature(BaseModel):
     start: int
     end: int
     length: int
-    sequence: str
+    # None when the caller asked for coordinates only.
+    sequence: Optional[str] = None
+    # Set when the target was merged by the preprocessor: the contig the
+    # signature lies in and its coordinates within that contig.
+    contig_id: Optional[str] = None
+    contig_start: Optional[int] = None
+    contig_end: Optional[int] = None
+
+class StageTiming(BaseModel):
+    """
+    The time, memory and throughput of one stage of an analysis.
+    """
+    stage: str
+    seconds: float
+    # Peak resident memory of the server process during the stage, if measured.
+    peak_rss_bytes: Optional[int] = None
+    bases: int = 0
+    kmers: int = 0
+    bases_per_second: Optional[float] = None
+    kmers_per_second: Optional[float] = None
 
 class AnalysisResult(BaseModel):
     """
@@ -17,4 +37,96 @@ class AnalysisResult(BaseModel):
     an AI-generated summary and a list of all found signatures.
     """
     summary: str
-    signatures: List[Signature]
\ No newline at end of file
+    signatures: List[Signature]
+    # Set when the result was stored on the server; page through it with
+    # GET /results/{result_id}/signatures.
+    result_id: Optional[str] = None
+    # Peak resident memory of the server process during the analysis, in
+    # bytes. Reported by the partitioned engine. It is process-wide, not
+    # per-analysis: it includes other analyses running at the same time.
+    peak_rss_bytes: Optional[int] = None
+    # How far that peak rose above the process's resident memory when the
+    # analysis started, in bytes: the memory the analysis itself used, to
+    # compare with the partitioned engine's memory limit. Only reported
+    # where the peak can be reset (Linux).
+    peak_rss_increase_bytes: Optional[int] = None
+    # True when the result was answered from the result cache.
+    cached: bool = False
+    # Per-stage timing breakdown, when requested with include_timings.
+    timings: Optional[List[StageTiming]] = None
+
+class SignaturePage(BaseModel):
+    """
+    One page of the signatures of a stored analysis result.
+    """
+    result_id: str
+    total: int
+    signatures: List[Signature]
+    # Pass as `cursor` to fetch the next page; None on the last page.
+    next_cursor: Optional[str] = None
+
+class BackgroundIndexInfo(BaseModel):
+    """
+    Describes a prebuilt background k-mer index stored on the server.
+    """
+    index_id: str
+    kmer_size: int
+    kmer_count: int
+    genome_count: int
+    run_preprocessor: bool
+    # "exact", or "bloom" for an approximate Bloom filter index.
+    index_type: str = "exact"
+    # The estimated false-positive rate of a Bloom filter index.
+    false_positive_rate: Optional[float] = None
+    # The minimizer window of the prefilter sketch stored with an exact index, if any.
+    sketch_window: Optional[int] = None
+
+
+class JobStatus(BaseModel):
+    """
+    Represents the state of a background analysis job.
+    """
+    job_id: str
+    status: str
+    stage: Optional[str] = None
+    progress: float
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class BackgroundGenomeInfo(BaseModel):
+    """
+    A genome of an updatable background panel.
+    """
+    # The SHA-256 hex digest of the genome file.
+    genome_id: str
+    name: str
+    kmer_count: int
+
+class UpdatableBackgroundInfo(BaseModel):
+    """
+    Describes an updatable background panel. Pass its name as the
+    background_index_id of an analysis to use the current panel.
+    """
+    name: str
+    kmer_size: int
+    run_preprocessor: bool
+    kmer_count: int
+    segment_count: int
+    # Changes whenever a genome is added or removed.
+    content_id: str
+    genomes: List[BackgroundGenomeInfo]
+
+class CacheStats(BaseModel):
+    """
+    Hit and miss counters and the size of each tier of the result cache.
+    """
+    hits: int
+    # Hits answered from the on-disk tier; included in `hits`.
+    disk_hits: int
+    misses: int
+    memory_entries: int
+    memory_bytes: int
+    disk_entries: int
+    disk_bytes: int
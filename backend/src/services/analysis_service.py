@@ -1,13 +1,89 @@
-from typing import List, IO
-import tempfile
-import os
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, IO, Optional, Tuple, Union
+import threading
 
-from src.core.sequence_parser import SequenceParser
+from src import config
+from src.core.background_index import BackgroundIndex
+from src.core.bloom_filter import BloomBackground
+from src.core.compressed_fasta import uncompressed_size_hint
+from src.core.instrumentation import NULL_INSTRUMENTATION, Instrumentation
+from src.core.minimizer_sketch import MinimizerSketch
+from src.core.sequence_parser import FastaSource
 from src.core.signature_finder import SignatureFinder
-from src.core.preprocessor import FastaPreprocessor
-from src.models.schemas import AnalysisResult, Signature
+from src.core.packed_signature_finder import PackedSignatureFinder
+from src.core.panel_signature_finder import GenomeOccurrenceTable, PanelSignatureFinder
+from src.core.partitioned_signature_finder import PartitionedSignatureFinder
+from src.core.preprocessor import MergedGenome
+from src.core.regions import RegionFilter, longest_signatures
+from src.core.resource_usage import current_rss_bytes, peak_rss_bytes, reset_peak_rss
+from src.core.signature_table import SignatureTable
+from src.core.suffix_signature_finder import SuffixArraySignatureFinder
+from src.core.updatable_background_index import UpdatableBackgroundIndex
+from src.models.schemas import AnalysisResult, BackgroundIndexInfo, Signature, StageTiming, UpdatableBackgroundInfo
+from src.services.genome_loading import (
+    SIGNATURE_ENGINES,
+    build_bloom_background,
+    build_partitioned_background,
+    check_suffix_kmer_sizes,
+    create_bloom_finder,
+    create_finder,
+    iter_background,
+    load_background,
+    load_target,
+    sequence_output,
+    sketch_window,
+)
+from src.services.metrics import metrics
+from src.services.model_manager import summary_model
+from src.services.result_cache import result_cache
+from src.services.result_store import result_store
+from src.services.uploads import HashingReader, file_sha256, remove_uploads, save_upload
+from src.services.worker_processes import worker_processes
+
+# Engines that build their background reading one genome file at a time.
+# Their background files are always staged, as they are sized from the files.
+STREAMED_BACKGROUND_ENGINES = ("bloom", "partitioned")
+
+# The kinds of background index that can be built.
+INDEX_TYPES = ("exact", "bloom")
+
+# The stages of an analysis, in order, as reported to progress callbacks.
+ANALYSIS_STAGES = ("upload", "preprocess", "index_build", "scan", "summary")
+
+# Called as progress(stage, fraction of that stage completed).
+ProgressCallback = Callable[[str, float], None]
+
+
+# Updatable backgrounds opened by this process, keyed by name. Every request
+# shares the same object, so analyses see an update as soon as it finishes.
+_updatable_backgrounds: Dict[str, UpdatableBackgroundIndex] = {}
+_updatable_backgrounds_lock = threading.Lock()
+
+# Partitioned analyses that measure memory run one at a time. Each is sized to
+# the partition memory limit, and the peak RSS it reports is the process's,
+# which a concurrent partitioned run would reset.
+_partitioned_runs_lock = threading.Lock()
+
+
+@dataclass
+class TableAnalysisResult:
+    """
+    An analysis result whose signatures are kept as a SignatureTable. `result`
+    holds every other field; its own signature list is empty.
+    """
+    result: AnalysisResult
+    table: SignatureTable
+
+    def to_model(self) -> AnalysisResult:
+        """The AnalysisResult with one Signature model per signature."""
+        return self.result.model_copy(update={"signatures": [Signature(**sig) for sig in self.table]})
+
+
+def _report(progress: Optional[ProgressCallback], stage: str, fraction: float) -> None:
+    if progress is not None:
+        progress(stage, fraction)
+
 
 class AnalysisService:
     """
@@ -15,95 +91,696 @@ class AnalysisService:
     It acts as a bridge between the API layer and the core logic.
     """
 
-    def _generate_ai_summary(self, signature_count: int, kmer_size: int) -> str:
+    def __init__(self):
+        # SHA-256 digests of the files this service staged, keyed by path,
+        # so cache lookups do not read them again.
+        self._staged_hashes: Dict[str, str] = {}
+        # Uncompressed sizes of the staged files; compressed uploads stay compressed on disk.
+        self._staged_sizes: Dict[str, int] = {}
+
+    def _template_summary(self, signature_count: int, kmer_size: int) -> str:
+            """
+            The fast summary used when the language model is skipped.
+            """
+            return f"Analysis complete. Found {signature_count} unique signature(s) using a k-mer size of {kmer_size}."
+
+    def _generate_ai_summary(self, signature_count: int, kmer_size: int, use_llm: bool = True) -> str:
             """
             Generates a human-readable summary using the Gemma model.
+
+            The model is loaded once per process by `summary_model`. If the
+            LLM is disabled in the config or by the caller, the template
+            summary is returned instead.
             """
+            if not (use_llm and summary_model.enabled):
+                return self._template_summary(signature_count, kmer_size)
+
             try:
-                model_name = "google/gemma-2b"
-                dtype = torch.bfloat16
-                tokenizer = AutoTokenizer.from_pretrained(model_name)
-                model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=dtype)
                 prompt = f"You are a helpful bioinformatics assistant. Briefly summarize the following analysis result in a single, encouraging sentence. The analysis found {signature_count} unique DNA signatures using a k-mer size of {kmer_size}."
-                input_ids = tokenizer(prompt, return_tensors="pt")
-                response = model.generate(**input_ids, max_new_tokens=50)
-                summary = tokenizer.decode(response[0], skip_special_tokens=True)
-                
+                summary = summary_model.generate(prompt, max_new_tokens=50)
+
                 # --- UPDATED PART ---
                 # Remove the original prompt from the model's output
                 raw_output = summary[len(prompt):]
-                
+
                 # Find "Answer:" and take only the text that comes after it.
                 # The .split() method is a robust way to handle this.
                 clean_summary = raw_output.split("Answer:", 1)[-1]
-                
+
                 return clean_summary.strip()
                 # --------------------
 
             except Exception as e:
-                return f"Analysis complete. Found {signature_count} unique signature(s) using a k-mer size of {kmer_size}. AI summary failed: {str(e)}"
+                return f"{self._template_summary(signature_count, kmer_size)} AI summary failed: {str(e)}"
+
+
+    def _stage_upload(self, upload: IO, temp_files_to_clean: List[str], name: str = "upload") -> Tuple[str, str]:
+        """
+        Streams an uploaded file to a temporary file in fixed-size chunks,
+        validating it as FASTA on the way. Gzip and BGZF uploads are kept
+        compressed.
+
+        Returns:
+            A tuple of the temporary file path and the SHA-256 hex digest of its content.
+        """
+        stored = save_upload(upload, name=name)
+        temp_files_to_clean.append(stored.path)
+        self._staged_hashes[stored.path] = stored.sha256
+        self._staged_sizes[stored.path] = stored.uncompressed_size
+        return stored.path, stored.sha256
+
+    def _fasta_size(self, path: str) -> int:
+        """The uncompressed size of a FASTA file, an upper bound on its bases."""
+        return self._staged_sizes.get(path) or uncompressed_size_hint(path)
+
+    def build_background_index(
+        self,
+        background_files: List[IO],
+        kmer_size: int,
+        run_preprocessor: bool,
+        index_type: str = "exact",
+        false_positive_rate: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ) -> BackgroundIndexInfo:
+        """
+        Builds a persistent background k-mer index, or reuses the existing one
+        if the same genomes were already indexed with the same settings.
+
+        A "bloom" index is an approximate Bloom filter of at most `max_bytes`,
+        for panels too large for an exact index.
+        """
+        if not background_files:
+            raise ValueError("At least one background genome is required to build an index.")
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{index_type}'. Choose one of: {', '.join(INDEX_TYPES)}.")
+        if index_type == "bloom":
+            finder = create_bloom_finder(kmer_size, false_positive_rate, max_bytes)
+            options = {"index_type": "bloom", "false_positive_rate": finder.false_positive_rate, "max_bytes": finder.max_bytes}
+        else:
+            finder = PackedSignatureFinder(
+                kmer_size=kmer_size, workers=config.WORKERS, sketch_window=sketch_window(),
+                executor=worker_processes.executor,
+            )
+            options = None
+
+        temp_files_to_clean = []
+        try:
+            staged = [
+                self._stage_upload(bg_file, temp_files_to_clean, name=f"Background genome {i + 1}")
+                for i, bg_file in enumerate(background_files)
+            ]
+            index_id = BackgroundIndex.compute_id([digest for _, digest in staged], kmer_size, run_preprocessor, options)
+            metadata = {"run_preprocessor": run_preprocessor, "genome_count": len(staged)}
+
+            if BackgroundIndex.exists(config.INDEX_DIR, index_id):
+                index = BackgroundIndex.open(config.INDEX_DIR, index_id)
+                if finder.sketch_window is not None and isinstance(index, BackgroundIndex) and index.sketch is None:
+                    # The index was built before the prefilter was turned on.
+                    background_sequences = load_background([path for path, _ in staged], run_preprocessor, "bytes")
+                    index.add_sketch(MinimizerSketch.build(background_sequences.values(), kmer_size, finder.sketch_window))
+            elif index_type == "bloom":
+                background = build_bloom_background(finder, [path for path, _ in staged], run_preprocessor, self._fasta_size)
+                index = BackgroundIndex.save_bloom(background, config.INDEX_DIR, index_id, metadata=metadata)
+            else:
+                background_sequences = load_background([path for path, _ in staged], run_preprocessor, "bytes")
+                index = BackgroundIndex.save(
+                    finder.build_background(background_sequences),
+                    config.INDEX_DIR,
+                    index_id,
+                    metadata=metadata,
+                )
+        finally:
+            remove_uploads(temp_files_to_clean)
+
+        return BackgroundIndexInfo(**index.metadata)
+
+    def list_background_indexes(self) -> List[BackgroundIndexInfo]:
+        """
+        Lists every prebuilt background index.
+        """
+        return [BackgroundIndexInfo(**metadata) for metadata in BackgroundIndex.list_metadata(config.INDEX_DIR)]
+
+    def _updatable_background(self, name: str) -> UpdatableBackgroundIndex:
+        """
+        Raises:
+            FileNotFoundError: If no updatable background with this name exists.
+        """
+        with _updatable_backgrounds_lock:
+            if name not in _updatable_backgrounds:
+                _updatable_backgrounds[name] = UpdatableBackgroundIndex.open(config.UPDATABLE_BACKGROUND_DIR, name)
+            return _updatable_backgrounds[name]
+
+    def create_updatable_background(self, name: str, kmer_size: int, run_preprocessor: bool) -> UpdatableBackgroundInfo:
+        """
+        Creates an empty background panel that genomes can be added to one at a time.
+        """
+        with _updatable_backgrounds_lock:
+            background = UpdatableBackgroundIndex.create(config.UPDATABLE_BACKGROUND_DIR, name, kmer_size, run_preprocessor)
+            _updatable_backgrounds[name] = background
+        return UpdatableBackgroundInfo(**background.info())
+
+    def get_updatable_background(self, name: str) -> UpdatableBackgroundInfo:
+        return UpdatableBackgroundInfo(**self._updatable_background(name).info())
+
+    def list_updatable_backgrounds(self) -> List[UpdatableBackgroundInfo]:
+        return [
+            self.get_updatable_background(name)
+            for name in UpdatableBackgroundIndex.list_names(config.UPDATABLE_BACKGROUND_DIR)
+        ]
+
+    def delete_updatable_background(self, name: str) -> None:
+        background = self._updatable_background(name)
+        with _updatable_backgrounds_lock:
+            background.delete()
+            _updatable_backgrounds.pop(name, None)
+
+    def add_background_genome(self, name: str, genome_file: IO, genome_name: str) -> UpdatableBackgroundInfo:
+        """
+        Adds an uploaded genome to an updatable background. Only this genome
+        is read and indexed.
+        """
+        background = self._updatable_background(name)
+        temp_files_to_clean = []
+        try:
+            path, digest = self._stage_upload(genome_file, temp_files_to_clean, name=genome_name)
+            sequences = (seq for _, seq in iter_background([path], background.run_preprocessor, "bytes"))
+            background.add_genome(digest, genome_name, sequences)
+        finally:
+            remove_uploads(temp_files_to_clean)
+        return UpdatableBackgroundInfo(**background.info())
 
+    def remove_background_genome(self, name: str, genome_id: str) -> UpdatableBackgroundInfo:
+        """
+        Raises:
+            FileNotFoundError: If the background or the genome does not exist.
+        """
+        background = self._updatable_background(name)
+        try:
+            background.remove_genome(genome_id)
+        except KeyError:
+            raise FileNotFoundError(f"Genome '{genome_id}' is not in background '{name}'.")
+        return UpdatableBackgroundInfo(**background.info())
 
-    def run_analysis(self, target_file: IO, background_files: List[IO], kmer_size: int, run_preprocessor: bool) -> AnalysisResult: # <-- NEW PARAMETER
+    def stage_uploads(self, target_file: IO, background_files: List[IO]) -> Tuple[str, List[str]]:
+        """
+        Copies the uploaded target and background files to temporary files.
+
+        The caller owns the returned paths and must remove them.
+        """
+        temp_files = []
+        try:
+            target_path, _ = self._stage_upload(target_file, temp_files, name="Target genome")
+            background_paths = [
+                self._stage_upload(bg_file, temp_files, name=f"Background genome {i + 1}")[0]
+                for i, bg_file in enumerate(background_files)
+            ]
+        except Exception:
+            remove_uploads(temp_files)
+            raise
+        return target_path, background_paths
+
+    def stage_panel_uploads(self, genome_files: List[IO]) -> List[str]:
+        """
+        Copies the uploaded panel genomes to temporary files.
+
+        The caller owns the returned paths and must remove them.
+        """
+        temp_files = []
+        try:
+            for i, genome_file in enumerate(genome_files):
+                self._stage_upload(genome_file, temp_files, name=f"Panel genome {i + 1}")
+        except Exception:
+            remove_uploads(temp_files)
+            raise
+        return temp_files
+
+    def run_analysis(
+        self,
+        target_file: IO,
+        background_files: List[IO],
+        kmer_size: int,
+        run_preprocessor: bool,
+        engine: str = "set",
+        background_index_id: Optional[str] = None,
+        use_llm: bool = True,
+        progress: Optional[ProgressCallback] = None,
+        include_sequence: bool = True,
+        store_result: bool = False,
+        include_timings: bool = False,
+        region_filter: Optional[RegionFilter] = None,
+        columnar: bool = False,
+    ) -> Union[AnalysisResult, TableAnalysisResult]:
             """
             Executes the full signature analysis pipeline, including optional pre-processing.
+
+            The background is either built from `background_files` or, when
+            `background_index_id` is given, read from a prebuilt index.
+            Only signatures that pass `region_filter`, if given, are returned.
+            With `columnar`, the result is a TableAnalysisResult.
             """
-            parser = SequenceParser()
-            finder = SignatureFinder(kmer_size=kmer_size)
-            preprocessor = FastaPreprocessor()
+            instrumentation = self._create_instrumentation(include_timings)
+            options = dict(
+                engine=engine, background_index_id=background_index_id, use_llm=use_llm, progress=progress,
+                include_sequence=include_sequence, store_result=store_result,
+                include_timings=include_timings, instrumentation=instrumentation, region_filter=region_filter,
+                columnar=columnar,
+            )
+            _report(progress, "upload", 0.0)
+            if config.STREAM_UPLOADS and engine not in STREAMED_BACKGROUND_ENGINES:
+                # Parse the uploads directly; they are hashed and validated as they are read.
+                return self.run_analysis_on_paths(
+                    HashingReader(target_file, "Target genome"),
+                    [HashingReader(bg_file, f"Background genome {i + 1}") for i, bg_file in enumerate(background_files)],
+                    kmer_size, run_preprocessor, **options,
+                )
 
-            temp_files_to_clean = []
+            with instrumentation.stage("upload"):
+                target_path, background_paths = self.stage_uploads(target_file, background_files)
+            instrumentation.add_work(
+                "upload", bases=sum(self._fasta_size(path) for path in [target_path, *background_paths])
+            )
             try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".fna") as tmp_target:
-                    tmp_target.write(target_file.read())
-                    tmp_target_path = tmp_target.name
-                    temp_files_to_clean.append(tmp_target_path)
-                
-                # --- UPDATED: Conditional Pre-processing ---
-                if run_preprocessor:
-                    processed_target_path = preprocessor.process_file(tmp_target_path)
-                    if processed_target_path != tmp_target_path:
-                        temp_files_to_clean.append(processed_target_path)
-                else:
-                    processed_target_path = tmp_target_path
-                # -------------------------------------------
-
-                background_paths = []
-                for bg_file in background_files:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".fna") as tmp_bg:
-                        tmp_bg.write(bg_file.read())
-                        temp_files_to_clean.append(tmp_bg.name)
-                        background_paths.append(tmp_bg.name)
-                
-                # --- UPDATED: Conditional Pre-processing ---
-                if run_preprocessor:
-                    processed_background_paths = [preprocessor.process_file(p) for p in background_paths]
-                    for p in processed_background_paths:
-                        if p not in background_paths:
-                            temp_files_to_clean.append(p)
-                else:
-                    processed_background_paths = background_paths
-                # -------------------------------------------
-
-                target_sequences = parser.parse(processed_target_path)
-                background_sequences = {}
-                for path in processed_background_paths:
-                    background_sequences.update(parser.parse(path))
-
-                found_signatures = finder.find_unique_signatures(
-                    target_sequences=target_sequences,
-                    background_sequences=background_sequences
+                return self.run_analysis_on_paths(target_path, background_paths, kmer_size, run_preprocessor, **options)
+            finally:
+                remove_uploads([target_path, *background_paths])
+
+    def run_analysis_on_paths(
+        self,
+        target_path: FastaSource,
+        background_paths: List[FastaSource],
+        kmer_size: int,
+        run_preprocessor: bool,
+        engine: str = "set",
+        background_index_id: Optional[str] = None,
+        use_llm: bool = True,
+        progress: Optional[ProgressCallback] = None,
+        include_sequence: bool = True,
+        store_result: bool = False,
+        result_id: Optional[str] = None,
+        include_timings: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        region_filter: Optional[RegionFilter] = None,
+        columnar: bool = False,
+    ) -> Union[AnalysisResult, TableAnalysisResult]:
+        """
+        Runs the analysis on FASTA files that are already on local disk, or
+        on binary streams that are read once from start to end.
+
+        `progress`, if given, is called as progress(stage, fraction) at each
+        stage in ANALYSIS_STAGES; it may raise to abort the analysis.
+
+        With `store_result`, the signatures are also kept in the result store
+        (under `result_id` if given) so they can be paged through later.
+        Only signatures that pass `region_filter`, if given, are kept.
+
+        Partitioned runs report the process's peak resident memory during
+        the analysis (`peak_rss_bytes`) and how far it rose above the
+        process's memory when the analysis started (`peak_rss_increase_bytes`),
+        the figure to compare with PARTITION_MEMORY_LIMIT_MB. They run one at
+        a time, but both are process-wide: they include other engines'
+        analyses running concurrently.
+
+        With `include_timings`, the result lists the time, peak memory and
+        throughput of each stage. Stages are also added to the process-wide
+        metrics when METRICS_ENABLED is set.
+
+        With `columnar`, the signatures are not turned into Signature models:
+        a TableAnalysisResult is returned, for `iter_result_json` to encode.
+        """
+        if instrumentation is None:
+            instrumentation = self._create_instrumentation(include_timings)
+        with instrumentation.stage("cache_lookup"):
+            cache_key = self._cache_key(
+                target_path, background_paths, kmer_size, run_preprocessor, engine, background_index_id, use_llm,
+                region_filter,
+            )
+            cached = result_cache.get(cache_key) if cache_key else None
+        measure_memory = engine == "partitioned" and cached is None
+        if cached is not None:
+            summary, table = cached.summary, cached.signatures
+            if not isinstance(table, SignatureTable):
+                # Results read back from the disk tier are signature dictionaries.
+                table = SignatureTable.from_dicts(table)
+        else:
+            with _partitioned_runs_lock if measure_memory else nullcontext():
+                # The memory held before the analysis (the server, the summary model)
+                # is the baseline its increase is measured from; None where the
+                # peak cannot be reset, as it then covers the life of the process.
+                baseline = current_rss_bytes() if measure_memory and reset_peak_rss() else None
+                table = self.signature_table_on_paths(
+                    target_path, background_paths, kmer_size, run_preprocessor,
+                    engine=engine, background_index_id=background_index_id, progress=progress,
+                    instrumentation=instrumentation, region_filter=region_filter,
                 )
+                if store_result or cache_key:
+                    # Kept results hold only their signatures' bases, not the whole target,
+                    # and keep them so they can answer any request.
+                    table = table.compact()
+                elif not include_sequence:
+                    table = table.without_bases()
+                if measure_memory:
+                    # Each recorded stage resets the peak, so the run's peak is the highest of theirs.
+                    peak = max([peak_rss_bytes(), *(record.peak_rss_bytes for record in instrumentation.records())])
 
-                summary = self._generate_ai_summary(len(found_signatures), kmer_size)
+            _report(progress, "summary", 0.0)
+            with instrumentation.stage("summary"):
+                summary = self._generate_ai_summary(len(table), kmer_size, use_llm=use_llm)
+            if cache_key:
+                result_cache.put(cache_key, summary, table)
 
-                result = AnalysisResult(
-                    summary=summary,
-                    signatures=[Signature(**sig) for sig in found_signatures]
+        if store_result:
+            result_id = result_store.put(summary, table, result_id=result_id)
+        else:
+            result_id = None
+
+        # The signatures are returned as the table; the model only carries the other fields.
+        result = AnalysisResult(summary=summary, signatures=[], result_id=result_id, cached=cached is not None)
+        records = instrumentation.records()
+        if measure_memory:
+            result.peak_rss_bytes = peak
+            if baseline is not None:
+                result.peak_rss_increase_bytes = max(peak - baseline, 0)
+        if config.METRICS_ENABLED and instrumentation.enabled:
+            metrics.observe(records, engine)
+        if include_timings:
+            result.timings = [
+                StageTiming(
+                    stage=record.stage,
+                    seconds=record.seconds,
+                    peak_rss_bytes=record.peak_rss_bytes or None,
+                    bases=record.bases,
+                    kmers=record.kmers,
+                    bases_per_second=record.bases_per_second,
+                    kmers_per_second=record.kmers_per_second,
                 )
-            finally:
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
+                for record in records
+            ]
+        _report(progress, "summary", 1.0)
+        columnar_result = TableAnalysisResult(result, table if include_sequence else table.without_bases())
+        return columnar_result if columnar else columnar_result.to_model()
+
+    def _create_instrumentation(self, include_timings: bool) -> Instrumentation:
+        """Stages are only recorded when they are reported somewhere."""
+        if config.METRICS_ENABLED or include_timings:
+            return Instrumentation(track_memory=config.METRICS_TRACK_MEMORY)
+        return NULL_INSTRUMENTATION
+
+    def _cache_key(
+        self,
+        target_path: FastaSource,
+        background_paths: List[FastaSource],
+        kmer_size: int,
+        run_preprocessor: bool,
+        engine: str,
+        background_index_id: Optional[str],
+        use_llm: bool,
+        region_filter: Optional[RegionFilter] = None,
+    ) -> Optional[str]:
+        """
+        The result cache key of an analysis, or None when caching is off or
+        the inputs are streams whose content is not known in advance.
+        """
+        if not config.RESULT_CACHE_ENABLED:
+            return None
+        if not isinstance(target_path, str) or not all(isinstance(path, str) for path in background_paths):
+            return None
+
+        def content_hash(path: str) -> str:
+            return self._staged_hashes.get(path) or file_sha256(path)
+
+        inputs = [content_hash(path) for path in background_paths]
+        if background_index_id and UpdatableBackgroundIndex.exists(config.UPDATABLE_BACKGROUND_DIR, background_index_id):
+            # An updatable background's content changes with every update.
+            inputs.append(self._updatable_background(background_index_id).content_id)
+        elif background_index_id:
+            # Index IDs are content hashes of the indexed genomes.
+            inputs.append(background_index_id)
+        # Every exact engine returns the same signatures; the Bloom engine's
+        # depend on its settings, as may those of a (possibly Bloom) index.
+        options = {"use_llm": use_llm and config.LLM_ENABLED}
+        if engine == "bloom" or background_index_id:
+            options["bloom"] = {
+                "false_positive_rate": config.BLOOM_FALSE_POSITIVE_RATE,
+                "max_bytes": config.BLOOM_MAX_BYTES,
+                "exact_recheck": config.BLOOM_EXACT_RECHECK,
+            }
+        if region_filter is not None and region_filter.is_active:
+            options["region_filter"] = region_filter.options()
+        return result_cache.compute_key(content_hash(target_path), inputs, kmer_size, run_preprocessor, options)
+
+    def iter_signatures_on_paths(
+        self,
+        target_path: FastaSource,
+        background_paths: List[FastaSource],
+        kmer_size: int,
+        run_preprocessor: bool,
+        engine: str = "set",
+        background_index_id: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        include_sequence: bool = True,
+        instrumentation: Instrumentation = NULL_INSTRUMENTATION,
+        region_filter: Optional[RegionFilter] = None,
+    ) -> Iterator[Dict]:
+        """
+        Loads the genomes and builds the background straight away, then
+        returns an iterator that scans the target lazily and yields each
+        signature as soon as it is found.
+
+        Errors in the inputs are therefore raised by this call, before any
+        signature is produced, and no signature list is ever accumulated.
+
+        Loading, the background build, the scan and the merge are recorded
+        as stages of `instrumentation`.
+
+        Regions are checked against `region_filter` before they are formatted.
+        With its `top_n`, the longest signatures of the whole target are only
+        known at the end, so they are yielded once the scan has finished.
+        """
+        finder, background, target_sequences, merged_target = self._prepare_scan(
+            target_path, background_paths, kmer_size, run_preprocessor, engine, background_index_id,
+            progress, instrumentation, region_filter,
+        )
+        found_signatures = finder.iter_unique_signatures_in_background(
+            target_sequences=target_sequences,
+            background=background,
+            progress=lambda fraction: _report(progress, "scan", fraction),
+            include_sequence=include_sequence,
+        )
+        if finder.region_filter is not None and finder.region_filter.top_n is not None:
+            # Each target sequence kept only its own longest regions; keep the longest overall.
+            found_signatures = self._iter_longest(found_signatures, finder.region_filter.top_n)
+        if merged_target is not None:
+            # Report merged-genome coordinates alongside per-contig ones.
+            return map(merged_target.to_merged_signature, found_signatures)
+        return found_signatures
+
+    def signature_table_on_paths(
+        self,
+        target_path: FastaSource,
+        background_paths: List[FastaSource],
+        kmer_size: int,
+        run_preprocessor: bool,
+        engine: str = "set",
+        background_index_id: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        instrumentation: Instrumentation = NULL_INSTRUMENTATION,
+        region_filter: Optional[RegionFilter] = None,
+    ) -> SignatureTable:
+        """
+        Finds the signatures of `iter_signatures_on_paths` as one
+        SignatureTable. The table refers to the loaded target sequences
+        until it is compacted, so no signature's bases are copied here.
+        """
+        finder, background, target_sequences, merged_target = self._prepare_scan(
+            target_path, background_paths, kmer_size, run_preprocessor, engine, background_index_id,
+            progress, instrumentation, region_filter,
+        )
+        table = finder.find_unique_signature_table(
+            target_sequences, background, progress=lambda fraction: _report(progress, "scan", fraction)
+        )
+        if finder.region_filter is not None and finder.region_filter.top_n is not None:
+            # Each target sequence kept only its own longest regions; keep the longest overall.
+            table = table.longest(finder.region_filter.top_n)
+        if merged_target is not None:
+            # Report merged-genome coordinates alongside per-contig ones.
+            return merged_target.to_merged_table(table)
+        return table
+
+    def _prepare_scan(
+        self,
+        target_path: FastaSource,
+        background_paths: List[FastaSource],
+        kmer_size: int,
+        run_preprocessor: bool,
+        engine: str,
+        background_index_id: Optional[str],
+        progress: Optional[ProgressCallback],
+        instrumentation: Instrumentation,
+        region_filter: Optional[RegionFilter],
+    ) -> Tuple[SignatureFinder, object, Dict, Optional[MergedGenome]]:
+        """
+        Loads the target and builds or opens the background, returning the
+        finder set up to scan them, the background, the target sequences and
+        the merged target genome, if the preprocessor ran.
+        """
+        load_stage = "preprocess" if run_preprocessor else "parse"
+        _report(progress, "preprocess", 0.0)
+        if background_index_id and UpdatableBackgroundIndex.exists(config.UPDATABLE_BACKGROUND_DIR, background_index_id):
+            background = self._updatable_background(background_index_id)
+            if background.kmer_size != kmer_size:
+                raise ValueError(
+                    f"Background '{background_index_id}' was built for k={background.kmer_size}, not k={kmer_size}."
+                )
+            # Queried in-process: the panel has no single code file for worker processes to map.
+            finder = PackedSignatureFinder(kmer_size=kmer_size)
+            background_sequences = None
+        elif background_index_id:
+            # Prebuilt indexes are queried with the packed engine, or the bloom engine for Bloom filter indexes.
+            background = BackgroundIndex.open(config.INDEX_DIR, background_index_id)
+            if background.kmer_size != kmer_size:
+                raise ValueError(
+                    f"Background index '{background_index_id}' was built for k={background.kmer_size}, not k={kmer_size}."
+                )
+            if isinstance(background, BloomBackground):
+                finder = create_bloom_finder(kmer_size)
+                if background_paths:
+                    # Uploaded background genomes are used for the exact re-check.
+                    background.recheck_source = lambda: (
+                        seq for _, seq in iter_background(background_paths, run_preprocessor, "bytes")
+                    )
+            else:
+                finder = PackedSignatureFinder(kmer_size=kmer_size, workers=config.WORKERS, executor=worker_processes.executor)
+                if not config.PREFILTER_ENABLED:
+                    background.sketch = None
+            background_sequences = None
+        else:
+            if not background_paths:
+                raise ValueError("Provide background genome files or a background index ID.")
+            finder = create_finder(kmer_size, engine)
+            if engine in STREAMED_BACKGROUND_ENGINES:
+                # The filter or partitions are built later, reading one background genome at a time.
+                background_sequences = None
+            else:
+                with instrumentation.stage(load_stage):
+                    background_sequences = load_background(
+                        background_paths, run_preprocessor, sequence_output(finder)
+                    )
+                instrumentation.add_work(load_stage, bases=sum(len(seq) for seq in background_sequences.values()))
+        with instrumentation.stage(load_stage):
+            target_sequences, merged_target = load_target(target_path, run_preprocessor, sequence_output(finder))
+        instrumentation.add_work(load_stage, bases=sum(len(seq) for seq in target_sequences.values()))
+
+        # Streamed backgrounds are read while they are built, so their parsing is part of the build.
+        if background_sequences is not None:
+            _report(progress, "index_build", 0.0)
+            with instrumentation.stage("index_build"):
+                background = finder.build_background(background_sequences)
+            del background_sequences
+        elif isinstance(finder, PartitionedSignatureFinder):
+            _report(progress, "index_build", 0.0)
+            with instrumentation.stage("index_build"):
+                background = build_partitioned_background(finder, background_paths, run_preprocessor, self._fasta_size)
+        elif not background_index_id:
+            _report(progress, "index_build", 0.0)
+            with instrumentation.stage("index_build"):
+                background = build_bloom_background(finder, background_paths, run_preprocessor, self._fasta_size)
+
+        finder.instrumentation = instrumentation
+        finder.region_filter = region_filter if region_filter is not None and region_filter.is_active else None
+
+        _report(progress, "scan", 0.0)
+        return finder, background, target_sequences, merged_target
+
+    @staticmethod
+    def _iter_longest(signatures: Iterator[Dict], count: int) -> Iterator[Dict]:
+        yield from longest_signatures(signatures, count)
+
+    def iter_panel_results(
+        self,
+        genome_paths: List[str],
+        genome_names: List[str],
+        kmer_size: int,
+        run_preprocessor: bool,
+        groups: Optional[List[List[str]]] = None,
+        include_sequence: bool = True,
+    ) -> Iterator[Dict]:
+        """
+        Finds signatures for every genome of a panel from one shared k-mer
+        occurrence table, instead of one analysis per genome.
+
+        The table is built by this call, reading one genome at a time; the
+        returned iterator then yields one result per genome as it is
+        scanned: {'genome', 'group', 'signatures'}. After the unique
+        signatures of every genome, it yields, for each group in `groups`
+        and each of its members, the regions shared by the whole group and
+        absent from the rest of the panel.
+        """
+        if len(genome_paths) < 2:
+            raise ValueError("A panel needs at least two genomes.")
+        if len(genome_paths) != len(genome_names):
+            raise ValueError("Every panel genome needs a name.")
+
+        finder = PanelSignatureFinder(kmer_size=kmer_size)
+        table = finder.build_table(
+            (name, load_target(path, run_preprocessor, "bytes")[0].values())
+            for name, path in zip(genome_names, genome_paths)
+        )
+        for group in groups or []:
+            # Fail before streaming starts if a group names an unknown genome.
+            table.group_mask(group)
+        return self._iter_panel_results(finder, table, genome_paths, run_preprocessor, groups or [], include_sequence)
+
+    def _iter_panel_results(
+        self,
+        finder: PanelSignatureFinder,
+        table: GenomeOccurrenceTable,
+        genome_paths: List[str],
+        run_preprocessor: bool,
+        groups: List[List[str]],
+        include_sequence: bool,
+    ) -> Iterator[Dict]:
+        paths = dict(zip(table.genome_names, genome_paths))
+        selections = [(name, None) for name in table.genome_names]
+        selections += [(name, list(group)) for group in groups for name in group]
+
+        for name, group in selections:
+            sequences, merged = load_target(paths[name], run_preprocessor, "bytes")
+            signatures = finder.iter_panel_signatures(table, name, sequences, group=group, include_sequence=include_sequence)
+            if merged is not None:
+                signatures = map(merged.to_merged_signature, signatures)
+            yield {'genome': name, 'group': group, 'signatures': list(signatures)}
+
+    def iter_sweep_on_paths(
+        self,
+        target_path: FastaSource,
+        background_paths: List[FastaSource],
+        kmer_sizes: List[int],
+        run_preprocessor: bool,
+        include_sequence: bool = True,
+    ) -> Iterator[Dict]:
+        """
+        Finds unique signatures for several k-mer sizes from one suffix array.
+
+        The genomes are loaded and the suffix array is built by this call;
+        the returned iterator yields {'kmer_size', 'signatures'} for each
+        size in turn.
+        """
+        if not background_paths:
+            raise ValueError("Provide background genome files.")
+        kmer_sizes = sorted(set(kmer_sizes))
+        check_suffix_kmer_sizes(kmer_sizes)
+
+        finder = SuffixArraySignatureFinder(kmer_size=kmer_sizes[0], max_kmer_size=kmer_sizes[-1])
+        background = finder.build_background(load_background(background_paths, run_preprocessor, "bytes"))
+        target_sequences, merged_target = load_target(target_path, run_preprocessor, "bytes")
+        lengths = finder.minimal_unique_lengths(target_sequences, background)
+        del background
+
+        def results() -> Iterator[Dict]:
+            for kmer_size in kmer_sizes:
+                signatures = finder.iter_signatures_for_kmer_size(lengths, target_sequences, kmer_size, include_sequence)
+                if merged_target is not None:
+                    signatures = map(merged_target.to_merged_signature, signatures)
+                yield {'kmer_size': kmer_size, 'signatures': list(signatures)}
 
-            return result
\ No newline at end of file
+        return results()
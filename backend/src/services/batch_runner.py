@@ -0,0 +1,429 @@
+"""
+Runs signature analyses over many local target genomes without the API.
+
+Targets come from a directory or a manifest. Targets that share a
+background are analysed against one background build, in a pipeline:
+the next targets are parsed on a loader thread while the current one is
+scanned (on the finder's worker pool), and finished results are written on
+a writer thread. Each target gets one output file, written under a
+temporary name and renamed when complete, and a line in a journal, so a run
+that was interrupted skips the finished targets when it is started again.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.bloom_signature_finder import BloomSignatureFinder
+from src.core.instrumentation import Instrumentation
+from src.core.packed_signature_finder import PackedSignatureFinder
+from src.core.partitioned_signature_finder import PartitionedSignatureFinder
+from src.core.regions import RegionFilter
+from src.core.signature_table import SignatureTable
+from src.core.signature_finder import SignatureFinder
+from src.services.genome_loading import (
+    build_bloom_background,
+    build_partitioned_background,
+    create_finder,
+    load_background,
+    load_target,
+    sequence_output,
+)
+from src.services.result_export import export_signatures
+
+# File name suffixes of FASTA files picked up from a target directory.
+FASTA_SUFFIXES = (".fna", ".fa", ".fasta", ".fas", ".ffn", ".fsa")
+COMPRESSED_SUFFIXES = (".gz", ".bgz")
+
+# Per-target output formats: TSV, or NumPy .npz columns.
+OUTPUT_FORMATS = ("tsv", "npz")
+
+JOURNAL_NAME = "batch_journal.jsonl"
+
+# Target names become output file names in the output directory: no path
+# separators, no '..' and no leading '.'.
+_NAME_PATTERN = re.compile(r"^(?!.*\.\.)[^./\\\x00][^/\\\x00]{0,254}$")
+
+
+@dataclass
+class BatchTarget:
+    """One target genome of a batch and the background it is compared against."""
+    name: str
+    path: str
+    background_paths: Tuple[str, ...] = ()
+
+
+@dataclass
+class BatchReport:
+    """What a batch run did, by target name."""
+    completed: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+
+def target_name(path: str) -> str:
+    """A target's name: its file name without the FASTA and compression suffixes."""
+    name = os.path.basename(path)
+    for suffixes in (COMPRESSED_SUFFIXES, FASTA_SUFFIXES):
+        for suffix in suffixes:
+            if name.lower().endswith(suffix):
+                name = name[:-len(suffix)]
+                break
+    return name
+
+
+def check_target_name(name: str) -> None:
+    """
+    Raises:
+        ValueError: If the name cannot be used as an output file name.
+    """
+    if not _NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid target name '{name}'. Names must not contain path separators or '..'.")
+
+
+def is_fasta_path(path: str) -> bool:
+    name = path.lower()
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return name.endswith(FASTA_SUFFIXES)
+
+
+def discover_targets(directory: str, background_paths: Iterable[str] = ()) -> List[BatchTarget]:
+    """
+    Every FASTA file in a directory (not its subdirectories), sorted by name,
+    as a target against `background_paths`. Background files that are in the
+    directory are not targets.
+    """
+    background = tuple(os.path.abspath(path) for path in background_paths)
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if is_fasta_path(name) and os.path.isfile(os.path.join(directory, name))
+    )
+    return [
+        BatchTarget(target_name(path), path, background)
+        for path in paths if os.path.abspath(path) not in background
+    ]
+
+
+def read_manifest(manifest_path: str, background_paths: Iterable[str] = ()) -> List[BatchTarget]:
+    """
+    Reads the targets of a manifest: one target per line, as tab-separated
+    `target path`, optionally followed by a name and by comma-separated
+    background paths that replace `background_paths` for that target.
+    Relative paths are relative to the manifest. Blank lines and lines
+    starting with '#' are ignored.
+
+    Raises:
+        ValueError: If a line has too many fields or an invalid target name.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    default_background = tuple(os.path.abspath(path) for path in background_paths)
+    targets = []
+    with open(manifest_path) as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.split("\t")
+            if len(fields) > 3:
+                raise ValueError(f"{manifest_path}, line {line_number}: expected at most 3 tab-separated fields.")
+            path = os.path.join(base, fields[0].strip())
+            name = fields[1].strip() if len(fields) > 1 and fields[1].strip() else target_name(path)
+            try:
+                check_target_name(name)
+            except ValueError as e:
+                raise ValueError(f"{manifest_path}, line {line_number}: {e}") from None
+            background = default_background
+            if len(fields) > 2 and fields[2].strip():
+                background = tuple(os.path.join(base, bg.strip()) for bg in fields[2].split(",") if bg.strip())
+            targets.append(BatchTarget(name, path, background))
+    return targets
+
+
+def _file_fingerprint(path: str) -> List:
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def _write_npz(path: str, table: SignatureTable, include_sequence: bool) -> None:
+    """
+    Writes signatures as NumPy columns, with each distinct sequence ID stored
+    once. Bases, if included, are concatenated in 'sequence_bases', the
+    signature i being sequence_bases[sequence_offsets[i]:sequence_offsets[i + 1]].
+    """
+    # Only the IDs that have signatures are stored; the table is in target order.
+    used, sequence_index = np.unique(table.sequence_index, return_inverse=True)
+    columns = {
+        "sequence_ids": np.array([table.sequence_ids[i] for i in used.tolist()], dtype=str),
+        "sequence_index": sequence_index.astype(np.int32),
+        "start": table.starts,
+        "end": table.ends,
+    }
+    if table.has_contigs and len(table):
+        used, contig_index = np.unique(table.contig_index, return_inverse=True)
+        columns["contig_index"] = contig_index.astype(np.int32)
+        columns["contig_ids"] = np.array([table.contig_ids[i] for i in used.tolist()], dtype=str)
+        columns["contig_start"] = table.contig_starts
+        columns["contig_end"] = table.contig_ends
+    if include_sequence:
+        bases = [sequence.encode("ascii", errors="replace") for sequence in table.iter_sequences()]
+        columns["sequence_bases"] = np.frombuffer(b"".join(bases), dtype=np.uint8)
+        columns["sequence_offsets"] = np.concatenate(([0], np.cumsum([len(b) for b in bases], dtype=np.int64)))
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **columns)
+
+
+class BatchRunner:
+    """
+    Analyses a list of BatchTargets, writing `<name>.<format>` for each to
+    `output_dir`. Signatures are found exactly as by AnalysisService.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        kmer_size: int,
+        engine: str = "packed",
+        run_preprocessor: bool = False,
+        output_format: str = "tsv",
+        include_sequence: bool = False,
+        region_filter: Optional[RegionFilter] = None,
+        workers: Optional[int] = None,
+        prefetch: int = 2,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            output_dir: Where the per-target outputs and the journal are written.
+            kmer_size: The k-mer size of every analysis.
+            engine: One of SIGNATURE_ENGINES.
+            workers: Worker processes of the packed engines, kept open for
+                     all targets of a background. Defaults to ISIGNIFY_WORKERS.
+            run_preprocessor: Whether to merge multi-contig genomes.
+            output_format: One of OUTPUT_FORMATS.
+            include_sequence: Whether outputs include each signature's bases.
+            region_filter: Signatures to keep, if not all.
+            prefetch: How many targets are parsed ahead of the one being scanned.
+            log: Called with a line of progress for each target.
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}'. Choose one of: {', '.join(OUTPUT_FORMATS)}.")
+        if prefetch < 1:
+            raise ValueError("prefetch must be at least 1.")
+        self.output_dir = output_dir
+        self.kmer_size = kmer_size
+        self.engine = engine
+        self.run_preprocessor = run_preprocessor
+        self.output_format = output_format
+        self.include_sequence = include_sequence
+        self.region_filter = region_filter if region_filter is not None and region_filter.is_active else None
+        self.workers = workers
+        self.prefetch = prefetch
+        self.log = log or (lambda message: None)
+        self.instrumentation = Instrumentation(track_memory=False)
+        # The finder is created up front so a bad engine or k-mer size fails before any work.
+        create_finder(kmer_size, engine)
+
+    def output_path(self, target: BatchTarget) -> str:
+        return os.path.join(self.output_dir, f"{target.name}.{self.output_format}")
+
+    def settings_key(self, target: BatchTarget) -> str:
+        """
+        Identifies a target's result: the analysis settings and the path,
+        size and modification time of its input files.
+        """
+        settings = {
+            "kmer_size": self.kmer_size,
+            "engine": self.engine,
+            "run_preprocessor": self.run_preprocessor,
+            "output_format": self.output_format,
+            "include_sequence": self.include_sequence,
+            "region_filter": self.region_filter.options() if self.region_filter else None,
+            "target": _file_fingerprint(target.path),
+            "background": [_file_fingerprint(path) for path in target.background_paths],
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _journal_path(self) -> str:
+        return os.path.join(self.output_dir, JOURNAL_NAME)
+
+    def _finished_keys(self) -> Dict[str, str]:
+        """The settings key of every target the journal records as finished, by name."""
+        finished = {}
+        if os.path.exists(self._journal_path()):
+            with open(self._journal_path()) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A line cut short by an interruption.
+                    finished[entry["name"]] = entry["settings_key"]
+        return finished
+
+    def _record_finished(self, target: BatchTarget, settings_key: str, signature_count: int) -> None:
+        entry = {"name": target.name, "settings_key": settings_key, "signatures": signature_count, "path": target.path}
+        with open(self._journal_path(), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def run(self, targets: List[BatchTarget]) -> BatchReport:
+        """
+        Analyses every target that has no up-to-date output yet. A target
+        that fails, or whose input files are missing, is reported and the
+        others still run.
+
+        Raises:
+            ValueError: If two targets have the same name, a name is not a
+                        valid file name, or a target has no background.
+        """
+        names = [target.name for target in targets]
+        for name in names:
+            check_target_name(name)
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Targets must have distinct names; repeated: {', '.join(duplicates)}.")
+        for target in targets:
+            if not target.background_paths:
+                raise ValueError(f"Target '{target.name}' has no background genomes.")
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        report = BatchReport()
+        finished = self._finished_keys()
+        pending = []
+        for target in targets:
+            try:
+                key = self.settings_key(target)
+            except OSError as e:
+                report.failed[target.name] = str(e)
+                self.log(f"{target.name}: failed: {e}")
+                continue
+            if finished.get(target.name) == key and os.path.exists(self.output_path(target)):
+                report.skipped.append(target.name)
+            else:
+                pending.append((target, key))
+
+        # Targets sharing a background use one build of it.
+        groups: Dict[Tuple[str, ...], List] = {}
+        for target, key in pending:
+            groups.setdefault(target.background_paths, []).append((target, key))
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="isignify-batch-load") as loader, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="isignify-batch-write") as writer:
+            for background_paths, group in groups.items():
+                self._run_group(background_paths, group, loader, writer, report, len(pending))
+        return report
+
+    def _run_group(
+        self,
+        background_paths: Tuple[str, ...],
+        group: List,
+        loader: ThreadPoolExecutor,
+        writer: ThreadPoolExecutor,
+        report: BatchReport,
+        total: int,
+    ) -> None:
+        finder = create_finder(self.kmer_size, self.engine)
+        finder.instrumentation = self.instrumentation
+        finder.region_filter = self.region_filter
+        if isinstance(finder, PackedSignatureFinder) and self.workers:
+            finder.workers = self.workers
+        # Packed finders keep one process pool for the background build and every scan.
+        with finder.worker_pool() if isinstance(finder, PackedSignatureFinder) else nullcontext():
+            try:
+                with self.instrumentation.stage("index_build"):
+                    background = self._build_background(finder, list(background_paths))
+            except Exception as e:
+                for target, _ in group:
+                    report.failed[target.name] = f"Background could not be built: {e}"
+                    self.log(f"{target.name}: failed: background could not be built: {e}")
+                return
+
+            output = sequence_output(finder)
+            loads: Deque[Tuple[BatchTarget, str, Future]] = deque()
+            queue = iter(group)
+            writes: List[Tuple[BatchTarget, Future]] = []
+
+            def load_next() -> None:
+                for target, key in queue:
+                    loads.append((target, key, loader.submit(self._load_target, target, output)))
+                    return
+
+            for _ in range(self.prefetch):
+                load_next()
+            while loads:
+                target, key, loaded = loads.popleft()
+                load_next()
+                started = time.perf_counter()
+                try:
+                    target_sequences, merged_target = loaded.result()
+                    signatures = self._find_signatures(finder, background, target_sequences, merged_target)
+                except Exception as e:
+                    report.failed[target.name] = str(e)
+                    self.log(f"{target.name}: failed: {e}")
+                    continue
+                del target_sequences
+                writes.append((target, writer.submit(self._write_output, target, key, signatures)))
+                done = len(report.completed) + len(report.failed) + len(writes)
+                self.log(f"[{done}/{total}] {target.name}: {len(signatures)} signatures in {time.perf_counter() - started:.2f} s")
+                self._collect_writes(writes, report, wait=False)
+            self._collect_writes(writes, report, wait=True)
+
+    def _collect_writes(self, writes: List[Tuple[BatchTarget, Future]], report: BatchReport, wait: bool) -> None:
+        """Moves finished writes into the report; with `wait`, waits for all of them."""
+        for target, future in list(writes):
+            if not wait and not future.done():
+                continue
+            writes.remove((target, future))
+            try:
+                future.result()
+                report.completed.append(target.name)
+            except Exception as e:
+                report.failed[target.name] = f"Output could not be written: {e}"
+                self.log(f"{target.name}: failed: output could not be written: {e}")
+
+    def _build_background(self, finder: SignatureFinder, paths: List[str]):
+        if isinstance(finder, PartitionedSignatureFinder):
+            return build_partitioned_background(finder, paths, self.run_preprocessor)
+        if isinstance(finder, BloomSignatureFinder):
+            return build_bloom_background(finder, paths, self.run_preprocessor)
+        return finder.build_background(load_background(paths, self.run_preprocessor, sequence_output(finder)))
+
+    def _load_target(self, target: BatchTarget, output: str):
+        stage = "preprocess" if self.run_preprocessor else "parse"
+        with self.instrumentation.stage(stage):
+            target_sequences, merged_target = load_target(target.path, self.run_preprocessor, output)
+        self.instrumentation.add_work(stage, bases=sum(len(seq) for seq in target_sequences.values()))
+        return target_sequences, merged_target
+
+    def _find_signatures(self, finder: SignatureFinder, background, target_sequences: Dict, merged_target) -> SignatureTable:
+        table = finder.find_unique_signature_table(target_sequences, background)
+        if self.region_filter is not None and self.region_filter.top_n is not None:
+            table = table.longest(self.region_filter.top_n)
+        if merged_target is not None:
+            table = merged_target.to_merged_table(table)
+        # Without bases, the table no longer holds on to the target.
+        return table if self.include_sequence else table.without_bases()
+
+    def _write_output(self, target: BatchTarget, settings_key: str, signatures: SignatureTable) -> None:
+        """Writes a target's output under a temporary name, then renames it and journals it."""
+        path = self.output_path(target)
+        partial_path = path + ".part"
+        with self.instrumentation.stage("write"):
+            if self.output_format == "npz":
+                _write_npz(partial_path, signatures, self.include_sequence)
+            else:
+                with open(partial_path, "wb") as f:
+                    for chunk in export_signatures(signatures, "tsv", self.include_sequence):
+                        f.write(chunk)
+            os.replace(partial_path, path)
+        self._record_finished(target, settings_key, len(signatures))
@@ -0,0 +1,172 @@
+"""
+Creates the k-mer engines and loads the genomes they compare, with the
+settings from the config. Shared by the analysis service and the batch
+runner.
+"""
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src import config
+from src.core.bloom_filter import BloomBackground
+from src.core.bloom_signature_finder import BloomSignatureFinder
+from src.core.compressed_fasta import uncompressed_size_hint
+from src.core.packed_signature_finder import PackedSignatureFinder
+from src.core.partitioned_signature_finder import PartitionedBackground, PartitionedSignatureFinder
+from src.core.preprocessor import FastaPreprocessor, MergedGenome
+from src.core.sequence_parser import FastaSource, SequenceParser
+from src.core.signature_finder import SignatureFinder
+from src.core.suffix_signature_finder import SuffixArraySignatureFinder
+from src.services.worker_processes import worker_processes
+
+# The k-mer engines that can be selected for an analysis. Every engine
+# returns the same signatures; they differ only in speed and memory use.
+SIGNATURE_ENGINES = {
+    "set": SignatureFinder,
+    "packed": PackedSignatureFinder,
+    # Approximate: never reports a shared k-mer as unique, but may miss
+    # unique k-mers unless they are re-checked exactly (see config).
+    "bloom": BloomSignatureFinder,
+    # Suffix array over target and backgrounds: any k-mer size, one build per sweep.
+    "suffix": SuffixArraySignatureFinder,
+    # Out-of-core: k-mers are partitioned into bucket files on disk and
+    # checked one bucket at a time under a memory cap (see config).
+    "partitioned": PartitionedSignatureFinder,
+}
+
+# The description of the `engine` form field of the analysis endpoints.
+ENGINE_FORM_DESCRIPTION = (
+    "The k-mer engine to use: 'set', 'packed' (2-bit NumPy, k <= 32), 'bloom' (approximate, bounded memory, "
+    "k <= 32), 'suffix' (suffix array, any k) or 'partitioned' (out-of-core, k <= 32)."
+)
+
+
+def create_finder(kmer_size: int, engine: str) -> SignatureFinder:
+    """
+    Creates the SignatureFinder for the requested k-mer engine.
+    """
+    if engine not in SIGNATURE_ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Choose one of: {', '.join(SIGNATURE_ENGINES)}.")
+    engine_class = SIGNATURE_ENGINES[engine]
+    if issubclass(engine_class, BloomSignatureFinder):
+        return create_bloom_finder(kmer_size)
+    if issubclass(engine_class, PartitionedSignatureFinder):
+        return engine_class(
+            kmer_size=kmer_size,
+            memory_limit_bytes=config.PARTITION_MEMORY_LIMIT_MB << 20,
+            work_dir=config.PARTITION_DIR or None,
+        )
+    if issubclass(engine_class, SuffixArraySignatureFinder):
+        check_suffix_kmer_sizes([kmer_size])
+        return engine_class(kmer_size=kmer_size)
+    if issubclass(engine_class, PackedSignatureFinder):
+        return engine_class(
+            kmer_size=kmer_size, workers=config.WORKERS, sketch_window=sketch_window(),
+            executor=worker_processes.executor,
+        )
+    return engine_class(kmer_size=kmer_size, sketch_window=sketch_window())
+
+
+def create_bloom_finder(
+    kmer_size: int, false_positive_rate: Optional[float] = None, max_bytes: Optional[int] = None
+) -> BloomSignatureFinder:
+    """
+    Creates a BloomSignatureFinder, taking unset options from the config.
+    """
+    return BloomSignatureFinder(
+        kmer_size=kmer_size,
+        false_positive_rate=false_positive_rate or config.BLOOM_FALSE_POSITIVE_RATE,
+        max_bytes=max_bytes or config.BLOOM_MAX_BYTES or None,
+        exact_recheck=config.BLOOM_EXACT_RECHECK,
+    )
+
+
+def sketch_window() -> Optional[int]:
+    """The minimizer window of prefilter sketches, or None when the prefilter is off."""
+    return config.PREFILTER_WINDOW if config.PREFILTER_ENABLED else None
+
+
+def check_suffix_kmer_sizes(kmer_sizes: List[int]) -> None:
+    if not kmer_sizes:
+        raise ValueError("Provide at least one k-mer size.")
+    if min(kmer_sizes) < 1 or max(kmer_sizes) > config.SUFFIX_MAX_KMER_SIZE:
+        raise ValueError(f"k-mer sizes must be between 1 and {config.SUFFIX_MAX_KMER_SIZE}.")
+
+
+def sequence_output(finder: SignatureFinder) -> str:
+    """
+    The SequenceParser output type a finder consumes without another copy.
+    """
+    return "bytes" if isinstance(finder, (PackedSignatureFinder, SuffixArraySignatureFinder)) else "str"
+
+
+def load_target(path: FastaSource, run_preprocessor: bool, output: str) -> Tuple[Dict, Optional[MergedGenome]]:
+    """
+    Loads the target genome.
+
+    With the preprocessor, the contigs are merged in memory and returned as
+    views keyed by contig index, together with the merged genome used to
+    map signatures back to merged coordinates.
+    """
+    if run_preprocessor:
+        genome = FastaPreprocessor().merge_contigs(path)
+        return genome.contig_sequences(), genome
+    return dict(SequenceParser().iter_records(path, output=output)), None
+
+
+def load_background(paths: List[FastaSource], run_preprocessor: bool, output: str) -> Dict:
+    """
+    Loads every background genome into one dictionary.
+
+    Keys are (file index, record key) tuples so identically named records
+    in different background files are all kept.
+    """
+    return dict(iter_background(paths, run_preprocessor, output))
+
+
+def iter_background(
+    paths: List[FastaSource], run_preprocessor: bool, output: str
+) -> Iterator[Tuple[Tuple[int, object], object]]:
+    """
+    Yields ((file index, record key), sequence) for every background
+    record, reading one file at a time.
+    """
+    for file_index, path in enumerate(paths):
+        if run_preprocessor:
+            records = FastaPreprocessor().merge_contigs(path).contig_sequences().items()
+        else:
+            records = SequenceParser().iter_records(path, output=output)
+        for key, seq in records:
+            yield (file_index, key), seq
+
+
+def build_bloom_background(
+    finder: BloomSignatureFinder,
+    paths: List[str],
+    run_preprocessor: bool,
+    fasta_size: Callable[[str], int] = uncompressed_size_hint,
+) -> BloomBackground:
+    """
+    Builds a Bloom filter background reading one genome at a time. The
+    filter is sized from `fasta_size` of each file, its uncompressed size,
+    an upper bound on the k-mer count.
+    """
+    def sequences() -> Iterable:
+        return (seq for _, seq in iter_background(paths, run_preprocessor, "bytes"))
+
+    background = finder.build_filter(sequences(), expected_kmers=sum(fasta_size(path) for path in paths))
+    background.recheck_source = sequences
+    return background
+
+
+def build_partitioned_background(
+    finder: PartitionedSignatureFinder,
+    paths: List[str],
+    run_preprocessor: bool,
+    fasta_size: Callable[[str], int] = uncompressed_size_hint,
+) -> PartitionedBackground:
+    """
+    Partitions the background k-mers into bucket files reading one genome
+    at a time. The bucket count is chosen from `fasta_size` of each file,
+    its uncompressed size.
+    """
+    sequences = (seq for _, seq in iter_background(paths, run_preprocessor, "bytes"))
+    return finder.build_partitions(sequences, expected_kmers=sum(fasta_size(path) for path in paths))
@@ -0,0 +1,187 @@
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from src import config
+
+
+class JobCancelledError(Exception):
+    """Raised inside a job's progress callback once the job has been cancelled."""
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its maximum depth."""
+
+
+class Job:
+    """
+    The state of one background job.
+
+    Status moves from "queued" to "running" and ends as "succeeded",
+    "failed" or "cancelled".
+    """
+
+    def __init__(self, stages: Sequence[str]):
+        self.job_id = uuid.uuid4().hex
+        self.status = "queued"
+        self.stage: Optional[str] = None
+        self.progress = 0.0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+        self._stages = list(stages)
+        self._cancel_requested = threading.Event()
+        self._future: Optional[Future] = None
+        self._on_finish: Optional[Callable[[], None]] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def report_progress(self, stage: str, fraction: float) -> None:
+        """
+        Records that `fraction` of `stage` is done. Used as the job's progress
+        callback, so it is also where cancellation takes effect.
+
+        Raises:
+            JobCancelledError: If the job has been cancelled.
+        """
+        if self._cancel_requested.is_set():
+            raise JobCancelledError(f"Job {self.job_id} was cancelled.")
+        self.stage = stage
+        if stage in self._stages:
+            overall = (self._stages.index(stage) + min(max(fraction, 0.0), 1.0)) / len(self._stages)
+            self.progress = max(self.progress, overall)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 4),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs long analyses on a bounded thread pool so API requests return at once.
+
+    At most `max_workers` jobs run concurrently and at most `max_queued`
+    more wait for a worker; further submissions are rejected. Finished jobs
+    are kept for `retention_seconds` so their results can be fetched.
+    """
+
+    def __init__(self, max_workers: int, max_queued: int, retention_seconds: float):
+        if max_workers < 1 or max_queued < 0:
+            raise ValueError("max_workers must be at least 1 and max_queued at least 0.")
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="isignify-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        func: Callable[[Callable[[str, float], None]], Any],
+        stages: Sequence[str],
+        on_finish: Optional[Callable[[], None]] = None,
+    ) -> Job:
+        """
+        Queues `func(progress)` as a new job.
+
+        Args:
+            func: The work to run. It receives the job's progress callback.
+            stages: The stage names `func` reports progress for, in order.
+            on_finish: Called once the job ends for any reason, e.g. to remove temp files.
+
+        Raises:
+            QueueFullError: If the queue is already at its maximum depth.
+        """
+        with self._lock:
+            self._prune()
+            waiting = sum(1 for job in self._jobs.values() if job.status == "queued")
+            running = sum(1 for job in self._jobs.values() if job.status == "running")
+            if waiting >= self.max_queued + max(self.max_workers - running, 0):
+                raise QueueFullError("The job queue is full. Try again later.")
+
+            job = Job(stages)
+            job._on_finish = on_finish
+            self._jobs[job.job_id] = job
+            job._future = self._executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """
+        Raises:
+            KeyError: If no job with this ID exists.
+        """
+        with self._lock:
+            return self._jobs[job_id]
+
+    def cancel(self, job_id: str) -> Job:
+        """
+        Cancels a job. A queued job is cancelled immediately; a running job
+        stops at its next progress report.
+        """
+        job = self.get(job_id)
+        if job.is_finished:
+            return job
+        job._cancel_requested.set()
+        if job._future is not None and job._future.cancel():
+            # The job never started, so _run will not clean up after it.
+            job.status = "cancelled"
+            job.finished_at = datetime.now(timezone.utc)
+            if job._on_finish is not None:
+                job._on_finish()
+        return job
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, func: Callable) -> None:
+        try:
+            job.status = "running"
+            job.started_at = datetime.now(timezone.utc)
+            job.result = func(job.report_progress)
+            job.progress = 1.0
+            job.status = "succeeded"
+        except JobCancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            if job._on_finish is not None:
+                job._on_finish()
+
+    def _prune(self) -> None:
+        """Forgets finished jobs older than the retention period. Call with the lock held."""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.is_finished and job.finished_at is not None
+            and now - job.finished_at.timestamp() > self.retention_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# The process-wide job manager used by the job API.
+job_manager = JobManager(
+    max_workers=config.JOB_WORKERS,
+    max_queued=config.JOB_QUEUE_DEPTH,
+    retention_seconds=config.JOB_RETENTION_SECONDS,
+)
@@ -0,0 +1,101 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.core.instrumentation import StageRecord
+
+# Upper bounds, in seconds, of the stage duration histogram buckets.
+STAGE_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """
+    Aggregates the stage records of finished analyses and renders them in
+    the Prometheus text exposition format.
+
+    Per stage it keeps the total time, a duration histogram, the bases and
+    k-mers handled and the latest peak RSS; per engine, the number of analyses.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = STAGE_SECONDS_BUCKETS):
+        self.buckets = buckets
+        self._stage_seconds: Dict[str, float] = {}
+        self._stage_counts: Dict[str, int] = {}
+        self._stage_buckets: Dict[str, List[int]] = {}
+        self._stage_bases: Dict[str, int] = {}
+        self._stage_kmers: Dict[str, int] = {}
+        self._stage_peak_rss: Dict[str, int] = {}
+        self._analyses: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, records: Iterable[StageRecord], engine: str) -> None:
+        """Adds the stages of one finished analysis."""
+        with self._lock:
+            self._analyses[engine] = self._analyses.get(engine, 0) + 1
+            for record in records:
+                stage = record.stage
+                self._stage_seconds[stage] = self._stage_seconds.get(stage, 0.0) + record.seconds
+                self._stage_counts[stage] = self._stage_counts.get(stage, 0) + 1
+                counts = self._stage_buckets.setdefault(stage, [0] * len(self.buckets))
+                for i, bound in enumerate(self.buckets):
+                    if record.seconds <= bound:
+                        counts[i] += 1
+                self._stage_bases[stage] = self._stage_bases.get(stage, 0) + record.bases
+                self._stage_kmers[stage] = self._stage_kmers.get(stage, 0) + record.kmers
+                if record.peak_rss_bytes:
+                    self._stage_peak_rss[stage] = record.peak_rss_bytes
+
+    def render(self, extra_counters: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """
+        Returns every metric in the Prometheus text format.
+
+        Args:
+            extra_counters: Further counters to include, as
+                            {metric name: (help text, value)}.
+        """
+        lines = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family("isignify_analyses_total", "counter", "Analyses finished, by k-mer engine.")
+            for engine, count in sorted(self._analyses.items()):
+                lines.append(f"isignify_analyses_total{_labels(engine=engine)} {count}")
+
+            family("isignify_stage_duration_seconds", "histogram", "Wall time of each analysis stage.")
+            for stage, counts in self._stage_buckets.items():
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"isignify_stage_duration_seconds_bucket{_labels(stage=stage, le=repr(bound))} {count}")
+                lines.append(f"isignify_stage_duration_seconds_bucket{_labels(stage=stage, le='+Inf')} {self._stage_counts[stage]}")
+                lines.append(f"isignify_stage_duration_seconds_sum{_labels(stage=stage)} {self._stage_seconds[stage]!r}")
+                lines.append(f"isignify_stage_duration_seconds_count{_labels(stage=stage)} {self._stage_counts[stage]}")
+
+            family("isignify_stage_bases_total", "counter", "Bases handled by each analysis stage.")
+            for stage, bases in self._stage_bases.items():
+                lines.append(f"isignify_stage_bases_total{_labels(stage=stage)} {bases}")
+
+            family("isignify_stage_kmers_total", "counter", "K-mers handled by each analysis stage.")
+            for stage, kmers in self._stage_kmers.items():
+                lines.append(f"isignify_stage_kmers_total{_labels(stage=stage)} {kmers}")
+
+            family("isignify_stage_peak_rss_bytes", "gauge", "Peak resident memory of the process during the latest run of each stage.")
+            for stage, peak in self._stage_peak_rss.items():
+                lines.append(f"isignify_stage_peak_rss_bytes{_labels(stage=stage)} {peak}")
+
+        for name, (help_text, value) in (extra_counters or {}).items():
+            family(name, "counter", help_text)
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# The process-wide metrics of finished analyses.
+metrics = MetricsRegistry()
@@ -0,0 +1,132 @@
+import threading
+import time
+from typing import Optional
+
+from src import config
+
+
+class SummaryModelManager:
+    """
+    Keeps one copy of the summary language model loaded for the whole process.
+
+    `torch` and `transformers` are imported on first use rather than at
+    import time, so workers start quickly and never pay for them when the
+    LLM is disabled. The model is shared by all requests; generation is
+    serialized with a lock, and the model is released again after it has
+    been idle for `idle_unload_seconds`.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        enabled: bool = True,
+        quantization: str = "none",
+        idle_unload_seconds: float = 0,
+    ):
+        """
+        Initializes the SummaryModelManager. Nothing is loaded until first use.
+
+        Args:
+            model_name: The Hugging Face model to load.
+            enabled: If False, `generate` is never allowed to load the model.
+            quantization: "none", "8bit" or "4bit" (the latter two need bitsandbytes).
+            idle_unload_seconds: Unload the model after this many idle seconds. 0 keeps it loaded.
+        """
+        if quantization not in ("none", "8bit", "4bit"):
+            raise ValueError(f"Unknown quantization '{quantization}'. Choose 'none', '8bit' or '4bit'.")
+        self.model_name = model_name
+        self.enabled = enabled
+        self.quantization = quantization
+        self.idle_unload_seconds = idle_unload_seconds
+
+        self._lock = threading.RLock()
+        self._tokenizer = None
+        self._model = None
+        self._last_used = 0.0
+        self._unload_timer: Optional[threading.Timer] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> None:
+        """
+        Loads the tokenizer and model if they are not loaded yet.
+        """
+        if not self.enabled:
+            raise RuntimeError("The summary model is disabled.")
+        with self._lock:
+            if self._model is not None:
+                return
+
+            import torch
+            from transformers import AutoTokenizer, AutoModelForCausalLM
+
+            model_kwargs = {"torch_dtype": torch.bfloat16}
+            if self.quantization != "none":
+                from transformers import BitsAndBytesConfig
+                model_kwargs["quantization_config"] = BitsAndBytesConfig(
+                    load_in_8bit=self.quantization == "8bit",
+                    load_in_4bit=self.quantization == "4bit",
+                )
+
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self._model = AutoModelForCausalLM.from_pretrained(self.model_name, **model_kwargs)
+            self._last_used = time.monotonic()
+
+    def unload(self) -> None:
+        """
+        Releases the model so its memory can be reclaimed.
+        """
+        with self._lock:
+            if self._unload_timer is not None:
+                self._unload_timer.cancel()
+                self._unload_timer = None
+            self._tokenizer = None
+            self._model = None
+
+    def warm_up(self) -> None:
+        """
+        Loads the model in a background thread so startup is not blocked.
+        """
+        if self.enabled:
+            threading.Thread(target=self.load, name="summary-model-warmup", daemon=True).start()
+
+    def generate(self, prompt: str, max_new_tokens: int = 50) -> str:
+        """
+        Generates a completion for the prompt, loading the model if needed.
+
+        Returns:
+            The decoded model output, including the prompt.
+        """
+        with self._lock:
+            self.load()
+            input_ids = self._tokenizer(prompt, return_tensors="pt")
+            response = self._model.generate(**input_ids, max_new_tokens=max_new_tokens)
+            output = self._tokenizer.decode(response[0], skip_special_tokens=True)
+            self._last_used = time.monotonic()
+            self._schedule_unload()
+        return output
+
+    def _schedule_unload(self) -> None:
+        if self.idle_unload_seconds <= 0:
+            return
+        if self._unload_timer is not None:
+            self._unload_timer.cancel()
+        self._unload_timer = threading.Timer(self.idle_unload_seconds, self._unload_if_idle)
+        self._unload_timer.daemon = True
+        self._unload_timer.start()
+
+    def _unload_if_idle(self) -> None:
+        with self._lock:
+            if time.monotonic() - self._last_used >= self.idle_unload_seconds:
+                self.unload()
+
+
+# The process-wide model manager shared by every request.
+summary_model = SummaryModelManager(
+    model_name=config.LLM_MODEL,
+    enabled=config.LLM_ENABLED,
+    quantization=config.LLM_QUANTIZATION,
+    idle_unload_seconds=config.LLM_IDLE_UNLOAD_SECONDS,
+)
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Union
+
+from src import config
+from src.core.signature_table import SignatureTable
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Rough in-memory cost of one signature dictionary besides its bases.
+_SIGNATURE_OVERHEAD_BYTES = 400
+
+
+@dataclass
+class CachedResult:
+    """
+    The summary and signatures of a finished analysis. The signatures are
+    kept as they were put, a SignatureTable or a list of dictionaries, and
+    are read back from disk as a list of dictionaries.
+    """
+    summary: str
+    signatures: Union[SignatureTable, List[Dict]]
+
+
+def _estimate_size(summary: str, signatures: Union[SignatureTable, List[Dict]]) -> int:
+    if isinstance(signatures, SignatureTable):
+        return len(summary) + signatures.size_bytes
+    return len(summary) + sum(_SIGNATURE_OVERHEAD_BYTES + len(sig.get('sequence') or "") for sig in signatures)
+
+
+class ResultCache:
+    """
+    Caches analysis results by the content of their inputs, so resubmitting
+    the same genomes with the same settings skips the whole pipeline.
+
+    Results are kept in memory up to `max_bytes` (estimated) and, with a
+    `disk_dir`, also written there as JSON up to `disk_max_bytes`. Both tiers
+    drop their least recently used results first. A result found only on
+    disk is moved back into memory.
+
+    Cached signature lists are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir or None
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def compute_key(
+        target_hash: str,
+        background_hashes: Iterable[str],
+        kmer_size: int,
+        run_preprocessor: bool,
+        options: Optional[Dict] = None,
+    ) -> str:
+        """
+        Computes the cache key of an analysis.
+
+        Args:
+            target_hash: The SHA-256 hex digest of the target file.
+            background_hashes: The SHA-256 hex digest of each background file,
+                               or the ID of a background index. Their order
+                               does not matter.
+            kmer_size: The k-mer size of the analysis.
+            run_preprocessor: Whether the genomes were merged by the preprocessor.
+            options: Any other settings that change the result, e.g. the summary
+                     model or an approximate engine's settings.
+
+        Returns:
+            A SHA-256 hex digest identifying the result.
+        """
+        key = {
+            "target": target_hash,
+            "backgrounds": sorted(background_hashes),
+            "kmer_size": kmer_size,
+            "run_preprocessor": run_preprocessor,
+        }
+        if options:
+            key["options"] = options
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """Returns the cached result for a key, or None, counting a hit or miss."""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key: str, summary: str, signatures: Union[SignatureTable, List[Dict]]) -> None:
+        """Caches a result in memory and, if there is a disk tier, on disk."""
+        result = CachedResult(summary, signatures)
+        with self._lock:
+            self._remember(key, result)
+        self._write_disk(key, result)
+
+    def clear(self) -> None:
+        """Empties both tiers. The counters are kept."""
+        with self._lock:
+            self._memory.clear()
+            self._sizes.clear()
+            self._memory_bytes = 0
+        for path in self._disk_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        """Returns the hit and miss counters and the size of each tier."""
+        disk_files = self._disk_files()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(disk_files),
+                "disk_bytes": sum(os.path.getsize(path) for path in disk_files),
+            }
+
+    def _remember(self, key: str, result: CachedResult) -> None:
+        """Adds a result to the memory tier, evicting older ones. Call with the lock held."""
+        size = _estimate_size(result.summary, result.signatures)
+        if key in self._memory:
+            self._memory_bytes -= self._sizes.pop(key)
+            del self._memory[key]
+        if size > self.max_bytes:
+            return
+        self._memory[key] = result
+        self._sizes[key] = size
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_bytes:
+            evicted, _ = self._memory.popitem(last=False)
+            self._memory_bytes -= self._sizes.pop(evicted)
+
+    def _disk_path(self, key: str) -> str:
+        if not _KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid cache key '{key}'.")
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_files(self) -> List[str]:
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return []
+        return [
+            os.path.join(self.disk_dir, name) for name in os.listdir(self.disk_dir)
+            if name.endswith(".json") and _KEY_PATTERN.match(name[:-5])
+        ]
+
+    def _read_disk(self, key: str) -> Optional[CachedResult]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # The modification time orders the disk tier for eviction.
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CachedResult(data["summary"], data["signatures"])
+
+    def _write_disk(self, key: str, result: CachedResult) -> None:
+        if not self.disk_dir or self.disk_max_bytes <= 0:
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        path = self._disk_path(key)
+        # Write under a temporary name first so readers never see a partial file.
+        staging_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(staging_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": result.summary, "signatures": list(result.signatures)}, f, separators=(",", ":"))
+        os.replace(staging_path, path)
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Removes the least recently used files until the disk tier fits."""
+        entries = []
+        for path in self._disk_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+# The process-wide cache of analysis results.
+result_cache = ResultCache(
+    max_bytes=config.RESULT_CACHE_MAX_BYTES,
+    disk_dir=config.RESULT_CACHE_DIR,
+    disk_max_bytes=config.RESULT_CACHE_DISK_MAX_BYTES,
+)
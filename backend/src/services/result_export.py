@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from pydantic import BaseModel
+
+from src.core.signature_table import SignatureTable
+
+# The output columns of a signature, in order.
+SIGNATURE_FIELDS = ("sequence_id", "start", "end", "length", "sequence", "contig_id", "contig_start", "contig_end")
+
+# Streaming export formats and their media types.
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "tsv": "text/tab-separated-values",
+}
+
+
+# Signatures encoded at a time when a SignatureTable is exported.
+TABLE_BATCH_SIZE = 8192
+
+# The integer columns of a signature; every other column is text.
+_INTEGER_FIELDS = frozenset(("start", "end", "length", "contig_start", "contig_end"))
+
+
+def signature_fields(include_sequence: bool = True) -> Tuple[str, ...]:
+    """The output columns, without 'sequence' for coordinates-only exports."""
+    if include_sequence:
+        return SIGNATURE_FIELDS
+    return tuple(name for name in SIGNATURE_FIELDS if name != "sequence")
+
+
+def iter_ndjson(signatures: Iterable[Dict], include_sequence: bool = True) -> Iterator[bytes]:
+    """
+    Encodes signatures as newline-delimited JSON, one line per signature,
+    as they are read from `signatures`.
+    """
+    fields = signature_fields(include_sequence)
+    for sig in signatures:
+        yield (json.dumps({name: sig.get(name) for name in fields}) + "\n").encode("utf-8")
+
+
+def iter_csv(signatures: Iterable[Dict], include_sequence: bool = True, delimiter: str = ",") -> Iterator[bytes]:
+    """
+    Encodes signatures as CSV (or TSV, with a tab `delimiter`) with a header
+    row. The header is produced before the first signature so a download
+    can start at once.
+    """
+    fields = signature_fields(include_sequence)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\n" if delimiter == "\t" else "\r\n")
+
+    def flush() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(fields)
+    yield flush()
+    for sig in signatures:
+        writer.writerow(["" if sig.get(name) is None else sig.get(name) for name in fields])
+        yield flush()
+
+
+def _table_batches(table: SignatureTable, fields: Tuple[str, ...]) -> Iterator[List[List]]:
+    """
+    Yields the values of `fields` for TABLE_BATCH_SIZE signatures of a
+    table at a time, one list per field, with None where a value is missing.
+    """
+    for offset in range(0, len(table), TABLE_BATCH_SIZE):
+        batch = table[offset:offset + TABLE_BATCH_SIZE]
+        count = len(batch)
+        columns = {
+            "sequence_id": [batch.sequence_ids[i] for i in batch.sequence_index.tolist()],
+            "start": batch.starts.tolist(),
+            "end": batch.ends.tolist(),
+            "length": batch.lengths.tolist(),
+        }
+        if "sequence" in fields:
+            columns["sequence"] = list(batch.iter_sequences())
+        if batch.has_contigs:
+            columns["contig_id"] = [batch.contig_ids[i] for i in batch.contig_index.tolist()]
+            columns["contig_start"] = batch.contig_starts.tolist()
+            columns["contig_end"] = batch.contig_ends.tolist()
+        yield [columns.get(name) or [None] * count for name in fields]
+
+
+def _json_encoder(name: str, encode: Callable[[str], str]) -> Callable:
+    if name in _INTEGER_FIELDS:
+        return lambda value: "null" if value is None else str(value)
+    return lambda value: "null" if value is None else encode(value)
+
+
+def _iter_table_json_rows(
+    table: SignatureTable, fields: Tuple[str, ...], separators: Tuple[str, str], ensure_ascii: bool
+) -> Iterator[List[str]]:
+    """
+    Yields the signatures of a table as JSON objects, a batch at a time.
+    Each value is encoded on its own and dropped into a row template, so no
+    dictionary or model is built per signature.
+    """
+    item_separator, key_separator = separators
+    encode = json.JSONEncoder(ensure_ascii=ensure_ascii).encode
+    template = "{{" + item_separator.join(f'{encode(name)}{key_separator}{{}}' for name in fields) + "}}"
+    encoders = [_json_encoder(name, encode) for name in fields]
+    for columns in _table_batches(table, fields):
+        encoded = [list(map(encoder, column)) for encoder, column in zip(encoders, columns)]
+        yield [template.format(*values) for values in zip(*encoded)]
+
+
+def iter_table_ndjson(table: SignatureTable, include_sequence: bool = True) -> Iterator[bytes]:
+    """`iter_ndjson` for a SignatureTable, encoded straight from its columns."""
+    fields = signature_fields(include_sequence)
+    for rows in _iter_table_json_rows(table, fields, (", ", ": "), ensure_ascii=True):
+        yield ("\n".join(rows) + "\n").encode("utf-8")
+
+
+def iter_table_csv(table: SignatureTable, include_sequence: bool = True, delimiter: str = ",") -> Iterator[bytes]:
+    """`iter_csv` for a SignatureTable, written a batch of rows at a time."""
+    fields = signature_fields(include_sequence)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\n" if delimiter == "\t" else "\r\n")
+
+    def flush() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(fields)
+    yield flush()
+    for columns in _table_batches(table, fields):
+        writer.writerows(zip(*(["" if value is None else value for value in column] for column in columns)))
+        yield flush()
+
+
+def iter_result_json(result: BaseModel, table: SignatureTable, include_sequence: bool = True) -> Iterator[bytes]:
+    """
+    Encodes a response model whose 'signatures' field is left empty, with
+    the signatures of `table` in its place, as the JSON FastAPI would send
+    for the model with every signature filled in. The signatures are never
+    validated as models, and are encoded a batch at a time.
+    """
+    fields = result.model_dump(mode="json")
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    if not include_sequence:
+        table = table.without_bases()
+    yield b"{"
+    for position, (name, value) in enumerate(fields.items()):
+        prefix = ("," if position else "") + encode(name) + ":"
+        if name != "signatures":
+            yield (prefix + encode(value)).encode("utf-8")
+            continue
+        yield (prefix + "[").encode("utf-8")
+        first = True
+        for rows in _iter_table_json_rows(table, SIGNATURE_FIELDS, (",", ":"), ensure_ascii=False):
+            yield (("" if first else ",") + ",".join(rows)).encode("utf-8")
+            first = False
+        yield b"]"
+    yield b"}"
+
+
+def export_signatures(signatures: Iterable[Dict], export_format: str, include_sequence: bool = True) -> Iterator[bytes]:
+    """
+    Encodes signatures in one of EXPORT_FORMATS. A SignatureTable is
+    encoded straight from its columns.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    table = isinstance(signatures, SignatureTable)
+    if export_format == "ndjson":
+        return iter_table_ndjson(signatures, include_sequence) if table else iter_ndjson(signatures, include_sequence)
+    if export_format in ("csv", "tsv"):
+        delimiter = "," if export_format == "csv" else "\t"
+        write = iter_table_csv if table else iter_csv
+        return write(signatures, include_sequence, delimiter=delimiter)
+    raise ValueError(f"Unknown format '{export_format}'. Choose one of: {', '.join(EXPORT_FORMATS)}.")
@@ -0,0 +1,121 @@
+import base64
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+from src import config
+
+
+@dataclass
+class StoredResult:
+    """
+    An analysis result kept on the server for paging. Its signatures are a
+    list of dictionaries or a SignatureTable, which slices into tables.
+    """
+    result_id: str
+    summary: str
+    signatures: Sequence[Dict]
+    stored_at: float
+
+
+class ResultStore:
+    """
+    Keeps recent analysis results in memory so clients can page through
+    their signatures instead of receiving them in one response.
+
+    At most `max_results` results are kept, the oldest being dropped first,
+    and each expires `ttl_seconds` after it was stored.
+
+    Pages are addressed by opaque cursors. A cursor encodes the result ID
+    and an offset, so fetching a page never rescans earlier signatures.
+    """
+
+    def __init__(self, max_results: int, ttl_seconds: float):
+        if max_results < 1:
+            raise ValueError("max_results must be at least 1.")
+        self.max_results = max_results
+        self.ttl_seconds = ttl_seconds
+        self._results: "OrderedDict[str, StoredResult]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, summary: str, signatures: Sequence[Dict], result_id: Optional[str] = None) -> str:
+        """
+        Stores a result and returns its ID. The signature list is kept as is, not copied.
+        """
+        result_id = result_id or uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            self._results.pop(result_id, None)
+            self._results[result_id] = StoredResult(result_id, summary, signatures, time.monotonic())
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return result_id
+
+    def get(self, result_id: str) -> StoredResult:
+        """
+        Raises:
+            KeyError: If no result with this ID is stored.
+        """
+        with self._lock:
+            self._prune()
+            return self._results[result_id]
+
+    def page(self, result_id: str, cursor: Optional[str] = None, limit: int = 1000) -> Tuple[StoredResult, Sequence[Dict], Optional[str]]:
+        """
+        Returns up to `limit` signatures of a stored result, starting at `cursor`.
+
+        Returns:
+            A tuple of the stored result, the signatures on this page, and the
+            cursor for the next page (None on the last page).
+
+        Raises:
+            KeyError: If no result with this ID is stored.
+            ValueError: If the cursor or limit is invalid.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1.")
+        result = self.get(result_id)
+        offset = self.decode_cursor(cursor, result_id) if cursor else 0
+        end = offset + limit
+        next_cursor = self.encode_cursor(result_id, end) if end < len(result.signatures) else None
+        return result, result.signatures[offset:end], next_cursor
+
+    @staticmethod
+    def encode_cursor(result_id: str, offset: int) -> str:
+        return base64.urlsafe_b64encode(f"{result_id}:{offset}".encode("ascii")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str, result_id: str) -> int:
+        """
+        Raises:
+            ValueError: If the cursor is malformed or belongs to another result.
+        """
+        try:
+            decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+            cursor_result_id, offset = decoded.rsplit(":", 1)
+            offset = int(offset)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError(f"Invalid cursor '{cursor}'.")
+        if cursor_result_id != result_id or offset < 0:
+            raise ValueError(f"Cursor '{cursor}' does not belong to result '{result_id}'.")
+        return offset
+
+    def _prune(self) -> None:
+        """Forgets expired results. Call with the lock held."""
+        now = time.monotonic()
+        expired = [
+            result_id for result_id, result in self._results.items()
+            if now - result.stored_at > self.ttl_seconds
+        ]
+        for result_id in expired:
+            del self._results[result_id]
+
+
+# The process-wide store of results available for paging.
+result_store = ResultStore(
+    max_results=config.RESULT_STORE_MAX_RESULTS,
+    ttl_seconds=config.RESULT_STORE_TTL_SECONDS,
+)
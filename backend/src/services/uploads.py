@@ -0,0 +1,220 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Optional
+
+from src import config
+from src.core.compressed_fasta import Decompressor, DecompressingReader, decompressor_for, open_stream
+
+# Characters allowed on FASTA sequence lines: IUPAC nucleotide and amino
+# acid letters in either case, gaps and stop codons.
+_SEQUENCE_CHARACTERS = bytes(range(ord("A"), ord("Z") + 1)) + bytes(range(ord("a"), ord("z") + 1)) + b"-*."
+_WHITESPACE = b" \t\r\v\f"
+
+
+class FastaValidationError(ValueError):
+    """Raised when an uploaded file is not valid FASTA."""
+
+
+class FastaStreamValidator:
+    """
+    Checks that a byte stream is FASTA while it is being read, chunk by chunk.
+
+    The stream must start with a '>' header line and every other line must
+    contain only sequence characters. Records and bases are counted on the
+    way. Only the kind of the current line is carried between chunks, so
+    arbitrarily long lines are never buffered.
+    """
+
+    def __init__(self, name: str = "upload"):
+        self.name = name
+        self.record_count = 0
+        self.base_count = 0
+        self._line_number = 1
+        # "header", "sequence", or None before the line's first non-blank byte.
+        self._line_kind: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Raises:
+            FastaValidationError: As soon as the stream is known not to be FASTA.
+        """
+        for i, fragment in enumerate(chunk.split(b"\n")):
+            if i > 0:
+                self._line_number += 1
+                self._line_kind = None
+            self._check_fragment(fragment)
+
+    def finish(self) -> None:
+        """
+        Checks that the stream held at least one record.
+
+        Raises:
+            FastaValidationError: If the stream was not valid FASTA.
+        """
+        if self.record_count == 0:
+            raise FastaValidationError(f"{self.name} contains no FASTA records.")
+
+    def _check_fragment(self, fragment: bytes) -> None:
+        if self._line_kind is None:
+            fragment = fragment.lstrip()
+            if not fragment:
+                return
+            if fragment.startswith(b">"):
+                self._line_kind = "header"
+                self.record_count += 1
+                return
+            if self.record_count == 0:
+                raise FastaValidationError(f"{self.name} is not a FASTA file: it must start with a '>' header line.")
+            self._line_kind = "sequence"
+
+        if self._line_kind == "sequence":
+            if fragment.translate(None, _SEQUENCE_CHARACTERS + _WHITESPACE):
+                raise FastaValidationError(f"{self.name} has invalid sequence characters on line {self._line_number}.")
+            self.base_count += len(fragment.translate(None, _WHITESPACE))
+
+
+class HashingReader:
+    """
+    Wraps a binary file object, hashing and validating everything read from it.
+
+    This lets an upload be parsed straight from the request stream, with no
+    temporary file, while still producing its content hash.
+
+    Gzip and BGZF uploads are detected from their first bytes. The hash is
+    that of the bytes as uploaded, and validation sees the inflated FASTA.
+    With `decompress`, reads return the inflated FASTA; otherwise they
+    return the uploaded bytes, inflated on the side only to validate them.
+    """
+
+    def __init__(self, stream: BinaryIO, name: str = "upload", decompress: bool = True):
+        self._stream = stream
+        self._hash = hashlib.sha256()
+        self.validator = FastaStreamValidator(name)
+        self.decompress = decompress
+        self.size = 0
+        # Bytes of FASTA once inflated; the same as `size` for uncompressed uploads.
+        self.uncompressed_size = 0
+        self.compressed = False
+        self._reader: Optional[BinaryIO] = None
+        self._decompressor: Optional[Decompressor] = None
+        self._finished = False
+
+    def _read_raw(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        if chunk:
+            self._hash.update(chunk)
+            self.size += len(chunk)
+        return chunk
+
+    def read(self, size: int = -1) -> bytes:
+        if self.decompress:
+            if self._reader is None:
+                self._reader = open_stream(_RawReader(self))
+                self.compressed = isinstance(self._reader, DecompressingReader)
+            chunk = fasta = self._reader.read(size)
+        else:
+            chunk = fasta = self._read_raw(size)
+            if chunk and self.size == len(chunk):
+                # The first chunk tells whether the upload is compressed.
+                self._decompressor = decompressor_for(chunk)
+                self.compressed = self._decompressor is not None
+            if self._decompressor is not None:
+                fasta = self._decompressor.decompress(chunk) if chunk else self._decompressor.flush()
+
+        if fasta:
+            self.validator.feed(fasta)
+            self.uncompressed_size += len(fasta)
+        if not chunk and not self._finished:
+            self._finished = True
+            if self._decompressor is not None:
+                self._decompressor.close()
+            if isinstance(self._reader, DecompressingReader):
+                self._reader.close()
+            self.validator.finish()
+        return chunk
+
+    def hexdigest(self) -> str:
+        """The SHA-256 of the bytes read so far (the whole file once read to the end)."""
+        return self._hash.hexdigest()
+
+
+class _RawReader:
+    """The uploaded bytes of a HashingReader, hashed as they are read."""
+
+    def __init__(self, reader: HashingReader):
+        self._reader = reader
+
+    def read(self, size: int = -1) -> bytes:
+        return self._reader._read_raw(size)
+
+
+@dataclass
+class StoredUpload:
+    """An uploaded file copied to local disk."""
+    path: str
+    sha256: str
+    size: int
+    record_count: int
+    # The size of the FASTA once inflated; `size` for uncompressed uploads.
+    uncompressed_size: int = 0
+    compressed: bool = False
+
+
+def save_upload(upload: BinaryIO, name: str = "upload", chunk_size: Optional[int] = None, suffix: str = ".fna") -> StoredUpload:
+    """
+    Copies an upload to a temporary file in fixed-size chunks, computing its
+    SHA-256 and validating it as FASTA in the same pass.
+
+    Gzip and BGZF uploads are stored as they are, compressed; they are only
+    inflated in memory to be validated.
+
+    The caller owns the returned file and must remove it.
+
+    Raises:
+        FastaValidationError: If the upload is not valid FASTA. No file is left behind.
+    """
+    reader = HashingReader(upload, name, decompress=False)
+    chunk_size = chunk_size or config.UPLOAD_CHUNK_SIZE
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        try:
+            while True:
+                chunk = reader.read(chunk_size)
+                if not chunk:
+                    break
+                tmp_file.write(chunk)
+        except Exception:
+            tmp_file.close()
+            os.remove(tmp_file.name)
+            raise
+
+    return StoredUpload(
+        path=tmp_file.name,
+        sha256=reader.hexdigest(),
+        size=reader.size,
+        record_count=reader.validator.record_count,
+        uncompressed_size=reader.uncompressed_size,
+        compressed=reader.compressed,
+    )
+
+
+def file_sha256(path: str, chunk_size: Optional[int] = None) -> str:
+    """Computes the SHA-256 hex digest of a file on disk, reading it in chunks."""
+    digest = hashlib.sha256()
+    chunk_size = chunk_size or config.UPLOAD_CHUNK_SIZE
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remove_uploads(paths: Iterable[str]) -> None:
+    """Deletes staged upload files, skipping any that are already gone."""
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,41 @@
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+from src import config
+from src.core.packed_signature_finder import worker_process_context
+
+
+class WorkerProcesses:
+    """
+    The one process pool the packed engines of every analysis in the API
+    process share, so a request does not start and stop its own workers.
+
+    The pool is started by `start` (at application startup) and only exists
+    with more than one worker. Until then `executor` is None, and finders
+    fall back to a pool of their own.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        return self._executor
+
+    def start(self) -> None:
+        with self._lock:
+            if self.workers > 1 and self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_process_context())
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# The process-wide pool of the packed engines' worker processes.
+worker_processes = WorkerProcesses(config.WORKERS)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from src.core.background_index import BackgroundIndex
+from src.core.packed_signature_finder import PackedSignatureFinder
+from src.core.signature_finder import SignatureFinder
+
+
+def test_compute_id_ignores_input_order():
+    first = BackgroundIndex.compute_id(["a" * 64, "b" * 64], 21, True)
+    second = BackgroundIndex.compute_id(["b" * 64, "a" * 64], 21, True)
+    assert first == second
+    assert first != BackgroundIndex.compute_id(["a" * 64, "b" * 64], 25, True)
+
+
+def test_saved_index_is_memory_mapped_and_matches_in_memory_results(tmp_path):
+    # Arrange
+    finder = PackedSignatureFinder(kmer_size=4)
+    background = {"b1": "AAACCCNNNNGGGTTT", "b2": "ACGTACGT"}
+    target = {"t1": "AAACCCTTTGGGNNNNAAAA"}
+    index_id = BackgroundIndex.compute_id(["c" * 64], 4, False)
+
+    # Act
+    index = BackgroundIndex.save(finder.build_background(background), str(tmp_path), index_id)
+    reopened = BackgroundIndex.open(str(tmp_path), index_id)
+    result = finder.find_unique_signatures_in_background(target, reopened)
+
+    # Assert
+    assert isinstance(reopened.codes, np.memmap)
+    assert reopened.kmer_size == 4
+    assert len(reopened) == len(index)
+    assert result == SignatureFinder(kmer_size=4).find_unique_signatures(target, background)
+    assert [m["index_id"] for m in BackgroundIndex.list_metadata(str(tmp_path))] == [index_id]
+
+
+def test_open_rejects_unknown_and_malformed_ids(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        BackgroundIndex.open(str(tmp_path), "d" * 64)
+    with pytest.raises(ValueError):
+        BackgroundIndex.open(str(tmp_path), "../etc")
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.core.packed_signature_finder import PackedSignatureFinder
+from src.core.regions import RegionFilter
+from src.services.batch_runner import BatchRunner, BatchTarget, discover_targets, read_manifest
+
+BACKGROUND = "ACGTACGTACGTACGTAAAACCCCGGGGTTTT"
+TARGETS = {
+    "alpha": "ACGTACGTGGATCCTTAGGCAAAACCCCATGCATGC",
+    "beta": "TTTTGGGGCCCCAAAACGTCGTCGATCGATCGAAT",
+}
+
+
+def write_fasta(path, records):
+    with open(path, "w") as f:
+        for header, sequence in records.items():
+            f.write(f">{header}\n{sequence}\n")
+    return str(path)
+
+
+def make_batch(tmp_path):
+    background = write_fasta(tmp_path / "background.fna", {"bg": BACKGROUND})
+    targets_dir = tmp_path / "targets"
+    targets_dir.mkdir()
+    for name, sequence in TARGETS.items():
+        write_fasta(targets_dir / f"{name}.fasta", {name: sequence})
+    (targets_dir / "notes.txt").write_text("not a genome")
+    return discover_targets(str(targets_dir), [background]), background
+
+
+def expected_signatures(sequence, name):
+    finder = PackedSignatureFinder(kmer_size=5)
+    background = finder.build_background({"bg": BACKGROUND})
+    return list(finder.iter_unique_signatures_in_background({name: sequence}, background))
+
+
+def test_discover_targets_and_read_manifest(tmp_path):
+    targets, background = make_batch(tmp_path)
+    assert [(t.name, os.path.basename(t.path)) for t in targets] == [("alpha", "alpha.fasta"), ("beta", "beta.fasta")]
+
+    manifest = tmp_path / "manifest.tsv"
+    manifest.write_text("# path\tname\tbackground\ntargets/alpha.fasta\n\ntargets/beta.fasta\tb\tother.fna,more.fna\n")
+    alpha, beta = read_manifest(str(manifest), [background])
+
+    assert (alpha.name, alpha.background_paths) == ("alpha", (os.path.abspath(background),))
+    assert beta.name == "b"
+    assert beta.background_paths == (str(tmp_path / "other.fna"), str(tmp_path / "more.fna"))
+
+
+def test_tsv_outputs_match_a_direct_analysis(tmp_path):
+    targets, _ = make_batch(tmp_path)
+    runner = BatchRunner(str(tmp_path / "out"), kmer_size=5, workers=1)
+
+    report = runner.run(targets)
+
+    assert report.completed == ["alpha", "beta"] and not report.failed
+    for name, sequence in TARGETS.items():
+        lines = (tmp_path / "out" / f"{name}.tsv").read_text().splitlines()
+        rows = [line.split("\t")[:3] for line in lines[1:]]
+        expected = expected_signatures(sequence, name)
+        assert rows == [[f">{name}", str(sig["start"]), str(sig["end"])] for sig in expected]
+
+
+def test_npz_output_holds_columns_and_bases(tmp_path):
+    targets, _ = make_batch(tmp_path)
+    runner = BatchRunner(
+        str(tmp_path / "out"), kmer_size=5, output_format="npz", include_sequence=True,
+        region_filter=RegionFilter(top_n=1), workers=1,
+    )
+
+    runner.run(targets[:1])
+
+    expected = max(expected_signatures(TARGETS["alpha"], "alpha"), key=lambda sig: sig["length"])
+    with np.load(tmp_path / "out" / "alpha.npz") as columns:
+        assert list(columns["sequence_ids"]) == [">alpha"]
+        assert (list(columns["start"]), list(columns["end"])) == ([expected["start"]], [expected["end"]])
+        assert bytes(columns["sequence_bases"]).decode() == expected["sequence"]
+
+
+def test_rerun_skips_finished_targets_until_an_input_changes(tmp_path):
+    targets, background = make_batch(tmp_path)
+    output_dir = str(tmp_path / "out")
+    BatchRunner(output_dir, kmer_size=5, workers=1).run(targets)
+
+    report = BatchRunner(output_dir, kmer_size=5, workers=1).run(targets)
+    assert (report.completed, report.skipped) == ([], ["alpha", "beta"])
+
+    write_fasta(targets[1].path, {"beta": TARGETS["beta"] + "GATTACA"})
+    report = BatchRunner(output_dir, kmer_size=5, workers=1).run(targets)
+    assert (report.completed, report.skipped) == (["beta"], ["alpha"])
+
+    report = BatchRunner(output_dir, kmer_size=6, workers=1).run(targets)
+    assert report.completed == ["alpha", "beta"]
+
+
+def test_a_failing_target_does_not_stop_the_batch(tmp_path):
+    targets, _ = make_batch(tmp_path)
+    os.remove(targets[0].path)
+
+    report = BatchRunner(str(tmp_path / "out"), kmer_size=5, workers=1).run(targets)
+
+    assert report.completed == ["beta"]
+    assert list(report.failed) == ["alpha"]
+    assert not os.path.exists(tmp_path / "out" / "alpha.tsv")
+
+
+@pytest.mark.parametrize("name", ["../alpha", "sub/alpha", "..", ".alpha"])
+def test_target_names_that_would_leave_the_output_directory_are_rejected(tmp_path, name):
+    targets, background = make_batch(tmp_path)
+    manifest = tmp_path / "manifest.tsv"
+    manifest.write_text(f"targets/alpha.fasta\t{name}\n")
+
+    with pytest.raises(ValueError):
+        read_manifest(str(manifest), [background])
+    with pytest.raises(ValueError):
+        BatchRunner(str(tmp_path / "out"), kmer_size=5).run([BatchTarget(name, targets[0].path, (background,))])
+    assert not os.path.exists(tmp_path / "out")
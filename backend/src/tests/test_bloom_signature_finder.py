@@ -0,0 +1,83 @@
+import random
+
+import numpy as np
+from src.core.background_index import BackgroundIndex
+from src.core.bloom_filter import BloomBackground, BloomFilter
+from src.core.bloom_signature_finder import BloomSignatureFinder
+from src.core.signature_finder import SignatureFinder
+
+
+def _random_genome(rng, length):
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+
+def test_bloom_filter_has_no_false_negatives_and_honours_the_rate():
+    # Arrange
+    rng = np.random.default_rng(7)
+    added = rng.integers(0, 2**62, 20_000, dtype=np.uint64)
+    others = rng.integers(2**62, 2**63, 20_000, dtype=np.uint64)
+    bloom = BloomFilter.for_capacity(len(added), false_positive_rate=0.01)
+
+    # Act
+    bloom.add_codes(added)
+
+    # Assert
+    assert bloom.contains_codes(added).all()
+    assert bloom.contains_codes(others).mean() < 0.02
+
+
+def test_memory_budget_caps_the_filter_size():
+    bloom = BloomFilter.for_capacity(10_000_000, false_positive_rate=0.001, max_bytes=4096)
+    assert bloom.size_bytes == 4096
+
+
+def test_reported_signatures_are_always_unique():
+    # Arrange: a tiny filter, so false positives are common.
+    rng = random.Random(3)
+    background = {"b1": _random_genome(rng, 2000)}
+    target = {"t1": background["b1"][:300] + _random_genome(rng, 400) + background["b1"][500:800]}
+    finder = BloomSignatureFinder(kmer_size=8, max_bytes=256)
+    exact = SignatureFinder(kmer_size=8).find_unique_signatures(target, background)
+
+    # Act
+    result = finder.find_unique_signatures(target, background)
+
+    # Assert
+    exact_bases = {i for sig in exact for i in range(sig['start'], sig['end'])}
+    assert all(i in exact_bases for sig in result for i in range(sig['start'], sig['end']))
+
+
+def test_exact_recheck_restores_the_exact_result():
+    # Arrange
+    rng = random.Random(5)
+    background = {"b1": _random_genome(rng, 3000), "b2": "ACGTNNNNACGT" * 5}
+    target = {
+        "t1": background["b1"][:400] + _random_genome(rng, 300) + background["b1"][900:1200],
+        "t2": _random_genome(rng, 200) + "NNNNACGT",
+    }
+    finder = BloomSignatureFinder(kmer_size=8, max_bytes=512, exact_recheck=True)
+
+    # Act
+    result = finder.find_unique_signatures(target, background)
+
+    # Assert
+    assert result == SignatureFinder(kmer_size=8).find_unique_signatures(target, background)
+
+
+def test_bloom_index_round_trips_through_disk(tmp_path):
+    # Arrange
+    finder = BloomSignatureFinder(kmer_size=5)
+    background = {"b1": "ACGTACGGTACCANNACGT"}
+    built = finder.build_background(background)
+    index_id = BackgroundIndex.compute_id(["e" * 64], 5, False, {"index_type": "bloom"})
+
+    # Act
+    BackgroundIndex.save_bloom(built, str(tmp_path), index_id, metadata={"genome_count": 1})
+    reopened = BackgroundIndex.open(str(tmp_path), index_id)
+
+    # Assert
+    assert isinstance(reopened, BloomBackground)
+    assert reopened.metadata["index_type"] == "bloom"
+    assert np.array_equal(reopened.bloom.bits, built.bloom.bits)
+    assert reopened.ambiguous_kmers == built.ambiguous_kmers
+    assert index_id != BackgroundIndex.compute_id(["e" * 64], 5, False)
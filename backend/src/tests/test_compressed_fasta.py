@@ -0,0 +1,79 @@
+import gzip
+import io
+import struct
+import zlib
+
+import pytest
+
+from src.core.compressed_fasta import BgzfDecompressor, is_bgzf, open_stream, uncompressed_size_hint
+from src.core.preprocessor import FastaPreprocessor
+from src.core.sequence_parser import SequenceParser
+
+FASTA = b"".join(b">contig_%d\n" % i + b"ACGTTGCA" * 40 + b"\nGGN\n" for i in range(50))
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+def bgzf(data, block_size=700):
+    """Compresses data as BGZF, as bgzip does, in blocks of `block_size` bytes."""
+    blocks = []
+    for start in range(0, len(data), block_size):
+        chunk = data[start:start + block_size]
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        payload = compressor.compress(chunk) + compressor.flush()
+        header = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+        blocks.append(
+            header + struct.pack("<H", len(header) + 2 + len(payload) + 8 - 1) + payload
+            + struct.pack("<II", zlib.crc32(chunk), len(chunk))
+        )
+    return b"".join(blocks) + BGZF_EOF
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bgzf, lambda data: gzip.compress(data[:1000]) + gzip.compress(data[1000:])])
+def test_parser_reads_compressed_files_like_plain_ones(tmp_path, compress):
+    # Arrange
+    path = tmp_path / "genome.fna.gz"
+    path.write_bytes(compress(FASTA))
+
+    # Act
+    records = SequenceParser(block_size=333).parse(path)
+
+    # Assert
+    assert records == SequenceParser().parse(io.BytesIO(FASTA))
+    assert len(records) == 50
+
+
+def test_bgzf_is_detected_and_inflated_in_parallel_in_order():
+    data = bgzf(FASTA)
+    decompressor = BgzfDecompressor(workers=4)
+
+    # Feed uneven chunks so blocks straddle chunk boundaries.
+    output = b"".join(decompressor.decompress(data[start:start + 1234]) for start in range(0, len(data), 1234))
+    output += decompressor.flush()
+    decompressor.close()
+
+    assert is_bgzf(data) and not is_bgzf(gzip.compress(FASTA))
+    assert output == FASTA
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bgzf])
+def test_truncated_input_is_an_error(compress):
+    stream = open_stream(io.BytesIO(compress(FASTA)[:-30]))
+
+    with pytest.raises(ValueError):
+        stream.read()
+
+
+def test_uncompressed_size_hint_and_preprocessor(tmp_path):
+    # Arrange
+    paths = {}
+    for name, content in [("plain.fna", FASTA), ("gzip.fna.gz", gzip.compress(FASTA)), ("bgzf.fna.gz", bgzf(FASTA))]:
+        paths[name] = tmp_path / name
+        paths[name].write_bytes(content)
+
+    # Act
+    hints = {name: uncompressed_size_hint(path) for name, path in paths.items()}
+    merged = FastaPreprocessor().merge_contigs(paths["bgzf.fna.gz"])
+
+    # Assert
+    assert set(hints.values()) == {len(FASTA)}
+    assert bytes(merged.sequence) == bytes(FastaPreprocessor().merge_contigs(paths["plain.fna"]).sequence)
@@ -0,0 +1,65 @@
+from src.core.instrumentation import NULL_INSTRUMENTATION, Instrumentation
+from src.core.packed_signature_finder import PackedSignatureFinder
+from src.services.metrics import MetricsRegistry
+
+
+def test_stages_accumulate_time_and_work_in_first_entered_order():
+    instrumentation = Instrumentation(track_memory=False)
+
+    with instrumentation.stage("parse"):
+        pass
+    with instrumentation.stage("scan"):
+        pass
+    with instrumentation.stage("parse"):
+        pass
+    instrumentation.add_work("scan", bases=100, kmers=80)
+    instrumentation.add_work("scan", bases=50, kmers=40)
+
+    parse, scan = instrumentation.records()
+    assert (parse.stage, parse.calls, scan.stage, scan.calls) == ("parse", 2, "scan", 1)
+    assert (scan.bases, scan.kmers) == (150, 120)
+    assert parse.bases_per_second is None
+
+
+def test_finder_records_scan_and_merge_once_per_target_without_changing_its_result():
+    finder = PackedSignatureFinder(kmer_size=4)
+    target = {"t": "ACGTACGTTTGCAAGG", "u": "TTGCAAGG", "v": ""}
+    background = finder.build_background({"b": "ACGTACGT"})
+    expected = list(finder.iter_unique_signatures_in_background(target, background))
+
+    finder.instrumentation = Instrumentation(track_memory=False)
+    signatures = list(finder.iter_unique_signatures_in_background(target, background))
+
+    assert signatures == expected
+    stages = {record.stage: record for record in finder.instrumentation.records()}
+    assert set(stages) == {"scan", "merge"}
+    assert (stages["scan"].calls, stages["merge"].calls) == (1, 1)
+    assert (stages["scan"].bases, stages["scan"].kmers) == (24, 18)
+
+
+def test_null_instrumentation_records_nothing():
+    with NULL_INSTRUMENTATION.stage("scan"):
+        NULL_INSTRUMENTATION.add_work("scan", bases=10)
+    with NULL_INSTRUMENTATION.stage_total("merge") as merge, merge:
+        merge.add_work(kmers=10)
+
+    assert NULL_INSTRUMENTATION.records() == []
+
+
+def test_registry_renders_prometheus_text():
+    instrumentation = Instrumentation(track_memory=False)
+    with instrumentation.stage("scan"):
+        pass
+    instrumentation.add_work("scan", bases=1000, kmers=980)
+    registry = MetricsRegistry(buckets=(1.0, 10.0))
+
+    registry.observe(instrumentation.records(), "packed")
+    registry.observe(instrumentation.records(), "packed")
+    text = registry.render({"isignify_result_cache_hits_total": ("Cache hits.", 3)})
+
+    assert 'isignify_analyses_total{engine="packed"} 2' in text
+    assert 'isignify_stage_duration_seconds_bucket{stage="scan",le="1.0"} 2' in text
+    assert 'isignify_stage_duration_seconds_bucket{stage="scan",le="+Inf"} 2' in text
+    assert 'isignify_stage_duration_seconds_count{stage="scan"} 2' in text
+    assert 'isignify_stage_bases_total{stage="scan"} 2000' in text
+    assert "# TYPE isignify_result_cache_hits_total counter\nisignify_result_cache_hits_total 3" in text
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+from src.services.job_manager import JobManager, QueueFullError
+
+STAGES = ("first", "second")
+
+
+def _wait(job, timeout=5):
+    """Blocks until a job that was started has finished."""
+    if not job._future.cancelled():
+        job._future.result(timeout=timeout)
+
+
+def test_job_runs_and_reports_progress():
+    # Arrange
+    manager = JobManager(max_workers=1, max_queued=1, retention_seconds=60)
+    release = threading.Event()
+
+    def work(progress):
+        progress("first", 0.5)
+        release.wait(5)
+        return "done"
+
+    # Act
+    job = manager.submit(work, stages=STAGES)
+    while job.stage is None:
+        pass
+    progress_while_running = job.progress
+    release.set()
+    _wait(job)
+
+    # Assert
+    assert progress_while_running == 0.25
+    assert job.status == "succeeded"
+    assert job.result == "done"
+    assert job.progress == 1.0
+
+
+def test_running_job_is_cancelled_at_next_progress_report():
+    # Arrange
+    manager = JobManager(max_workers=1, max_queued=1, retention_seconds=60)
+    started, release = threading.Event(), threading.Event()
+    finished = []
+
+    def work(progress):
+        started.set()
+        release.wait(5)
+        progress("second", 0.0)
+        return "should not finish"
+
+    # Act
+    job = manager.submit(work, stages=STAGES, on_finish=lambda: finished.append(True))
+    started.wait(5)
+    manager.cancel(job.job_id)
+    release.set()
+    _wait(job)
+
+    # Assert
+    assert job.status == "cancelled"
+    assert job.result is None
+    assert finished == [True]
+
+
+def test_queue_depth_is_enforced_and_failures_are_recorded():
+    # Arrange
+    manager = JobManager(max_workers=1, max_queued=1, retention_seconds=60)
+    release = threading.Event()
+
+    def blocked(progress):
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    # Act
+    running = manager.submit(blocked, stages=STAGES)
+    queued = manager.submit(blocked, stages=STAGES)
+    with pytest.raises(QueueFullError):
+        manager.submit(blocked, stages=STAGES)
+    manager.cancel(queued.job_id)
+    release.set()
+    _wait(running)
+
+    # Assert
+    assert queued.status == "cancelled"
+    assert running.status == "failed"
+    assert running.error == "boom"
@@ -0,0 +1,22 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.v1 import job_routes
+
+app = FastAPI()
+app.include_router(job_routes.router, prefix="/api/v1")
+client = TestClient(app)
+
+
+def test_a_job_with_an_upload_that_is_not_fasta_is_rejected():
+    response = client.post(
+        "/api/v1/jobs/",
+        data={"kmer_size": 5, "run_preprocessor": "false", "use_llm": "false"},
+        files=[
+            ("target_genome", ("target.fna", b"this is not a genome\n")),
+            ("background_genomes", ("background.fna", b">bg\nACGTACGT\n")),
+        ],
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"]
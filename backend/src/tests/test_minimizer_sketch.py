@@ -0,0 +1,108 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.core.background_index import BackgroundIndex
+from src.core.kmer_codec import kmer_codes
+from src.core.minimizer_sketch import MinimizerSketch, minimizer_positions
+from src.core.packed_signature_finder import PackedSignatureFinder
+from src.core.signature_finder import SignatureFinder
+
+
+def random_dna(rng, length):
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+
+def mutate(rng, sequence, rate):
+    return "".join(rng.choice("ACGTN") if rng.random() < rate else base for base in sequence)
+
+
+def test_every_window_has_a_minimizer_and_shared_stretches_share_them():
+    rng = random.Random(3)
+    stretch = random_dna(rng, 300)
+    first, second = random_dna(rng, 50) + stretch, random_dna(rng, 80) + stretch
+    window = 8
+
+    positions = {}
+    for name, sequence in (("first", first), ("second", second)):
+        codes, valid = kmer_codes(sequence, 11)
+        positions[name] = minimizer_positions(codes, valid, window)
+        assert np.all(np.diff(positions[name]) <= window)
+
+    # Away from its edges, the shared stretch has the same minimizers in both.
+    inner = lambda found, offset: {p - offset for p in found.tolist() if offset + window <= p < offset + 280}
+    assert inner(positions["first"], 50) == inner(positions["second"], 80)
+
+
+def test_shared_windows_only_marks_windows_in_the_background():
+    rng = random.Random(5)
+    target = random_dna(rng, 2000)
+    background = [mutate(rng, target[100:1500], 0.01), random_dna(rng, 500)]
+    sketch = MinimizerSketch.build(background, kmer_size=15, window=10)
+
+    shared = sketch.shared_windows(target)
+
+    kmers = {seq[i:i + 15] for seq in background for i in range(len(seq) - 14)}
+    assert all(target[i:i + 15] in kmers for i in np.flatnonzero(shared).tolist())
+    # Most of the conserved part is proven shared.
+    assert shared.sum() > 0.6 * sum(target[i:i + 15] in kmers for i in range(len(target) - 14))
+
+
+def test_matches_are_not_extended_across_background_sequences():
+    rng = random.Random(7)
+    left, right = random_dna(rng, 200), random_dna(rng, 200)
+    sketch = MinimizerSketch.build([left, right], kmer_size=9, window=4)
+
+    shared = sketch.shared_windows(left[-100:] + right[:100])
+
+    # The 8 windows spanning the junction are in neither sequence.
+    assert not shared[92:100].any()
+    assert shared[:92].all() and shared[100:].all()
+
+
+@pytest.mark.parametrize("kmer_size", [5, 21, 32])
+@pytest.mark.parametrize("engine", [SignatureFinder, PackedSignatureFinder])
+def test_prefiltered_scan_finds_the_same_signatures(engine, kmer_size):
+    rng = random.Random(kmer_size)
+    target = {"chr": random_dna(rng, 3000), "plasmid": "acgtNN" + random_dna(rng, 400)}
+    background = {
+        "a": mutate(rng, target["chr"][:2500], 0.01),
+        "b": mutate(rng, target["plasmid"], 0.02) + random_dna(rng, 100),
+    }
+    expected = engine(kmer_size).find_unique_signatures(target, background)
+
+    finder = engine(kmer_size, sketch_window=12)
+    kmers = finder.build_background(background)
+
+    assert kmers.sketch is not None
+    assert finder.find_unique_signatures_in_background(target, kmers) == expected
+
+
+def test_background_index_keeps_its_sketch(tmp_path):
+    rng = random.Random(11)
+    target = {"t": random_dna(rng, 1500)}
+    background = {"b": mutate(rng, target["t"], 0.01)}
+    finder = PackedSignatureFinder(kmer_size=13, sketch_window=10)
+    expected = finder.find_unique_signatures(target, background)
+
+    index = BackgroundIndex.save(finder.build_background(background), str(tmp_path), "a" * 64)
+
+    assert index.metadata["sketch_window"] == 10
+    assert isinstance(index.sketch.bases, np.memmap)
+    assert finder.find_unique_signatures_in_background(target, index) == expected
+
+
+def test_a_sketch_can_be_added_to_an_existing_index(tmp_path):
+    rng = random.Random(13)
+    target = {"t": random_dna(rng, 1500)}
+    background = {"b": mutate(rng, target["t"], 0.01)}
+    finder = PackedSignatureFinder(kmer_size=13)
+    index = BackgroundIndex.save(finder.build_background(background), str(tmp_path), "b" * 64)
+    assert index.sketch is None
+
+    index.add_sketch(MinimizerSketch.build(background.values(), kmer_size=13, window=10))
+
+    reopened = BackgroundIndex.open(str(tmp_path), "b" * 64)
+    assert reopened.metadata["sketch_window"] == 10 and reopened.sketch is not None
+    assert finder.find_unique_signatures_in_background(target, reopened) == finder.find_unique_signatures(target, background)
@@ -0,0 +1,63 @@
+import sys
+import time
+import types
+
+import pytest
+from src.services.model_manager import SummaryModelManager
+
+
+@pytest.fixture
+def fake_transformers(monkeypatch):
+    """Installs stand-in torch/transformers modules that count model loads."""
+    loads = []
+
+    class FakeTokenizer:
+        def __call__(self, prompt, return_tensors):
+            return {"prompt": prompt}
+
+        def decode(self, response, skip_special_tokens):
+            return response
+
+    class FakeModel:
+        def generate(self, prompt, max_new_tokens):
+            return [prompt + " Answer: Done."]
+
+    transformers = types.ModuleType("transformers")
+    transformers.AutoTokenizer = types.SimpleNamespace(from_pretrained=lambda name: FakeTokenizer())
+    transformers.AutoModelForCausalLM = types.SimpleNamespace(
+        from_pretrained=lambda name, **kwargs: loads.append(name) or FakeModel()
+    )
+    torch = types.ModuleType("torch")
+    torch.bfloat16 = "bfloat16"
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    return loads
+
+
+def test_model_is_loaded_once_and_reused(fake_transformers):
+    manager = SummaryModelManager("fake-model")
+
+    first = manager.generate("Hello.")
+    second = manager.generate("Again.")
+
+    assert first == "Hello. Answer: Done."
+    assert second == "Again. Answer: Done."
+    assert fake_transformers == ["fake-model"]
+
+
+def test_idle_model_is_unloaded(fake_transformers):
+    manager = SummaryModelManager("fake-model", idle_unload_seconds=0.05)
+
+    manager.generate("Hello.")
+    assert manager.is_loaded
+    time.sleep(0.3)
+
+    assert not manager.is_loaded
+
+
+def test_disabled_manager_never_loads(fake_transformers):
+    manager = SummaryModelManager("fake-model", enabled=False)
+
+    with pytest.raises(RuntimeError):
+        manager.generate("Hello.")
+    assert fake_transformers == []
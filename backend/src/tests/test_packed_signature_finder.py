@@ -0,0 +1,113 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from src.core.kmer_codec import decode_kmer, kmer_codes
+from src.core.packed_signature_finder import PackedSignatureFinder, merge_sorted_unique, worker_process_context
+from src.core.signature_finder import SignatureFinder
+
+
+def test_kmer_codes_round_trip():
+    codes, valid = kmer_codes("AGCTNAG", 3)
+    assert valid.tolist() == [True, True, False, False, False]
+    assert decode_kmer(int(codes[0]), 3) == "AGC"
+    assert decode_kmer(int(codes[1]), 3) == "GCT"
+
+
+def test_packed_finder_rejects_large_kmer_size():
+    with pytest.raises(ValueError):
+        PackedSignatureFinder(kmer_size=33)
+
+
+def test_find_unique_signatures_simple_case():
+    # Arrange
+    finder = PackedSignatureFinder(kmer_size=3)
+    target = {"t1": "AAATTTGGGCCC"}
+    background = {"b1": "AAACCC"}
+    expected_output = [{
+        'sequence_id': 't1',
+        'start': 1,
+        'end': 11,
+        'length': 10,
+        'sequence': 'AATTTGGGCC'
+    }]
+
+    # Act
+    result = finder.find_unique_signatures(target, background)
+
+    # Assert
+    assert result == expected_output
+
+
+def test_find_unique_signatures_none_found():
+    finder = PackedSignatureFinder(kmer_size=5)
+    result = finder.find_unique_signatures({"t1": "GATTACA"}, {"b1": "GATTACA"})
+    assert result == []
+
+
+@pytest.mark.parametrize("kmer_size", [1, 4, 7, 32])
+def test_matches_set_engine_on_random_sequences(kmer_size):
+    """
+    The packed engine must return exactly what the string-set engine returns,
+    including for windows containing N and lower-case bases.
+    """
+    # Arrange
+    rng = random.Random(kmer_size)
+    alphabet = "ACGT" * 6 + "Na"
+    background_seq = "".join(rng.choice(alphabet) for _ in range(400))
+    target_seq = background_seq[50:250] + "".join(rng.choice(alphabet) for _ in range(200))
+    target = {"t1": target_seq, "t2": "NNNN" + background_seq[:60]}
+    background = {"b1": background_seq, "b2": "NNNNNNNN"}
+
+    # Act
+    expected = SignatureFinder(kmer_size).find_unique_signatures(target, background)
+    result = PackedSignatureFinder(kmer_size).find_unique_signatures(target, background)
+
+    # Assert
+    assert result == expected
+    assert all(type(sig['start']) is int for sig in result)
+
+
+def test_merge_sorted_unique_unions_sorted_parts():
+    parts = [np.array([1, 4, 9], dtype=np.uint64), np.array([2, 4, 10], dtype=np.uint64)]
+    assert merge_sorted_unique(parts).tolist() == [1, 2, 4, 9, 10]
+
+
+def test_parallel_mode_matches_serial_across_chunk_boundaries():
+    """
+    Small chunks force unique regions to span several worker tasks; they must
+    still be merged into the same regions as a single-process scan.
+    """
+    # Arrange
+    rng = random.Random(7)
+    background_seq = "".join(rng.choice("ACGT") for _ in range(3000))
+    target_seq = background_seq[:500] + "".join(rng.choice("ACGTN") for _ in range(700)) + background_seq[1000:1600]
+    target = {"t1": target_seq}
+    background = {"b1": background_seq, "b2": background_seq[::-1]}
+
+    # Act
+    expected = PackedSignatureFinder(kmer_size=9).find_unique_signatures(target, background)
+    result = PackedSignatureFinder(kmer_size=9, workers=2, chunk_size=97).find_unique_signatures(target, background)
+
+    # Assert
+    assert len(expected) > 0
+    assert result == expected
+
+
+def test_finders_share_a_long_lived_pool_and_clean_up_their_spilled_backgrounds():
+    rng = random.Random(8)
+    background_seq = "".join(rng.choice("ACGT") for _ in range(2000))
+    target = {"t1": background_seq[:400] + "".join(rng.choice("ACGT") for _ in range(600))}
+    expected = PackedSignatureFinder(kmer_size=9).find_unique_signatures(target, {"b": background_seq})
+
+    with ProcessPoolExecutor(max_workers=2, mp_context=worker_process_context()) as executor:
+        for _ in range(2):
+            finder = PackedSignatureFinder(kmer_size=9, workers=2, chunk_size=97, executor=executor)
+            background = finder.build_background({"b": background_seq})
+            with finder.worker_pool():
+                assert finder.find_unique_signatures_in_background(target, background) == expected
+                spilled_path = background.spilled_path
+                assert os.path.exists(spilled_path)
+            assert background.spilled_path is None and not os.path.exists(spilled_path)
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+from src.core.panel_signature_finder import PanelSignatureFinder
+from src.core.signature_finder import SignatureFinder
+
+
+def _random_genome(rng, length):
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+
+def _panel():
+    rng = random.Random(11)
+    shared = _random_genome(rng, 200)
+    pair = _random_genome(rng, 150)
+    return {
+        "bsub": {"c1": shared + pair + _random_genome(rng, 100), "c2": "ACGTNNNNACGTAC"},
+        "bamy": {"c1": _random_genome(rng, 80) + pair + shared[:120]},
+        "bpum": {"c1": shared[50:] + _random_genome(rng, 120)},
+    }
+
+
+def test_unique_signatures_match_one_analysis_per_genome():
+    # Arrange
+    panel = _panel()
+    finder = PanelSignatureFinder(kmer_size=9)
+
+    # Act
+    table = finder.build_table((name, sequences.values()) for name, sequences in panel.items())
+
+    # Assert
+    for name, sequences in panel.items():
+        background = {
+            (other, key): seq
+            for other, other_sequences in panel.items() if other != name
+            for key, seq in other_sequences.items()
+        }
+        expected = SignatureFinder(kmer_size=9).find_unique_signatures(sequences, background)
+        assert list(finder.iter_panel_signatures(table, name, sequences)) == expected
+
+
+def test_group_signatures_are_shared_by_the_group_only():
+    # Arrange
+    panel = _panel()
+    finder = PanelSignatureFinder(kmer_size=9)
+    table = finder.build_table((name, sequences.values()) for name, sequences in panel.items())
+
+    # Act
+    result = list(finder.iter_panel_signatures(table, "bamy", panel["bamy"], group=["bsub", "bamy"]))
+
+    # Assert
+    assert result
+    for sig in result:
+        assert sig['sequence'] in panel["bsub"]["c1"]
+        assert all(sig['sequence'][:9] not in seq for seq in panel["bpum"].values())
+
+
+def test_unknown_group_member_and_repeated_names_are_rejected():
+    finder = PanelSignatureFinder(kmer_size=4)
+    table = finder.build_table([("a", ["ACGTACGT"]), ("b", ["TTTTACGT"])])
+    with pytest.raises(ValueError):
+        table.group_mask(["a", "c"])
+    with pytest.raises(ValueError):
+        finder.build_table([("a", ["ACGT"]), ("a", ["ACGT"])])
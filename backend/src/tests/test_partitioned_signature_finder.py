@@ -0,0 +1,55 @@
+import os
+import random
+
+import pytest
+from src.core.partitioned_signature_finder import MAX_BUCKETS, PartitionedSignatureFinder
+from src.core.signature_finder import SignatureFinder
+
+
+def _random_genome(rng, length):
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+
+def test_partitioned_engine_matches_the_set_engine_across_many_buckets():
+    # Arrange: a tiny memory limit forces many buckets and many small chunks.
+    rng = random.Random(11)
+    background = {"b1": _random_genome(rng, 5000), "b2": "ACGTNNNNACGT" * 20 + _random_genome(rng, 1000)}
+    target = {
+        "t1": background["b1"][:600] + _random_genome(rng, 500) + background["b1"][2000:2600],
+        "t2": _random_genome(rng, 300) + "NNNNACGT" + background["b2"][:200],
+        "t3": "ACG",
+    }
+    finder = PartitionedSignatureFinder(kmer_size=9, memory_limit_bytes=4096)
+
+    # Act
+    background_partitions = finder.build_background(background)
+    result = finder.find_unique_signatures_in_background(target, background_partitions)
+
+    # Assert
+    assert background_partitions.bucket_count > 1
+    assert background_partitions.ambiguous_count > 0
+    assert any(
+        os.path.exists(background_partitions.ambiguous_bucket_path(bucket))
+        for bucket in range(background_partitions.bucket_count)
+    )
+    assert result == SignatureFinder(kmer_size=9).find_unique_signatures(target, background)
+
+
+def test_bucket_files_are_removed_on_close():
+    finder = PartitionedSignatureFinder(kmer_size=5, memory_limit_bytes=1024)
+    background = finder.build_background({"b1": "ACGTACGTTTGACCA" * 10})
+    assert os.path.isdir(background.directory)
+
+    background.close()
+
+    assert not os.path.exists(background.directory)
+
+
+def test_a_background_too_large_for_the_bucket_cap_is_refused(tmp_path):
+    finder = PartitionedSignatureFinder(kmer_size=9, memory_limit_bytes=4096, work_dir=str(tmp_path))
+    expected_kmers = (MAX_BUCKETS + 1) * 2048 // 24
+
+    with pytest.raises(ValueError):
+        finder.build_partitions(iter([]), expected_kmers)
+    assert finder.bucket_count_for(MAX_BUCKETS * 2048 // 24) == MAX_BUCKETS
+    assert os.listdir(tmp_path) == []
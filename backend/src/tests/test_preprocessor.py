@@ -1,6 +1,7 @@
 import pytest
 import os
 from src.core.preprocessor import FastaPreprocessor
+from src.core.signature_finder import SignatureFinder
 from Bio import SeqIO
 
 @pytest.fixture
@@ -72,4 +73,48 @@ def test_preprocessor_on_multi_contig_file(fasta_files):
     finally:
         # Clean up the temporary file created by the preprocessor
         if processed_path != input_path:
-            os.remove(processed_path)
\ No newline at end of file
+            os.remove(processed_path)
+
+def test_merge_contigs_builds_offset_table(fasta_files):
+    """
+    Tests that merge_contigs returns the merged sequence in memory with the
+    position of every contig, without writing a new file.
+    """
+    # Arrange
+    preprocessor = FastaPreprocessor()
+
+    # Act
+    genome = preprocessor.merge_contigs(fasta_files["multi"])
+
+    # Assert
+    assert genome.header == ">contig1"
+    assert bytes(genome.sequence) == b"AAAA" + b"N" * 100 + b"CCCC" + b"N" * 100 + b"GGGG"
+    assert [(c.header, c.start, c.end) for c in genome.contigs] == [
+        (">contig1", 0, 4), (">contig2", 104, 108), (">contig3", 208, 212)
+    ]
+    assert [bytes(v) for v in genome.contig_sequences().values()] == [b"AAAA", b"CCCC", b"GGGG"]
+
+
+def test_signatures_never_span_spacers_and_report_both_coordinates(tmp_path):
+    """
+    Tests that signatures found in the contig views map back to merged and
+    per-contig coordinates, and that no k-mer overlaps a spacer.
+    """
+    # Arrange
+    path = tmp_path / "target.fna"
+    path.write_text(">c1\nACGTACGTTT\n>c2\nGGGCCCAAAT\n")
+    genome = FastaPreprocessor().merge_contigs(path)
+    finder = SignatureFinder(kmer_size=4)
+
+    # Act
+    signatures = genome.to_merged_signatures(
+        finder.find_unique_signatures(genome.contig_sequences(), {"b1": "ACGTACG"})
+    )
+
+    # Assert
+    assert [(s['contig_id'], s['contig_start'], s['contig_end'], s['start'], s['end']) for s in signatures] == [
+        (">c1", 5, 10, 5, 10),
+        (">c2", 0, 10, 110, 120),
+    ]
+    assert all('N' not in s['sequence'] for s in signatures)
+    assert all(s['sequence_id'] == ">c1" for s in signatures)
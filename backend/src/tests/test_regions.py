@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.core.packed_signature_finder import PackedSignatureFinder
+from src.core.regions import RegionFilter, index_runs, longest_signatures
+from src.core.signature_finder import SignatureFinder
+
+
+def _gc(sequence):
+    return sum(base in "GCgc" for base in sequence) / len(sequence)
+
+
+def test_index_runs_finds_first_and_last_index_of_each_run():
+    starts, lasts = index_runs([2, 3, 4, 7, 9, 10])
+
+    assert starts.tolist() == [2, 7, 9]
+    assert lasts.tolist() == [4, 7, 10]
+    assert [len(runs) for runs in index_runs([])] == [0, 0]
+
+
+def test_filter_matches_filtering_the_formatted_signatures():
+    # Arrange: random regions of a random sequence with a few Ns.
+    rng = np.random.default_rng(3)
+    sequence = "".join(rng.choice(list("ACGTACGTN"), 2000))
+    starts = np.sort(rng.choice(1900, 60, replace=False)).astype(np.int64)
+    ends = starts + rng.integers(5, 100, 60)
+    region_filter = RegionFilter(min_length=20, max_length=90, min_gc=0.3, max_gc=0.6, max_ambiguous_fraction=0.15)
+
+    # Act
+    kept_starts, kept_ends = region_filter.select(starts, ends, sequence.encode())
+
+    # Assert
+    expected = [
+        (start, end) for start, end in zip(starts.tolist(), ends.tolist())
+        if 20 <= end - start <= 90
+        and 0.3 <= _gc(sequence[start:end]) <= 0.6
+        and sum(base not in "ACGTacgt" for base in sequence[start:end]) / (end - start) <= 0.15
+    ]
+    assert list(zip(kept_starts.tolist(), kept_ends.tolist())) == expected
+    assert 0 < len(expected) < len(starts)
+
+
+def test_top_n_keeps_the_longest_regions_in_target_order():
+    starts = np.array([0, 10, 20, 30, 40])
+    ends = np.array([5, 18, 25, 38, 43])
+
+    kept_starts, _ = RegionFilter(top_n=3).select(starts, ends, "A" * 50)
+
+    # Lengths are 5, 8, 5, 8, 3: the two 8s and the earlier of the 5s.
+    assert kept_starts.tolist() == [0, 10, 30]
+
+
+def test_longest_signatures_selects_across_sequences():
+    signatures = [{'sequence_id': sid, 'length': length} for sid, length in [("a", 4), ("a", 9), ("b", 7), ("b", 9)]]
+
+    assert longest_signatures(signatures, 2) == [signatures[1], signatures[3]]
+
+
+@pytest.mark.parametrize("options", [
+    {"min_length": 0}, {"min_gc": 1.5}, {"min_length": 10, "max_length": 5}, {"min_gc": 0.7, "max_gc": 0.2},
+])
+def test_invalid_filters_are_rejected(options):
+    with pytest.raises(ValueError):
+        RegionFilter(**options)
+
+
+@pytest.mark.parametrize("finder_class", [SignatureFinder, PackedSignatureFinder])
+def test_finder_drops_filtered_regions_before_formatting(finder_class):
+    finder = finder_class(kmer_size=4)
+    target = {"t": "ACGTACGTTTGCAAGGCCCGGGATATATATCGCG"}
+    background = finder.build_background({"b": "ACGTACGTGCAAATAT"})
+    unfiltered = finder.find_unique_signatures_in_background(target, background)
+
+    finder.region_filter = RegionFilter(min_length=6, min_gc=0.5)
+    filtered = finder.find_unique_signatures_in_background(target, background)
+
+    assert filtered == [sig for sig in unfiltered if sig['length'] >= 6 and _gc(sig['sequence']) >= 0.5]
+    assert 0 < len(filtered) < len(unfiltered)
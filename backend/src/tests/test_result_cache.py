@@ -0,0 +1,50 @@
+from src.services.result_cache import ResultCache
+
+
+def _signatures(count, length=100):
+    return [{'sequence_id': 's', 'start': i, 'end': i + length, 'length': length, 'sequence': "A" * length} for i in range(count)]
+
+
+def test_key_ignores_background_order_but_not_settings():
+    key = ResultCache.compute_key("t", ["b1", "b2"], 21, False)
+
+    assert key == ResultCache.compute_key("t", ["b2", "b1"], 21, False)
+    assert key != ResultCache.compute_key("t", ["b1", "b2"], 22, False)
+    assert key != ResultCache.compute_key("t", ["b1", "b2"], 21, True)
+    assert key != ResultCache.compute_key("t", ["b1", "b2"], 21, False, {"use_llm": True})
+
+
+def test_hits_misses_and_least_recently_used_eviction():
+    # Arrange: room for two of the three results.
+    cache = ResultCache(max_bytes=2 * (400 + 100) * 10 + 100)
+    keys = [ResultCache.compute_key(f"t{i}", [], 21, False) for i in range(3)]
+    cache.put(keys[0], "first", _signatures(10))
+    cache.put(keys[1], "second", _signatures(10))
+
+    # Act
+    assert cache.get(keys[0]).summary == "first"  # keys[1] is now the least recently used
+    cache.put(keys[2], "third", _signatures(10))
+
+    # Assert
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]).summary == "third"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_disk_tier_survives_a_new_cache_and_honours_its_size(tmp_path):
+    # Arrange
+    key = ResultCache.compute_key("t", ["b"], 21, False)
+    ResultCache(max_bytes=1 << 20, disk_dir=str(tmp_path), disk_max_bytes=1 << 20).put(key, "summary", _signatures(3))
+
+    # Act
+    cache = ResultCache(max_bytes=1 << 20, disk_dir=str(tmp_path), disk_max_bytes=1 << 20)
+    result = cache.get(key)
+
+    # Assert
+    assert result.signatures == _signatures(3)
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_entries"] == 1
+
+    small = ResultCache(max_bytes=1 << 20, disk_dir=str(tmp_path), disk_max_bytes=10)
+    small.put(ResultCache.compute_key("t2", ["b"], 21, False), "other", _signatures(3))
+    assert small.stats()["disk_entries"] == 0
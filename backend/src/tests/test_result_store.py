@@ -0,0 +1,71 @@
+import json
+
+import pytest
+from src.services.result_export import export_signatures
+from src.services.result_store import ResultStore
+
+SIGNATURES = [
+    {"sequence_id": "t1", "start": i * 10, "end": i * 10 + 5, "length": 5, "sequence": "ACGTA"}
+    for i in range(5)
+]
+
+
+def test_pages_follow_cursors_to_the_end():
+    # Arrange
+    store = ResultStore(max_results=2, ttl_seconds=60)
+    result_id = store.put("summary", SIGNATURES)
+
+    # Act
+    pages, cursor = [], None
+    while True:
+        _, page, cursor = store.page(result_id, cursor, limit=2)
+        pages.append(page)
+        if cursor is None:
+            break
+
+    # Assert
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [sig for page in pages for sig in page] == SIGNATURES
+
+
+def test_cursor_of_another_result_is_rejected():
+    # Arrange
+    store = ResultStore(max_results=2, ttl_seconds=60)
+    first = store.put("summary", SIGNATURES)
+    second = store.put("summary", SIGNATURES)
+    _, _, cursor = store.page(first, limit=2)
+
+    # Act / Assert
+    with pytest.raises(ValueError):
+        store.page(second, cursor)
+    with pytest.raises(ValueError):
+        store.page(first, "not-a-cursor")
+
+
+def test_oldest_result_is_evicted():
+    # Arrange
+    store = ResultStore(max_results=1, ttl_seconds=60)
+    first = store.put("summary", SIGNATURES)
+
+    # Act
+    store.put("summary", SIGNATURES)
+
+    # Assert
+    with pytest.raises(KeyError):
+        store.get(first)
+
+
+def test_export_writes_ndjson_and_csv_without_sequence():
+    # Act
+    ndjson = b"".join(export_signatures(SIGNATURES[:2], "ndjson", include_sequence=False))
+    csv = b"".join(export_signatures(SIGNATURES[:2], "csv", include_sequence=False))
+
+    # Assert
+    records = [json.loads(line) for line in ndjson.splitlines()]
+    assert records[0] == {"sequence_id": "t1", "start": 0, "end": 5, "length": 5,
+                          "contig_id": None, "contig_start": None, "contig_end": None}
+    assert csv.decode().splitlines() == [
+        "sequence_id,start,end,length,contig_id,contig_start,contig_end",
+        "t1,0,5,5,,,",
+        "t1,10,15,5,,,",
+    ]
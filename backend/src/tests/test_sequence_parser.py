@@ -50,4 +50,62 @@ def test_parse_nonexistent_file():
     result = parser.parse("nonexistent/path/to/file.fna")
 
     # Assert
-    assert result == {}
\ No newline at end of file
+    assert result == {}
+
+def test_iter_records_streams_records_in_order(fasta_file):
+    """
+    Tests that iter_records yields the same records as parse, one at a time,
+    even when lines are split across read blocks.
+    """
+    # Arrange
+    parser = SequenceParser(block_size=5)
+
+    # Act
+    records = list(parser.iter_records(fasta_file))
+
+    # Assert
+    assert records == list(SequenceParser().parse(fasta_file).items())
+
+
+def test_parse_bytes_and_array_output(tmp_path):
+    """
+    Tests that sequences can be returned as bytes or as a NumPy uint8 view,
+    and that Windows line endings are handled.
+    """
+    # Arrange
+    p = tmp_path / "crlf.fna"
+    p.write_bytes(b">seq1\r\nGATT\r\nACA\r\n")
+    parser = SequenceParser()
+
+    # Act
+    as_bytes = parser.parse(p, output="bytes")
+    as_array = parser.parse(p, output="array")
+
+    # Assert
+    assert as_bytes == {">seq1": b"GATTACA"}
+    assert as_array[">seq1"].dtype.name == "uint8"
+    assert as_array[">seq1"].tobytes() == b"GATTACA"
+
+
+def test_parse_accepts_binary_file_object(fasta_file):
+    parser = SequenceParser()
+    with open(fasta_file, "rb") as f:
+        result = parser.parse(f)
+    assert result[">seq2 another sequence"] == "AGCTAGCT"
+
+
+def test_parse_long_single_line_sequence_across_blocks(tmp_path):
+    """
+    Tests that a sequence line much longer than the read block is parsed
+    correctly without being carried over from block to block.
+    """
+    # Arrange
+    p = tmp_path / "long.fna"
+    p.write_bytes(b">long\n" + b"ACGT" * 50 + b"  \n>next\nGG\n")
+    parser = SequenceParser(block_size=7)
+
+    # Act
+    result = parser.parse(p)
+
+    # Assert
+    assert result == {">long": "ACGT" * 50, ">next": "GG"}
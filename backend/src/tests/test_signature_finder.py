@@ -67,4 +67,16 @@ def test_find_unique_signatures_none_found():
     target = {"t1": "GATTACA"}
     background = {"b1": "GATTACA"}
     result = finder.find_unique_signatures(target, background)
-    assert result == []
\ No newline at end of file
+    assert result == []
+
+def test_iter_unique_signatures_can_leave_out_the_sequence():
+    # Arrange
+    finder = SignatureFinder(kmer_size=3)
+    target = {"t1": "AAATTTGGGCCC"}
+    background = finder.build_background({"b1": "AAACCC"})
+
+    # Act
+    result = list(finder.iter_unique_signatures_in_background(target, background, include_sequence=False))
+
+    # Assert
+    assert result == [{'sequence_id': 't1', 'start': 1, 'end': 11, 'length': 10, 'sequence': None}]
@@ -0,0 +1,88 @@
+import json
+import random
+
+import pytest
+
+from src.core.packed_signature_finder import PackedSignatureFinder
+from src.core.preprocessor import FastaPreprocessor
+from src.core.regions import RegionFilter, longest_signatures
+from src.core.signature_finder import SignatureFinder
+from src.core.signature_table import SignatureTable
+from src.core.suffix_signature_finder import SuffixArraySignatureFinder
+from src.models.schemas import AnalysisResult, Signature
+from src.services.result_export import export_signatures, iter_result_json
+
+
+def random_dna(rng, length):
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+
+def make_genomes(seed=1):
+    rng = random.Random(seed)
+    target = {"t1": random_dna(rng, 1200), "t2": "ACGTN" + random_dna(rng, 600)}
+    background = {"b": target["t1"][200:900] + random_dna(rng, 100) + target["t2"][100:400]}
+    return target, background
+
+
+@pytest.mark.parametrize("region_filter", [None, RegionFilter(min_length=30, top_n=4)])
+@pytest.mark.parametrize("engine", [SignatureFinder, PackedSignatureFinder, SuffixArraySignatureFinder])
+def test_table_holds_the_signatures_the_finder_yields(engine, region_filter):
+    target, background = make_genomes()
+    finder = engine(kmer_size=9)
+    finder.region_filter = region_filter
+    kmers = finder.build_background(background)
+
+    table = finder.find_unique_signature_table(target, kmers)
+
+    expected = list(finder.iter_unique_signatures_in_background(target, kmers))
+    assert list(table) == expected
+    assert list(table.iter_dicts(include_sequence=False)) == [{**sig, 'sequence': None} for sig in expected]
+    assert list(table.compact()) == expected and table.compact().sequences is None
+
+
+def test_merged_table_matches_merged_signatures(tmp_path):
+    target, background = make_genomes(2)
+    path = tmp_path / "target.fna"
+    path.write_text("".join(f">{name}\n{sequence}\n" for name, sequence in target.items()))
+    genome = FastaPreprocessor().merge_contigs(str(path))
+    finder = PackedSignatureFinder(kmer_size=9)
+    kmers = finder.build_background(background)
+
+    table = genome.to_merged_table(finder.find_unique_signature_table(genome.contig_sequences(), kmers))
+
+    expected = genome.to_merged_signatures(finder.find_unique_signatures_in_background(genome.contig_sequences(), kmers))
+    assert list(table) == expected
+    assert list(SignatureTable.from_dicts(expected)) == expected
+    assert list(table.longest(3)) == longest_signatures(expected, 3)
+    assert table[1] == expected[1] and list(table[2:5]) == expected[2:5]
+
+
+@pytest.mark.parametrize("include_sequence", [True, False])
+def test_columnar_encoding_matches_the_models(include_sequence):
+    target, background = make_genomes(3)
+    finder = SignatureFinder(kmer_size=9)
+    table = finder.find_unique_signature_table(target, finder.build_background(background))
+    signatures = list(table.iter_dicts(include_sequence))
+
+    result = AnalysisResult(summary="Found é signatures", signatures=[], result_id="r")
+    encoded = b"".join(iter_result_json(result, table, include_sequence))
+
+    full = result.model_copy(update={"signatures": [Signature(**sig) for sig in signatures]})
+    assert json.loads(encoded) == json.loads(full.model_dump_json())
+    for export_format in ("csv", "tsv", "ndjson"):
+        assert b"".join(export_signatures(table, export_format, include_sequence)) == b"".join(
+            export_signatures(signatures, export_format, include_sequence)
+        )
+
+
+def test_compacted_bases_of_non_utf8_targets_are_sliced_by_their_text():
+    # Two bytes decode to one character, and a stray byte to a replacement character.
+    target = {"t": bytearray(b"ACGT\xc3\xa9GGGCCC" + b"ACGTACGT" + b"TTT\xffAAAAC")}
+    finder = PackedSignatureFinder(kmer_size=4)
+    table = finder.find_unique_signature_table(target, finder.build_background({"b": "ACGTACGT"}))
+
+    expected = list(table)
+    assert [sig['sequence'] for sig in expected] == ["CGT\u00e9GGGCCCACG", "CGTTTT\ufffdAAAAC"]
+    assert list(table.compact()) == expected
+    assert list(SignatureTable.from_dicts(expected)) == expected
+    assert list(table.compact()[1:]) == expected[1:]
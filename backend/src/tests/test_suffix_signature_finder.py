@@ -0,0 +1,58 @@
+import random
+
+import pytest
+from src.core.signature_finder import SignatureFinder
+from src.core.suffix_signature_finder import SuffixArraySignatureFinder
+
+
+def _random_genome(rng, length, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def _genomes():
+    rng = random.Random(21)
+    background = {"b1": _random_genome(rng, 600, "ACGTN"), "b2": _random_genome(rng, 300)}
+    target = {
+        "t1": background["b1"][100:250] + _random_genome(rng, 80) + background["b2"][:120],
+        "t2": _random_genome(rng, 40) + background["b1"][:60],
+    }
+    return target, background
+
+
+@pytest.mark.parametrize("kmer_size", [1, 4, 9, 21, 40, 70])
+def test_matches_the_set_engine_for_any_kmer_size(kmer_size):
+    # Arrange
+    target, background = _genomes()
+
+    # Act
+    result = SuffixArraySignatureFinder(kmer_size=kmer_size).find_unique_signatures(target, background)
+
+    # Assert
+    assert result == SignatureFinder(kmer_size=kmer_size).find_unique_signatures(target, background)
+
+
+def test_sweep_reports_every_kmer_size_from_one_build():
+    # Arrange
+    target, background = _genomes()
+    finder = SuffixArraySignatureFinder(kmer_size=15, max_kmer_size=45)
+
+    # Act
+    results = dict(finder.sweep(target, finder.build_background(background), [15, 31, 45]))
+
+    # Assert
+    for kmer_size, signatures in results.items():
+        assert signatures == SignatureFinder(kmer_size=kmer_size).find_unique_signatures(target, background)
+    with pytest.raises(ValueError):
+        list(finder.sweep(target, [], [46]))
+
+
+def test_shortest_unique_lengths():
+    # Arrange
+    finder = SuffixArraySignatureFinder(kmer_size=3, max_kmer_size=10)
+    target = {"t1": "ACGTTT"}
+
+    # Act
+    lengths = finder.minimal_unique_lengths(target, finder.build_background({"b1": "ACGAAAT"}))
+
+    # Assert: "ACGT" is the shortest absent substring at 0; "TT" at 3 and 4; nothing fits at 5.
+    assert lengths.shortest_unique_lengths("t1").tolist() == [4, 3, 2, 2, 2, 0]
@@ -0,0 +1,141 @@
+import errno
+import os
+import random
+
+import pytest
+from src.core.packed_signature_finder import PackedSignatureFinder
+from src.core.updatable_background_index import UpdatableBackgroundIndex
+
+
+def _random_genome(rng, length):
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+
+def _genome_id(i):
+    return f"{i:064x}"
+
+
+def test_adding_and_removing_genomes_matches_a_full_rebuild(tmp_path):
+    # Arrange
+    rng = random.Random(21)
+    genomes = [_random_genome(rng, 800 * (i + 1)) for i in range(5)]
+    genomes.append(genomes[0][:500] + "NNNNNNNN" + genomes[2][:300])
+    target = {"t1": genomes[0][:400] + _random_genome(rng, 300) + genomes[3][100:900] + "NNNNNNNN"}
+    index = UpdatableBackgroundIndex.create(str(tmp_path), "panel", kmer_size=11)
+    finder = PackedSignatureFinder(kmer_size=11)
+
+    # Act
+    for i, genome in enumerate(genomes):
+        index.add_genome(_genome_id(i), f"g{i}", [genome])
+    index.remove_genome(_genome_id(3))
+    index.remove_genome(_genome_id(5))
+    reopened = UpdatableBackgroundIndex.open(str(tmp_path), "panel")
+
+    # Assert
+    remaining = {i: genome for i, genome in enumerate(genomes) if i not in (3, 5)}
+    expected = finder.find_unique_signatures(target, remaining)
+    assert finder.find_unique_signatures_in_background(target, index) == expected
+    assert finder.find_unique_signatures_in_background(target, reopened) == expected
+    assert reopened.kmer_count == len(finder.build_background(remaining))
+
+
+def test_reference_counts_follow_updates(tmp_path):
+    index = UpdatableBackgroundIndex.create(str(tmp_path), "panel", kmer_size=4)
+    finder = PackedSignatureFinder(kmer_size=4)
+    codes = finder.build_background({"a": "ACGTA"}).codes
+    index.add_genome(_genome_id(1), "a", ["ACGTA"])
+    index.add_genome(_genome_id(2), "b", ["TACGTA"])
+
+    assert index.reference_counts(codes).tolist() == [2, 2]
+    index.remove_genome(_genome_id(2))
+    assert index.reference_counts(codes).tolist() == [1, 1]
+
+    with pytest.raises(ValueError):
+        index.add_genome(_genome_id(1), "a again", ["ACGTA"])
+    with pytest.raises(KeyError):
+        index.remove_genome(_genome_id(2))
+
+
+def test_a_genome_added_while_another_upload_of_it_is_encoded_is_rejected(tmp_path):
+    index = UpdatableBackgroundIndex.create(str(tmp_path), "panel", kmer_size=4)
+    codes = PackedSignatureFinder(kmer_size=4).build_background({"a": "ACGTA"}).codes
+
+    def sequences():
+        # The other upload of the same genome finishes first.
+        index.add_genome(_genome_id(1), "a", ["ACGTA"])
+        yield "ACGTA"
+
+    with pytest.raises(ValueError):
+        index.add_genome(_genome_id(1), "a again", sequences())
+    index.remove_genome(_genome_id(1))
+    assert index.reference_counts(codes).tolist() == [0, 0]
+
+
+@pytest.mark.parametrize("operation", ["add", "remove"])
+def test_an_update_interrupted_before_its_state_is_written_is_undone(tmp_path, monkeypatch, operation):
+    rng = random.Random(5)
+    genomes = [_random_genome(rng, 3000) for _ in range(2)]
+    genomes.append(genomes[0][:1500] + genomes[1][1500:])
+    codes = PackedSignatureFinder(kmer_size=9).build_background({"all": "".join(genomes)}).codes
+    index = UpdatableBackgroundIndex.create(str(tmp_path), "panel", kmer_size=9)
+    for i, genome in enumerate(genomes[:2]):
+        index.add_genome(_genome_id(i), f"g{i}", [genome])
+    without_third = index.reference_counts(codes).tolist()
+    if operation == "remove":
+        index.add_genome(_genome_id(2), "g2", [genomes[2]])
+    before = index.reference_counts(codes).tolist()
+
+    # The process dies after changing counts but before writing the new state.
+    def crash():
+        raise KeyboardInterrupt
+    monkeypatch.setattr(index, "_write_state", crash)
+    with pytest.raises(KeyboardInterrupt):
+        if operation == "add":
+            index.add_genome(_genome_id(2), "g2", [genomes[2]])
+        else:
+            index.remove_genome(_genome_id(2))
+
+    reopened = UpdatableBackgroundIndex.open(str(tmp_path), "panel")
+    assert reopened.reference_counts(codes).tolist() == before
+    assert (_genome_id(2) in reopened.genomes) == (operation == "remove")
+    if operation == "remove":
+        reopened.remove_genome(_genome_id(2))
+        assert reopened.reference_counts(codes).tolist() == without_third
+
+
+@pytest.mark.parametrize("operation, failing_step", [("add", "_compact"), ("remove", "_write_state")])
+def test_an_update_that_fails_partway_is_rolled_back(tmp_path, monkeypatch, operation, failing_step):
+    rng = random.Random(8)
+    genomes = [_random_genome(rng, 3000) for _ in range(2)]
+    genomes.append(genomes[0][:1500] + "NNNNNNNNN" + _random_genome(rng, 1500))
+    codes = PackedSignatureFinder(kmer_size=9).build_background({"all": "".join(genomes)}).codes
+    index = UpdatableBackgroundIndex.create(str(tmp_path), "panel", kmer_size=9)
+    for i, genome in enumerate(genomes[:2]):
+        index.add_genome(_genome_id(i), f"g{i}", [genome])
+    if operation == "remove":
+        index.add_genome(_genome_id(2), "g2", [genomes[2]])
+    before = index.reference_counts(codes).tolist()
+    before_kmer_count = index.kmer_count
+
+    # The disk fills up after the counts have been changed in place.
+    def disk_full(*args):
+        raise OSError(errno.ENOSPC, "No space left on device")
+    monkeypatch.setattr(index, failing_step, disk_full)
+    with pytest.raises(OSError):
+        if operation == "add":
+            index.add_genome(_genome_id(2), "g2", [genomes[2]])
+        else:
+            index.remove_genome(_genome_id(2))
+
+    assert index.reference_counts(codes).tolist() == before
+    assert index.kmer_count == before_kmer_count
+    assert (_genome_id(2) in index.genomes) == (operation == "remove")
+    assert not os.path.exists(os.path.join(index.path, "pending_update.npz"))
+    reopened = UpdatableBackgroundIndex.open(str(tmp_path), "panel")
+    assert reopened.reference_counts(codes).tolist() == before
+    monkeypatch.undo()
+    if operation == "add":
+        index.add_genome(_genome_id(2), "g2", [genomes[2]])
+    else:
+        index.remove_genome(_genome_id(2))
+    assert (_genome_id(2) in index.genomes) == (operation == "add")
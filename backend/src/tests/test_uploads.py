@@ -0,0 +1,70 @@
+import gzip
+import hashlib
+import io
+import os
+
+import pytest
+from src.core.sequence_parser import SequenceParser
+from src.services.uploads import FastaValidationError, HashingReader, save_upload
+
+FASTA = b">seq1 first\nGATTACA\nGATTACA\n>seq2\nACGTN-\n"
+
+
+def test_save_upload_copies_in_chunks_and_hashes():
+    # Act
+    stored = save_upload(io.BytesIO(FASTA), chunk_size=4)
+
+    # Assert
+    try:
+        with open(stored.path, "rb") as f:
+            assert f.read() == FASTA
+        assert stored.sha256 == hashlib.sha256(FASTA).hexdigest()
+        assert stored.size == len(FASTA)
+        assert stored.record_count == 2
+    finally:
+        os.remove(stored.path)
+
+
+@pytest.mark.parametrize("content", [b"GATTACA\n>seq1\nACGT\n", b">seq1\nACGT\nAC1GT\n", b"", b"\n\n"])
+def test_save_upload_rejects_invalid_fasta(content):
+    with pytest.raises(FastaValidationError):
+        save_upload(io.BytesIO(content), chunk_size=3)
+
+
+def test_hashing_reader_lets_the_parser_read_the_stream_directly():
+    # Arrange
+    reader = HashingReader(io.BytesIO(FASTA))
+
+    # Act
+    sequences = dict(SequenceParser(block_size=5).iter_records(reader))
+
+    # Assert
+    assert sequences == {">seq1 first": "GATTACAGATTACA", ">seq2": "ACGTN-"}
+    assert reader.hexdigest() == hashlib.sha256(FASTA).hexdigest()
+
+
+def test_compressed_upload_is_stored_compressed_and_validated():
+    compressed = gzip.compress(FASTA)
+
+    stored = save_upload(io.BytesIO(compressed), chunk_size=7)
+
+    try:
+        with open(stored.path, "rb") as f:
+            assert f.read() == compressed
+        assert stored.sha256 == hashlib.sha256(compressed).hexdigest()
+        assert (stored.compressed, stored.uncompressed_size, stored.record_count) == (True, len(FASTA), 2)
+    finally:
+        os.remove(stored.path)
+    with pytest.raises(FastaValidationError):
+        save_upload(io.BytesIO(gzip.compress(b"GATTACA\n")))
+
+
+def test_hashing_reader_inflates_compressed_streams_for_the_parser():
+    compressed = gzip.compress(FASTA)
+    reader = HashingReader(io.BytesIO(compressed))
+
+    sequences = dict(SequenceParser(block_size=5).iter_records(reader))
+
+    assert sequences == {">seq1 first": "GATTACAGATTACA", ">seq2": "ACGTN-"}
+    assert reader.hexdigest() == hashlib.sha256(compressed).hexdigest()
+    assert reader.compressed and reader.validator.record_count == 2
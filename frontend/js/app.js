@@ -10,7 +10,10 @@ document.addEventListener('DOMContentLoaded', () => {
     const downloadButton = document.getElementById('download-csv-button');
     const preprocessorToggle = document.getElementById('preprocessor-toggle'); // <-- NEW
 
+    const apiBase = 'https://aaronhhorvitz-isignify.hf.space/api/v1';
+
     let currentSignatures = [];
+    let currentResultId = null;
 
     form.addEventListener('submit', async (event) => {
         event.preventDefault();
@@ -22,6 +25,7 @@ document.addEventListener('DOMContentLoaded', () => {
         submitButton.disabled = true;
         submitButton.textContent = 'Analyzing...';
         currentSignatures = [];
+        currentResultId = null;
 
         const formData = new FormData();
         formData.append('kmer_size', document.getElementById('kmer-size').value);
@@ -35,8 +39,11 @@ document.addEventListener('DOMContentLoaded', () => {
         formData.append('run_preprocessor', preprocessorToggle.checked);
         // ---------------------------------------------------
 
+        // Keep the result on the server so the CSV can be streamed from there.
+        formData.append('store_result', true);
+
         try {
-            const response = await fetch('https://aaronhhorvitz-isignify.hf.space/api/v1/analyze/', {
+            const response = await fetch(`${apiBase}/analyze/`, {
                 method: 'POST',
                 body: formData,
             });
@@ -61,6 +68,11 @@ document.addEventListener('DOMContentLoaded', () => {
     // ... (keep the downloadButton event listener and display functions) ...
     downloadButton.addEventListener('click', () => {
         if (currentSignatures.length === 0) return;
+        if (currentResultId) {
+            // The server streams the CSV, so the download starts at once.
+            window.location.href = `${apiBase}/results/${currentResultId}/export?format=csv`;
+            return;
+        }
         const headers = ['sequence_id', 'start', 'end', 'length', 'sequence'];
         let csvContent = headers.join(',') + '\n';
         currentSignatures.forEach(sig => {
@@ -83,6 +95,7 @@ document.addEventListener('DOMContentLoaded', () => {
     function displayResults(data) {
         summaryDiv.textContent = data.summary;
         currentSignatures = data.signatures || [];
+        currentResultId = data.result_id || null;
         let tableContent = 'ID\t\tStart\tEnd\tLength\tSequence\n';
         tableContent += '----------------------------------------------------------\n';
         if (currentSignatures.length > 0) {